@@ -3,13 +3,22 @@ import pandas as pd
 import plotly.express as px
 import os
 import sys
+import uuid
 from pathlib import Path
 
 # Add source directory to system path to import modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
 
 # Import optimization logic
-from optimize import optimize_distribution
+from optimize import optimize_distribution, optimize_horizon, SHORTAGE_PENALTY, shipping_costs_for
+from scenarios import run_scenario_sweep, summarize_scenarios, cost_pct_for, DEFAULT_STOCK_LEVELS
+import data_access
+import downsample
+import engines
+import jobs
+import local_store
+import result_cache
+from simulation import simulate_plan, network_service_levels, has_intervals, DEFAULT_DEMAND_CV
 
 # --- 1. Page Config ---
 st.set_page_config(
@@ -25,46 +34,158 @@ DATA_DIR = Path(__file__).parent / "data"
 
 # --- 2. Load Data ---
 def load_local_data():
+    """
+    Local Parquet datasets in data/ (queried lazily with push-down by data_access).
+    Falls back to fully loaded legacy CSVs if the datasets have not been written yet.
+    """
     try:
-        df_forecast = pd.read_csv(DATA_DIR / "forecast_results.csv", parse_dates=["Date"])
-        df_history = pd.read_csv(DATA_DIR / "sales_history.csv", parse_dates=["Date"])
+        if local_store.dataset_exists("forecast_results", DATA_DIR) and local_store.dataset_exists("sales_history", DATA_DIR):
+            return (local_store.dataset_path("forecast_results", str(DATA_DIR)),
+                    local_store.dataset_path("sales_history", str(DATA_DIR)))
+        df_forecast = local_store.read_dataset("forecast_results", data_dir=DATA_DIR)
+        df_history = local_store.read_dataset("sales_history", data_dir=DATA_DIR)
         return df_forecast, df_history
     except FileNotFoundError as e:
-        st.error(f"Local CSV not found: {e}")
+        st.error(f"Local data not found: {e}")
     except Exception as e:
-        st.error(f"Error loading local CSV: {e}")
+        st.error(f"Error loading local data: {e}")
     return None, None
 
 
-@st.cache_data(ttl=600) # cache data for 10 minutes
-def load_data(offline_mode: bool):
+@st.cache_resource(ttl=600) # keep local sources for 10 minutes (read-only, shared across reruns)
+def load_local_sources():
+    return load_local_data()
+
+
+def get_data_sources(offline_mode: bool):
+    """
+    Return (forecast_source, history_source) for the data-access layer:
+    the pooled Supabase engine (queries are pushed down to SQL) or local Parquet datasets.
+    """
     if offline_mode:
-        st.info("OFFLINE_MODE enabled: loading from local CSVs in data/")
-        return load_local_data()
+        st.info("OFFLINE_MODE enabled: loading from local datasets in data/")
+        return load_local_sources()
 
     try:
-        # Setup connection to Supabase
+        # Setup connection to Supabase (the connection and its pool are reused across reruns)
         conn = st.connection("supabase", type="sql")
-        
-        # Query data from tables
-        df_forecast = conn.query("SELECT * FROM forecast_results;", ttl=0)
-        df_history = conn.query("SELECT * FROM sales_history;", ttl=0)
-        
-        # Ensure Date columns are in datetime format
-        df_forecast['Date'] = pd.to_datetime(df_forecast['Date'])
-        df_history['Date'] = pd.to_datetime(df_history['Date'])
-        
-        return df_forecast, df_history
+        fetch_forecast_dates(conn.engine, "supabase")  # Fail fast if the database is unreachable
+        return conn.engine, conn.engine
         
     except Exception as e:
-        st.warning(f"Supabase unavailable, falling back to local CSVs: {e}")
-        return load_local_data()
+        st.warning(f"Supabase unavailable, falling back to local data: {e}")
+        return load_local_sources()
+
+
+# Cached queries: `_source` is not hashed, `source_key` tells online and local results apart
+@st.cache_data(ttl=600) # cache data for 10 minutes
+def fetch_forecast_dates(_source, source_key):
+    return data_access.get_forecast_dates(_source)
+
+@st.cache_data(ttl=600)
+def fetch_forecast_stores(_source, source_key):
+    return data_access.get_forecast_stores(_source)
+
+@st.cache_data(ttl=600)
+def fetch_forecast(_source, source_key, stores=None, date=None):
+    return data_access.query_forecast(_source, stores, date)
+
+@st.cache_data(ttl=600)
+def fetch_history_bounds(_source, source_key):
+    return data_access.get_history_bounds(_source)
+
+@st.cache_data(ttl=600)
+def fetch_history(_source, source_key, stores, start_date, end_date, grain):
+    return data_access.query_history(_source, stores, start_date, end_date, grain)
 
-df_forecast, df_history = load_data(OFFLINE_MODE)
+@st.cache_data(ttl=600)
+def fetch_scenarios(_source, source_key, date):
+    return data_access.query_scenarios(_source, date)
 
-if df_forecast is None or df_history is None:
+
+forecast_source, history_source = get_data_sources(OFFLINE_MODE)
+
+if forecast_source is None or history_source is None:
     st.stop()
 
+SOURCE_KEY = "local" if isinstance(history_source, (str, pd.DataFrame)) else "supabase"
+# Pre-computed what-if sweeps (src/scenarios.py): the published table online, the local CSV offline
+scenario_source = str(DATA_DIR / "scenario_results.csv") if SOURCE_KEY == "local" else history_source
+
+# Background jobs (optimization, re-forecast), shared by all sessions (see src/jobs.py).
+# JOB_WORKERS caps how many run at once on this server, whatever the number of sessions.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_WAIT_SECONDS = 2.0  # a new job is waited on this long, so quick solves show in the same run
+JOB_POLL_SECONDS = 1.0
+
+@st.cache_resource
+def get_job_manager():
+    return jobs.JobManager(max_workers=JOB_WORKERS, max_pending=4 * JOB_WORKERS, max_per_owner=2)
+
+job_manager = get_job_manager()
+if "job_owner" not in st.session_state:
+    st.session_state.job_owner = uuid.uuid4().hex
+
+@st.experimental_fragment(run_every=JOB_POLL_SECONDS)
+def show_job_progress(job_id):
+    """
+    Progress bar and cancel button of a running job, polled without rerunning the whole page.
+    Once the job finishes, the page reruns to show its result.
+    """
+    job = job_manager.get(job_id)
+    if job is None or job.finished:
+        st.rerun()
+    st.progress(job.progress, text=f"{job.message or job.status.capitalize()} · {job.elapsed():.0f}s")
+    st.button("Cancel", key=f"cancel_{job_id}", on_click=job_manager.cancel, args=(job_id,))
+
+def job_result(slot, key, submit, label):
+    """
+    Result of this session's background job in st.session_state[slot] if it was started for `key`
+    (the inputs it depends on); None while it is queued or running, or if it failed.
+    submit() queues a new job and returns its id; it is only called when there is no job for
+    this key yet (pass None to only show an existing job).
+    """
+    current = st.session_state.get(slot)
+    job = job_manager.get(current['id']) if current and current['key'] == key else None
+    if job is None:
+        if submit is None:
+            return None
+        try:
+            job_id = submit()
+        except jobs.JobLimitError as e:
+            st.warning(f"{label} not started: {e}")
+            return None
+        st.session_state[slot] = {'id': job_id, 'key': key}
+        job = job_manager.wait(job_id, JOB_WAIT_SECONDS)
+
+    if job.status == jobs.DONE:
+        return job.result
+    if job.status == jobs.FAILED:
+        st.error(f"{label} failed: {job.error}")
+    elif job.status == jobs.CANCELLED:
+        st.info(f"{label} was cancelled.")
+    else:
+        st.info(f"{label} is running in the background. You can keep using the other tabs; "
+                "the result appears here when it is ready.")
+        show_job_progress(job.id)
+    return None
+
+def reforecast(source, stores, engine_name, days_ahead, progress=None):
+    """
+    Background job: refit the forecast of the given stores on their full daily history.
+    """
+    from forecast import round_forecast
+
+    progress(0.0, "Loading history")
+    _, min_date, max_date = data_access.get_history_bounds(source)
+    history = data_access.query_history(source, stores, min_date, max_date, "day")
+    engine = engines.get_forecast_engine(engine_name)
+    progress(0.1, f"Fitting {engine_name} models")
+    forecast = engine(history, days_ahead=days_ahead,
+                      progress=lambda done, total, store: progress(0.1 + 0.9 * done / total,
+                                                                   f"Fitted {done}/{total} stores"))
+    return round_forecast(forecast)
+
 # --- 3. Sidebar (Control Panel) ---
 st.sidebar.header("Configuration")
 
@@ -78,7 +199,7 @@ def format_date_label(date_str):
 
 
 # Select Target Date
-available_dates = df_forecast['Date'].unique()
+available_dates = fetch_forecast_dates(forecast_source, SOURCE_KEY)
 selected_date = st.sidebar.selectbox(
     "Select Target Date:", 
     available_dates,
@@ -86,7 +207,7 @@ selected_date = st.sidebar.selectbox(
 )
 
 # Filter data for the selected date
-daily_demand = df_forecast[df_forecast['Date'] == selected_date].copy()
+daily_demand = fetch_forecast(forecast_source, SOURCE_KEY, date=selected_date).copy()
 total_demand = daily_demand['Predicted_Demand'].sum()
 
 st.sidebar.divider()
@@ -109,8 +230,9 @@ cost_c = st.sidebar.number_input("Store_C", value=12)
 cost_d = st.sidebar.number_input("Store_D", value=8)
 cost_e = st.sidebar.number_input("Store_E (Closest)", value=5)
 
-# Create cost dictionary
+# Create cost dictionary (stores without an input keep their seeded default cost)
 shipping_costs = {
+    **shipping_costs_for(daily_demand['Store'].unique()),
     'Store_A': cost_a,
     'Store_B': cost_b,
     'Store_C': cost_c,
@@ -125,12 +247,8 @@ tab1, tab2, tab3 = st.tabs(["Historical Data", "Market Forecast", "Optimization
 with tab1:
     st.subheader("Historical Sales Data")
 
-    # Ensure 'Date' column is datetime
-    df_history['Date'] = pd.to_datetime(df_history['Date'])
-
-    # Determine min and max dates for default range
-    min_date = df_history['Date'].min()
-    max_date = df_history['Date'].max()
+    # Stores and date range come from a small metadata query, not the full history
+    all_stores_history, min_date, max_date = fetch_history_bounds(history_source, SOURCE_KEY)
     default_start_30d = max_date - pd.Timedelta(days=30)
 
     # Function to reset date range to last 30 days
@@ -138,11 +256,8 @@ with tab1:
         st.session_state.hist_date_range = (default_start_30d, max_date)
     
     col_filter, col_date, col_btn = st.columns([3, 2, 1])
-
-    all_stores_history = df_history['Store'].unique()
     
     with col_filter:
-        all_stores_history = df_history['Store'].unique()
         selected_stores_hist = st.multiselect(
             "Filter by Store(s):",
             options=all_stores_history,
@@ -151,10 +266,6 @@ with tab1:
         )
         
     with col_date:
-        # Find min and max dates in the historical data
-        min_date = df_history['Date'].min()
-        max_date = df_history['Date'].max()
-        
         # Default to last 30 days
         default_start = max_date - pd.Timedelta(days=30)
         
@@ -172,38 +283,52 @@ with tab1:
             # Call reset function on button click
             st.button("↺ Last 30 Days", on_click=reset_date_range, help="Reset to latest 30 days")
 
-    
-
+    # Wide ranges are served from weekly/monthly rollups
+    grain_options = {"Auto": None, "Daily": "day", "Weekly": "week", "Monthly": "month"}
+    grain_choice = st.radio("Granularity:", list(grain_options), horizontal=True, key="hist_grain")
 
-    filtered_history = df_history[df_history['Store'].isin(selected_stores_hist)]
-    
     # Date Range Selector
     if len(selected_date_range) == 2:
         start_date, end_date = selected_date_range
-        # Filter data within selected date range
-        mask = (filtered_history['Date'] >= pd.to_datetime(start_date)) & (filtered_history['Date'] <= pd.to_datetime(end_date))
-        filtered_history = filtered_history.loc[mask]
         
         # Create chart title
         chart_title = f"Sales Trend: {start_date.strftime('%d %b %Y')} - {end_date.strftime('%d %b %Y')}"
     else:
+        start_date, end_date = min_date, max_date
         chart_title = "Sales Trend (Please select end date)"
     
+    grain = grain_options[grain_choice] or data_access.choose_grain(start_date, end_date)
+    if grain != "day":
+        chart_title += f" ({grain}ly totals)"
+    
+    # Store and date filters run in the database (or on the local frame in OFFLINE_MODE)
+    filtered_history = fetch_history(history_source, SOURCE_KEY, tuple(selected_stores_hist),
+                                     pd.Timestamp(start_date), pd.Timestamp(end_date), grain)
+    
 
     # If no stores selected, show warning
     if filtered_history.empty:
         st.warning("Please select at least one store to view the historical data or the data might be out of the 30-day range.")
     else:
+        # Downsample each store's series to the chart width before it is sent to the browser
+        chart_history, n_reduced = downsample.downsample_series(
+            filtered_history,
+            max_points=downsample.points_per_series(filtered_history['Store'].nunique())
+        )
+
         # Visualization: Line Chart of Historical Sales
         fig_hist = px.line(
-            filtered_history, 
+            chart_history, 
             x='Date', 
             y='Sales', 
             color='Store', 
-            markers=True,
+            markers=len(chart_history) <= downsample.MARKER_THRESHOLD,
             title=chart_title
         )
         st.plotly_chart(fig_hist, use_container_width=True)
+        if n_reduced:
+            st.caption(f"Chart downsampled: {len(chart_history):,} of {len(filtered_history):,} points shown "
+                       f"({n_reduced:,} reduced). The table and CSV below contain every row.")
         
         st.divider()
         
@@ -235,7 +360,7 @@ with tab1:
 with tab2:
     st.subheader("30-Day Sales Forecast")
     
-    all_stores_forcast = df_forecast['Store'].unique()
+    all_stores_forcast = fetch_forecast_stores(forecast_source, SOURCE_KEY)
     
     # Multi-select for Stores
     selected_stores_view = st.multiselect(
@@ -245,8 +370,8 @@ with tab2:
         key = "forecast_filter"
     )
     
-    # Filter forecast data based on selected stores
-    filtered_forecast = df_forecast[df_forecast['Store'].isin(selected_stores_view)]
+    # Filter forecast data based on selected stores (pushed down to the database)
+    filtered_forecast = fetch_forecast(forecast_source, SOURCE_KEY, stores=tuple(selected_stores_view))
     
     
     # If no stores selected, show warning
@@ -290,17 +415,100 @@ with tab2:
                 file_name="forecast_data.csv",
                 mime="text/csv"
             )
+    
+    st.divider()
+    st.markdown("#### Re-forecast")
+    st.caption("Refits the selected stores on their full history as a background job. "
+               "The stored forecast is not changed; download the new one when it is ready.")
+    
+    col_engine, col_days, col_run = st.columns([2, 2, 1])
+    reforecast_engine = col_engine.selectbox("Forecast Engine:", list(engines.FORECAST_ENGINES), key="reforecast_engine")
+    reforecast_days = col_days.slider("Days Ahead:", 7, 60, 30, key="reforecast_days")
+    with col_run:
+        st.write("")
+        reforecast_clicked = st.button("Start Re-forecast", disabled=not selected_stores_view)
+    
+    reforecast_key = (SOURCE_KEY, tuple(selected_stores_view), reforecast_engine, reforecast_days)
+    if reforecast_clicked:
+        st.session_state.pop("reforecast_job", None)
+    new_forecast = job_result(
+        "reforecast_job", reforecast_key,
+        (lambda: job_manager.submit(reforecast, history_source, tuple(selected_stores_view), reforecast_engine,
+                                    reforecast_days, name="Re-forecast", owner=st.session_state.job_owner,
+                                    progress=True)) if reforecast_clicked else None,
+        "Re-forecast"
+    )
+    
+    if new_forecast is not None:
+        fig_new = px.line(new_forecast, x='Date', y='Predicted_Demand', color='Store', markers=True,
+                          title=f"Re-forecast ({reforecast_engine}, {reforecast_days} days)")
+        st.plotly_chart(fig_new, use_container_width=True)
+        st.download_button(
+            label="Download Re-forecast CSV",
+            data=new_forecast.to_csv(index=False).encode('utf-8'),
+            file_name="reforecast_data.csv",
+            mime="text/csv"
+        )
+
 
+# Solved plans, shared by all sessions (bounded LRU, see src/result_cache.py)
+OPTIMIZATION_SOLVER = "auto"
+
+@st.cache_resource
+def get_optimization_cache():
+    return result_cache.LRUCache(maxsize=128)
+
+def optimization_key(daily_demand, warehouse_stock, shipping_costs):
+    """
+    Everything the plan depends on: date and demand, stock, costs and solver config.
+    """
+    demand = tuple(daily_demand[['Store', 'Predicted_Demand']].itertuples(index=False, name=None))
+    return (SOURCE_KEY, str(selected_date), demand, int(warehouse_stock),
+            tuple(sorted(shipping_costs.items())), (OPTIMIZATION_SOLVER, SHORTAGE_PENALTY))
+
+# Processes per stress test; results for a seed do not depend on it (see simulate_plan)
+SIMULATION_WORKERS = int(os.getenv("SIMULATION_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+@st.cache_data
+def run_stress_test(allocation_plan, daily_demand, n_reps, demand_cv, late_prob):
+    """
+    Monte Carlo replay of a plan (see src/simulation.py); late shipments arrive one day later.
+    Demand spread comes from the day's forecast intervals, or from demand_cv where there are none.
+    """
+    return simulate_plan(allocation_plan, forecast_df=daily_demand, n_reps=n_reps, demand_cv=demand_cv,
+                         lead_time_probs=[1 - late_prob, late_prob], workers=SIMULATION_WORKERS)
 
 with tab3:
     st.subheader(f"Optimal Distribution Plan for: {selected_date}")
     
-    # Action Button
+    optimization_cache = get_optimization_cache()
+    plan_key = optimization_key(daily_demand, warehouse_stock, shipping_costs)
+    
+    # Action Button (the request is remembered, so the plan survives reruns from other widgets)
     if st.button("Run Optimization Allocation"):
+        st.session_state.optimization_requested = True
+        st.session_state.pop("optimization_job", None)
+    
+    allocation_plan = None
+    if st.session_state.get("optimization_requested"):
+        solve = lambda: optimize_distribution(daily_demand, warehouse_stock, shipping_costs, solver=OPTIMIZATION_SOLVER)
         
-        # Execute Optimization Logic
-        with st.spinner("Running Linear Programming Solver..."):
-            allocation_plan = optimize_distribution(daily_demand, warehouse_stock, shipping_costs)
+        # Recently solved scenarios come straight from the cache; new ones are solved as a background job
+        cache_hit = plan_key in optimization_cache
+        if cache_hit:
+            allocation_plan, cache_hit = optimization_cache.get_or_compute(plan_key, solve)
+        else:
+            allocation_plan = job_result(
+                "optimization_job", plan_key,
+                lambda: job_manager.submit(lambda: optimization_cache.get_or_compute(plan_key, solve)[0],
+                                           name="Optimization", owner=st.session_state.job_owner),
+                "Optimization"
+            )
+    
+    if allocation_plan is not None:
+        cache_stats = optimization_cache.stats()
+        st.caption(f"{'Cached plan' if cache_hit else 'Solved'} · plan cache: {cache_stats['size']}/{cache_stats['maxsize']} "
+                   f"plans, {cache_stats['hits']} hits / {cache_stats['misses']} misses")
         
         # Key Metrics
         col1, col2, col3 = st.columns(3)
@@ -337,3 +545,143 @@ with tab3:
             st.warning("Alert: Stockout detected! The system prioritized stores with lower shipping costs to minimize total loss.")
         else:
             st.success("Success: All demands are fully met.")
+        
+        # Stress test: replay the plan under random demand and late deliveries
+        st.markdown("#### Stress Test This Plan")
+        col_cv, col_late, col_reps = st.columns(3)
+        stress_cv = col_cv.slider("Demand Uncertainty (CV %):", 5, 60, int(DEFAULT_DEMAND_CV * 100), step=5)
+        stress_late = col_late.slider("Late Delivery Probability (%):", 0, 50, 10, step=5)
+        stress_reps = col_reps.selectbox("Replications:", [1000, 5000, 20000], index=1)
+        if has_intervals(daily_demand):
+            st.caption("Demand spread is taken from the forecast intervals; the CV applies only to stores without one.")
+        
+        if st.button("Stress Test This Plan"):
+            with st.spinner(f"Simulating {stress_reps:,} replications..."):
+                stress_summary, stress_reps_df = run_stress_test(allocation_plan, daily_demand, stress_reps,
+                                                                 stress_cv / 100, stress_late / 100)
+            network = network_service_levels(stress_reps_df)
+            
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Expected Fill Rate", f"{network['Fill_Rate'].mean() * 100:.1f}%")
+            col2.metric("Fill Rate (5th Percentile)", f"{network['Fill_Rate'].quantile(0.05) * 100:.1f}%")
+            col3.metric("Expected Lost Sales", f"{network['Lost_Sales'].mean():.0f} Units")
+            
+            col_fill, col_lost = st.columns(2)
+            with col_fill:
+                fig_fill = px.histogram(network, x='Fill_Rate', nbins=40, title="Network Fill Rate Distribution",
+                                        color_discrete_sequence=['#CE3D3D'])
+                st.plotly_chart(fig_fill, use_container_width=True)
+            with col_lost:
+                fig_lost = px.box(stress_reps_df, x='Store', y='Lost_Sales', title="Lost Sales by Store")
+                st.plotly_chart(fig_lost, use_container_width=True)
+            
+            st.dataframe(stress_summary.round(3), use_container_width=True, hide_index=True)
+
+    st.divider()
+    st.markdown("#### What-if Curves")
+    
+    @st.cache_data
+    def get_what_if_table(daily_demand, shipping_costs):
+        return run_scenario_sweep(daily_demand, shipping_costs, stock_levels=DEFAULT_STOCK_LEVELS, cost_multipliers=[1.0])
+    
+    def stored_what_if(daily_demand, shipping_costs):
+        """
+        Rows of the pre-computed sweep for the selected date whose Cost_Pct key is exactly the
+        current shipping costs' multiplier and whose demand matches today's forecast, or None.
+        """
+        stored = fetch_scenarios(scenario_source, SOURCE_KEY, selected_date)
+        key = cost_pct_for(shipping_costs)
+        if stored.empty or key is None or 'Cost_Pct' not in stored.columns:
+            return None
+        rows = stored[stored['Cost_Pct'] == key]
+        demand = daily_demand.groupby('Store', observed=True)['Predicted_Demand'].sum().round().astype(int)
+        stored_demand = rows.groupby('Store')['Predicted_Demand'].first().astype(int)
+        if rows.empty or stored_demand.sort_index().to_dict() != demand.rename(index=str).sort_index().to_dict():
+            return None
+        return rows.reset_index(drop=True)
+    
+    # Serve the nightly sweep when it covers the selected date and costs; otherwise solve live
+    what_if = stored_what_if(daily_demand, shipping_costs)
+    if what_if is not None:
+        st.caption("Curves from the pre-computed scenario sweep.")
+    else:
+        what_if = get_what_if_table(daily_demand, shipping_costs)
+        st.caption("No stored sweep for this date and these costs: curves computed live.")
+    what_if_summary = summarize_scenarios(what_if)
+    
+    col_curve, col_store = st.columns(2)
+    with col_curve:
+        fig_rate = px.line(what_if_summary, x='Stock_Level_Pct', y='Fulfillment_Rate', markers=True,
+                           title="Fulfillment Rate vs. Stock Level",
+                           labels={'Stock_Level_Pct': 'Stock Level (% of Demand)', 'Fulfillment_Rate': 'Fulfillment (%)'})
+        fig_rate.add_vline(x=stock_level_pct, line_dash="dash", line_color="#CE3D3D")
+        st.plotly_chart(fig_rate, use_container_width=True)
+    with col_store:
+        fig_short = px.line(what_if, x='Stock_Level_Pct', y='Shortage_Qty', color='Store', markers=True,
+                            title="Shortage by Store vs. Stock Level",
+                            labels={'Stock_Level_Pct': 'Stock Level (% of Demand)', 'Shortage_Qty': 'Shortage (Units)'})
+        fig_short.add_vline(x=stock_level_pct, line_dash="dash", line_color="#CE3D3D")
+        st.plotly_chart(fig_short, use_container_width=True)
+    
+    st.divider()
+    st.markdown("#### Multi-Day Horizon Plan")
+    st.caption("Plans every forecast day in one model: today's warehouse stock is the opening balance, "
+               "daily inbound replenishes it, and unshipped stock carries over to the next day.")
+    
+    inbound_pct = st.slider("Daily Inbound Replenishment (% of Avg. Daily Demand):", 0, 150, 80)
+    
+    horizon_clicked = st.button("Plan Full Horizon")
+    horizon_key = (SOURCE_KEY, int(warehouse_stock), tuple(sorted(shipping_costs.items())), inbound_pct)
+    if horizon_clicked:
+        df_forecast = fetch_forecast(forecast_source, SOURCE_KEY)
+        daily_totals = df_forecast.groupby('Date')['Predicted_Demand'].sum()
+        daily_inbound = int(daily_totals.mean() * (inbound_pct / 100))
+        st.session_state.pop("horizon_job", None)
+    
+    # The solve runs as a background job; its result is shown while the inputs stay the same
+    horizon_result = job_result(
+        "horizon_job", horizon_key,
+        (lambda: job_manager.submit(optimize_horizon, df_forecast, warehouse_stock, shipping_costs,
+                                    inbound=daily_inbound, name="Horizon plan",
+                                    owner=st.session_state.job_owner)) if horizon_clicked else None,
+        "Horizon plan"
+    )
+    
+    if horizon_result is not None:
+        horizon_plan, warehouse_plan = horizon_result
+        
+        horizon_demand = horizon_plan['Predicted_Demand'].sum()
+        horizon_shortage = horizon_plan['Shortage_Qty'].sum()
+        
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Total Shipped (Horizon)", f"{horizon_plan['Allocated_Qty'].sum()} Units")
+        col2.metric("Lost Sales (Horizon)", f"{horizon_shortage} Units", delta_color="inverse")
+        col3.metric("Fulfillment Rate", f"{(1 - horizon_shortage / horizon_demand) * 100:.1f}%")
+        
+        fig_wh = px.line(warehouse_plan, x='Date', y=['Warehouse_Inventory', 'Shipped_Qty', 'Inbound_Qty'],
+                         markers=True, title="Warehouse Inventory Over the Horizon")
+        st.plotly_chart(fig_wh, use_container_width=True)
+        
+        st.dataframe(horizon_plan, use_container_width=True, hide_index=True)
+        st.download_button(
+            label="Download Horizon Plan CSV",
+            data=horizon_plan.to_csv(index=False).encode('utf-8'),
+            file_name="horizon_allocation_plan.csv",
+            mime="text/csv"
+        )
+
+
+# --- 5. Background Jobs (sidebar, rendered last so jobs started in this run are listed) ---
+st.sidebar.divider()
+st.sidebar.subheader("Background Jobs")
+job_stats = job_manager.stats()
+st.sidebar.caption(f"Server: {job_stats['running']} running, {job_stats['queued']} queued "
+                   f"(at most {job_stats['max_workers']} at a time)")
+session_jobs = job_manager.jobs(owner=st.session_state.job_owner)
+if session_jobs:
+    st.sidebar.dataframe(
+        pd.DataFrame([job.snapshot() for job in session_jobs])[['name', 'status', 'progress', 'seconds']],
+        column_config={"progress": st.column_config.ProgressColumn("progress", min_value=0.0, max_value=1.0)},
+        use_container_width=True,
+        hide_index=True
+    )
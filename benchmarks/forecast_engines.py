@@ -0,0 +1,47 @@
+import pandas as pd
+import argparse
+import os
+import sys
+import time
+
+# Add source directory to system path to import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from data_gen import generate_sales_data
+from engines import FORECAST_ENGINES
+import backtest
+
+def run_benchmark(n_stores=5, days=730, days_ahead=30, workers=1, engines=('prophet', 'fast'), n_cutoffs=1):
+    """
+    Backtest each engine on data_gen output over the same rolling-origin cutoffs
+    (default: one holdout of about the last days_ahead days) and report wall time,
+    summed fit time and WAPE, MAPE and bias (in %).
+    """
+    df = generate_sales_data(days=days, n_stores=n_stores)
+    cutoffs = backtest.make_cutoffs(df['Date'], horizon=days_ahead, n_cutoffs=n_cutoffs)
+
+    results = []
+    for engine in engines:
+        start = time.perf_counter()
+        folds = backtest.run_backtest(df, engine=engine, horizon=days_ahead, cutoffs=cutoffs, workers=workers,
+                                      cache_path=None)
+        elapsed = time.perf_counter() - start
+
+        summary = backtest.summarize_backtest(folds, by=['Engine']).iloc[0]
+        results.append({'engine': engine, 'stores': n_stores, 'cutoffs': len(cutoffs), 'seconds': elapsed,
+                        'fit_seconds': summary['Fit_Seconds'], 'wape': summary['WAPE'],
+                        'mape': summary['MAPE'], 'bias': summary['Bias']})
+    return pd.DataFrame(results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare forecast engines on wall time and accuracy.")
+    parser.add_argument("--stores", type=int, default=5)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--days-ahead", type=int, default=30)
+    parser.add_argument("--cutoffs", type=int, default=1, help="Rolling-origin cutoffs per engine")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for the backtest folds")
+    parser.add_argument("--engines", nargs='+', default=['prophet', 'fast'], choices=list(FORECAST_ENGINES))
+    args = parser.parse_args()
+
+    report = run_benchmark(args.stores, args.days, args.days_ahead, args.workers, args.engines, args.cutoffs)
+    print(report.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
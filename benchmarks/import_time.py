@@ -0,0 +1,88 @@
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+from pipeline_scaling import git_commit, RESULTS_DIR
+
+# Import-time profile of the dashboard and the src modules.
+# Each target is imported in a fresh interpreter with `python -X importtime`, so the numbers
+# are cold-start costs. The report lists total import time, the slowest top-level imports and
+# which heavy backends were loaded; heavy backends should only appear once they are used.
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+
+HEAVY_MODULES = ['prophet', 'cmdstanpy', 'pulp', 'scipy', 'sqlalchemy', 'plotly', 'streamlit', 'pyarrow']
+SRC_MODULES = ['data_gen', 'forecast', 'fast_forecast', 'optimize', 'scenarios', 'data_access',
+               'local_store', 'migrate_db', 'pipeline', 'engines', 'downsample', 'result_cache', 'simulation',
+               'demand_scenarios', 'schema', 'jobs', 'backtest']
+
+def app_import_statements(app_path=os.path.join(PROJECT_ROOT, 'app.py')):
+    """
+    The module-level import statements of app.py, i.e. what every cold start pays for.
+    """
+    with open(app_path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+def profile_imports(statements, top=10):
+    """
+    Run the import statements in a fresh interpreter under -X importtime.
+    Returns total seconds, the slowest top-level imports and the heavy modules loaded.
+    """
+    code = '\n'.join(statements + [
+        'import sys, json',
+        f'print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))',
+    ])
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([SRC_DIR, os.environ.get('PYTHONPATH', '')]))
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True,
+                          cwd=PROJECT_ROOT, env=env)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    # Lines: "import time: <self us> | <cumulative us> | <indent><module>"; no indent = top level
+    top_level = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):
+            top_level.append((name.strip(), int(cumulative) / 1e6))
+    slowest = sorted(top_level, key=lambda item: item[1], reverse=True)[:top]
+    return {
+        'seconds': round(sum(seconds for _, seconds in top_level), 4),
+        'slowest': [{'module': name, 'seconds': round(seconds, 4)} for name, seconds in slowest],
+        'heavy_loaded': json.loads(proc.stdout.strip().splitlines()[-1]),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of the dashboard and src modules.")
+    parser.add_argument("--modules", nargs='+', default=SRC_MODULES, help="src modules to profile individually")
+    parser.add_argument("--output", default=None,
+                        help="JSON output path (default: benchmarks/results/import_time_<commit>.json)")
+    parser.add_argument("--max-app-seconds", type=float, default=None,
+                        help="Exit with an error if the dashboard's imports take longer than this")
+    args = parser.parse_args()
+
+    results = {'app': profile_imports(app_import_statements())}
+    for module in args.modules:
+        results[module] = profile_imports([f'import {module}'])
+
+    for target, result in results.items():
+        print(f"{target:<15} {result['seconds']:7.3f}s  heavy: {', '.join(result['heavy_loaded']) or '-'}")
+    print("\nSlowest imports at dashboard start:")
+    for item in results['app']['slowest']:
+        print(f"  {item['module']:<30} {item['seconds']:7.3f}s")
+
+    commit = git_commit()
+    output = args.output or os.path.join(RESULTS_DIR, f'import_time_{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'commit': commit, 'python': sys.version.split()[0], 'results': results}, f, indent=2)
+    print(f"\nResults saved to: {output}")
+
+    if args.max_app_seconds is not None and results['app']['seconds'] > args.max_app_seconds:
+        sys.exit(f"Dashboard import time {results['app']['seconds']:.3f}s exceeds {args.max_app_seconds:.3f}s")
@@ -0,0 +1,234 @@
+import pandas as pd
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+# Add source directory to system path to import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from data_gen import generate_sales_data, generate_missing_days
+from forecast import train_forecast_model, get_model_events, round_forecast
+from fast_forecast import fast_forecast_all_stores
+from optimize import make_network, optimize_distribution, optimize_network, optimize_newsvendor, shipping_costs_for
+import calendar_events
+import local_store
+import schema
+
+# Scaling benchmark for the whole pipeline: generate -> forecast -> optimize -> DB upload.
+# Every stage is timed (wall clock) and its peak Python heap is tracked with tracemalloc.
+# Results are written as JSON (one file per commit by default) so runs can be compared.
+
+DEFAULT_STORE_COUNTS = [5, 50, 500, 5000]
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+def measure(fn, *args, **kwargs):
+    """
+    Run fn once. Returns (result, seconds, peak traced memory in MB).
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def _upload(engine, history, forecast, loader):
+    """
+    Full upload of both tables. On PostgreSQL this is what migrate_db.py runs: sync_full
+    (to_sql, then keys, indexes and rollups) or the COPY loader. Other databases (the default
+    SQLite file) cannot run those paths and only get a plain to_sql baseline.
+    """
+    import migrate_db
+
+    if engine.dialect.name != 'postgresql':
+        history.to_sql('sales_history', engine, if_exists='replace', index=False)
+        forecast.to_sql('forecast_results', engine, if_exists='replace', index=False)
+        return {'rows': len(history) + len(forecast)}
+
+    if loader == 'to_sql':
+        migrate_db.sync_full(engine, history, forecast)
+        return {'rows': len(history) + len(forecast)}
+
+    # COPY loader: stage the frames as local Parquet datasets, then stream them in
+    with tempfile.TemporaryDirectory() as data_dir:
+        local_store.write_dataset(history, 'sales_history', data_dir=data_dir)
+        local_store.write_dataset(forecast, 'forecast_results', data_dir=data_dir)
+        stats = [migrate_db.copy_load_file(engine, table, local_store.dataset_path(table, data_dir))
+                 for table in ['sales_history', 'forecast_results']]
+    return {'rows': sum(s['rows'] for s in stats), 'bytes_sent': sum(s['bytes_sent'] for s in stats)}
+
+def _sync_incremental(engine, history, forecast):
+    """
+    Nightly incremental publish (PostgreSQL only): one new day per store past the uploaded history.
+    """
+    import migrate_db
+
+    latest = history.groupby('Store', observed=True)['Date'].max()
+    new_day = generate_missing_days(latest, end_date=latest.max() + pd.Timedelta(days=1))
+    migrate_db.sync_incremental(engine, pd.concat([history, new_day], ignore_index=True), forecast)
+    return {'rows': len(new_day) + len(forecast)}
+
+def run_case(n_stores, days, days_ahead, prophet_stores=5, solvers=('auto',), db_url=None, loaders=('to_sql',)):
+    """
+    Benchmark every stage for one (stores, days, days_ahead) case.
+    Returns a list of result records.
+    """
+    case = {'stores': n_stores, 'days': days, 'days_ahead': days_ahead}
+    records = []
+
+    def record(stage, seconds, peak_mb, **extra):
+        records.append({'stage': stage, **case, 'seconds': round(seconds, 4), 'peak_mb': round(peak_mb, 2), **extra})
+        print(f"  {stage:<24} {seconds:9.3f}s {peak_mb:9.1f} MB  {extra if extra else ''}")
+
+    # 1. Generate
+    history, seconds, peak = measure(generate_sales_data, days=days, n_stores=n_stores)
+    record('generate', seconds, peak, rows=len(history), frame_mb=round(schema.memory_bytes(history) / 1e6, 2),
+           bytes_per_row=round(schema.bytes_per_row(history), 2))
+
+    # Nightly incremental generation: one missing day per store, as `pipeline.py` appends it
+    latest = history.groupby('Store', observed=True)['Date'].max() - pd.Timedelta(days=1)
+    new_day, seconds, peak = measure(generate_missing_days, latest)
+    record('generate_append_day', seconds, peak, rows=len(new_day))
+
+    # 2. Forecast: batched engine on every store, Prophet on a sample (cost is linear per store)
+    events = get_model_events(history['Date'].min(), history['Date'].max())
+    forecast, seconds, peak = measure(fast_forecast_all_stores, history, days_ahead=days_ahead, events=events)
+    record('forecast_fast', seconds, peak, rows=len(forecast))
+
+    if prophet_stores:
+        sample = sorted(history['Store'].unique())[:prophet_stores]
+        sample_history = history[history['Store'].isin(sample)]
+        _, seconds, peak = measure(
+            lambda: [train_forecast_model(sample_history, s, days_ahead=days_ahead, events=events) for s in sample])
+        record('forecast_prophet', seconds, peak, fitted_stores=len(sample),
+               seconds_per_store=round(seconds / len(sample), 4),
+               projected_seconds=round(seconds / len(sample) * n_stores, 1))
+
+    # 3. Optimize the first forecast day at 80% stock
+    forecast = round_forecast(forecast)
+    record('forecast_frame', 0.0, 0.0, rows=len(forecast), frame_mb=round(schema.memory_bytes(forecast) / 1e6, 2),
+           bytes_per_row=round(schema.bytes_per_row(forecast), 2))
+    daily_demand = forecast[forecast['Date'] == forecast['Date'].min()]
+    costs = shipping_costs_for(daily_demand['Store'])
+    stock = int(daily_demand['Predicted_Demand'].sum() * 0.8)
+    for solver in solvers:
+        _, seconds, peak = measure(optimize_distribution, daily_demand, stock, costs, solver=solver)
+        record(f'optimize_{solver}', seconds, peak)
+
+    # Same day and stock held in three warehouses (sparse transportation model)
+    capacity, lane_costs = make_network(daily_demand['Store'], stock, n_warehouses=3)
+    (_, _, stats), seconds, peak = measure(optimize_network, daily_demand, capacity, lane_costs)
+    record('optimize_network', seconds, peak, warehouses=len(capacity), variables=stats['variables'],
+           build_seconds=round(stats['build_seconds'], 4), solve_seconds=round(stats['solve_seconds'], 4))
+
+    # Scenario-based plan for every store-day, as the nightly pipeline computes it
+    daily_stock = (forecast.groupby('Date')['Predicted_Demand'].sum() * 0.8).astype(int)
+    _, seconds, peak = measure(optimize_newsvendor, forecast, daily_stock, shipping_costs_for(forecast['Store'].unique()))
+    record('optimize_newsvendor', seconds, peak, store_days=len(forecast))
+
+    # 4. Upload to the stand-in database
+    if db_url:
+        from sqlalchemy import create_engine
+
+        engine = create_engine(db_url)
+        if engine.dialect.name == 'postgresql':
+            for loader in loaders:
+                stats, seconds, peak = measure(_upload, engine, history, forecast, loader)
+                record('upload_sync_full' if loader == 'to_sql' else f'upload_{loader}', seconds, peak, **stats)
+            stats, seconds, peak = measure(_sync_incremental, engine, history, forecast)
+            record('upload_sync_incremental', seconds, peak, **stats)
+        else:
+            # Not the migrate_db paths: a lower bound for comparison across runs only
+            stats, seconds, peak = measure(_upload, engine, history, forecast, 'to_sql')
+            record('upload_to_sql_baseline', seconds, peak, **stats)
+        engine.dispose()
+    return records
+
+def compare(current, baseline_path):
+    """
+    Print the seconds / peak memory ratio of each record against a previous results file.
+    """
+    with open(baseline_path) as f:
+        baseline = pd.DataFrame(json.load(f)['results'])
+    keys = ['stage', 'stores', 'days', 'days_ahead']
+    merged = pd.DataFrame(current).merge(baseline, on=keys, suffixes=('', '_base'))
+    merged['time_ratio'] = merged['seconds'] / merged['seconds_base']
+    merged['memory_ratio'] = merged['peak_mb'] / merged['peak_mb_base']
+    print(merged[keys + ['seconds', 'seconds_base', 'time_ratio', 'peak_mb', 'memory_ratio']]
+          .to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time and memory-profile the pipeline across network sizes.")
+    parser.add_argument("--stores", type=int, nargs='+', default=DEFAULT_STORE_COUNTS)
+    parser.add_argument("--days", type=int, nargs='+', default=[730], help="History lengths to simulate")
+    parser.add_argument("--days-ahead", type=int, nargs='+', default=[30], help="Forecast horizons")
+    parser.add_argument("--prophet-stores", type=int, default=5,
+                        help="Stores fitted with Prophet per case (0 to skip); the total is projected")
+    parser.add_argument("--solvers", nargs='+', default=['auto'], choices=['auto', 'greedy', 'lp'])
+    parser.add_argument("--db-url", default=None,
+                        help="Stand-in database for the upload stage (default: a temporary SQLite file, timed as a "
+                             "plain to_sql baseline; 'none' to skip). A local PostgreSQL URL times the "
+                             "migrate_db.py paths and enables --loaders copy.")
+    parser.add_argument("--loaders", nargs='+', default=['to_sql'], choices=['to_sql', 'copy'])
+    parser.add_argument("--output", default=None, help="JSON output path (default: benchmarks/results/pipeline_<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Previous results JSON to compare against")
+    parser.add_argument("--max-bytes-per-row", type=float, default=None,
+                        help="Exit with an error if the history or forecast frame uses more memory per row")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Generated stores and the event calendar go to scratch files, not data/
+        schema.use_data_dir(tmp)
+        os.environ[calendar_events.CALENDAR_DIR_ENV] = os.path.join(tmp, 'calendar')
+        db_url = args.db_url or f"sqlite:///{os.path.join(tmp, 'benchmark.db')}"
+        db_url = None if db_url == 'none' else db_url
+
+        results = []
+        for days in args.days:
+            for days_ahead in args.days_ahead:
+                for n_stores in args.stores:
+                    print(f"stores={n_stores} days={days} days_ahead={days_ahead}")
+                    results += run_case(n_stores, days, days_ahead, args.prophet_stores, args.solvers,
+                                        db_url, args.loaders)
+
+    report = {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'args': vars(args),
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f'pipeline_{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"Results saved to: {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+    if args.max_bytes_per_row is not None:
+        over = [r for r in results if r.get('bytes_per_row', 0) > args.max_bytes_per_row]
+        if over:
+            sys.exit("Frame memory over budget: " + ", ".join(
+                f"{r['stage']} ({r['stores']} stores) {r['bytes_per_row']} bytes/row" for r in over))
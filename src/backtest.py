@@ -0,0 +1,302 @@
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import hashlib
+import os
+import time
+
+import engines
+import instrumentation
+import local_store
+import model_store
+
+# Rolling-origin backtest of the forecast engines.
+# For every cutoff, an engine is trained on the history up to the cutoff and scored on the
+# next `horizon` days: MAPE, WAPE and bias per store, pooled over cutoffs.
+# - Cutoffs lie on a fixed calendar grid (every `period` days), so when the history grows
+#   the existing cutoffs stay put and only new ones have to be computed.
+# - Fold results are cached in data/backtest_folds.csv, keyed by engine configuration,
+#   cutoff, horizon, store and a hash of the store's data up to the end of the fold.
+#   Reruns only fit folds that are new or whose data changed.
+# - Folds run in parallel across stores and cutoffs on a process pool. Per-store engines
+#   get one task per (cutoff, store); batched engines one task per cutoff with every store.
+# - One holiday frame (forecast.get_model_events) is built for the whole run and shared
+#   by every fold, as in forecast.py.
+# Any engine in engines.FORECAST_ENGINES can be backtested, so engines are compared on the
+# same cutoffs, data and metrics.
+
+FOLDS_PATH = os.path.join(local_store.DATA_DIR, 'backtest_folds.csv')
+
+# Fold key and additive error sums (pooled over cutoffs before computing the metrics)
+KEY_COLUMNS = ['Engine', 'Config', 'Horizon', 'Cutoff', 'Store']
+SUM_COLUMNS = ['Points', 'Actual', 'Abs_Error', 'Error', 'APE_Sum', 'APE_Count', 'Fit_Seconds']
+
+def make_cutoffs(dates, horizon=30, n_cutoffs=3, period=None, initial_days=365):
+    """
+    The latest n_cutoffs cutoffs that leave `horizon` days of actuals after them and at least
+    initial_days of training history before them. Cutoffs are days divisible by `period`
+    (default: horizon) counted from 1970-01-01, so they do not move as the history grows.
+    """
+    dates = pd.to_datetime(pd.Series(dates))
+    period = period or horizon
+    latest = dates.max().normalize() - pd.Timedelta(days=horizon)
+    earliest = dates.min().normalize() + pd.Timedelta(days=initial_days)
+    # Snap the latest usable cutoff down to the grid
+    day = (latest - pd.Timestamp(0)).days
+    latest = latest - pd.Timedelta(days=day % period)
+    cutoffs = [latest - pd.Timedelta(days=period * i) for i in range(n_cutoffs)]
+    return sorted(c for c in cutoffs if c >= earliest)
+
+def engine_config(engine_name, options=None):
+    """
+    Short hash of everything besides the data that a fold result depends on.
+    """
+    from forecast import MODEL_CONFIG
+
+    return model_store.hash_config({'engine': engine_name, 'spec': engines.FORECAST_ENGINES[engine_name],
+                                    'options': options or {}, 'model': MODEL_CONFIG})[:12]
+
+def fold_data_hashes(history, cutoffs, horizon):
+    """
+    {(cutoff, store): hash of the store's Date/Sales rows up to cutoff + horizon}:
+    a fold's training data and actuals. Unchanged when later days are appended.
+    """
+    hashes = {}
+    ends = [(cutoff, (cutoff + pd.Timedelta(days=horizon)).value) for cutoff in cutoffs]
+    for store, group in history.groupby('Store', observed=True, sort=False):
+        group = group.sort_values('Date')
+        dates = group['Date'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        sales = group['Sales'].to_numpy(dtype=np.int64)
+        for cutoff, end in ends:
+            n = np.searchsorted(dates, end, side='right')
+            h = hashlib.sha256()
+            h.update(np.ascontiguousarray(dates[:n]).tobytes())
+            h.update(np.ascontiguousarray(sales[:n]).tobytes())
+            hashes[(cutoff, str(store))] = h.hexdigest()[:16]
+    return hashes
+
+def score_stores(forecast_df, actual_df):
+    """
+    Error sums per store of a forecast against actuals (same Date/Store):
+    Points, Actual, Abs_Error, Error (forecast - actual) and the absolute percentage
+    error summed over days with non-zero sales (APE_Sum / APE_Count).
+    """
+    forecast_df = forecast_df.assign(Store=forecast_df['Store'].astype(str), Date=pd.to_datetime(forecast_df['Date']))
+    actual_df = actual_df.assign(Store=actual_df['Store'].astype(str), Date=pd.to_datetime(actual_df['Date']))
+    merged = forecast_df[['Date', 'Store', 'Predicted_Demand']].merge(actual_df[['Date', 'Store', 'Sales']],
+                                                                      on=['Date', 'Store'])
+    actual = merged['Sales'].astype(np.float64)
+    error = merged['Predicted_Demand'].astype(np.float64) - actual
+    nonzero = actual > 0
+    merged = merged.assign(Points=1, Actual=actual, Abs_Error=error.abs(), Error=error,
+                           APE_Sum=np.where(nonzero, error.abs() / actual.where(nonzero, 1.0), 0.0),
+                           APE_Count=nonzero.astype(np.int64))
+    return merged.groupby('Store', sort=False)[SUM_COLUMNS[:-1]].sum().reset_index()
+
+def _fold_worker(engine_name, cutoff, horizon, history, events, options):
+    """
+    Process pool entry point: fit one fold (history up to cutoff) and score its next horizon days.
+    Never raises. Returns (per-store scores or None, error message or None, seconds).
+    """
+    from forecast import round_forecast
+
+    start = time.perf_counter()
+    try:
+        train = history[history['Date'] <= cutoff]
+        actual = history[(history['Date'] > cutoff) & (history['Date'] <= cutoff + pd.Timedelta(days=horizon))]
+        engine = engines.get_forecast_engine(engine_name)
+        forecast = engine(train, days_ahead=horizon, events=events, **options)
+        # Scored as shipped: whole, non-negative units
+        return score_stores(round_forecast(forecast), actual), None, time.perf_counter() - start
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+def load_folds(path=FOLDS_PATH):
+    """
+    Cached fold results (an empty frame if there are none).
+    """
+    if path is None or not os.path.exists(path):
+        empty = pd.DataFrame(columns=KEY_COLUMNS + ['Data_Hash'] + SUM_COLUMNS)
+        return empty.astype({'Horizon': np.int64, 'Cutoff': 'datetime64[ns]',
+                             **{col: np.float64 for col in SUM_COLUMNS}})
+    return pd.read_csv(path, parse_dates=['Cutoff'], dtype={'Store': str, 'Config': str, 'Data_Hash': str})
+
+def save_folds(folds, path=FOLDS_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    folds.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+def run_backtest(df, engine='prophet', horizon=30, cutoffs=None, n_cutoffs=3, period=None, initial_days=365,
+                 workers=1, events=None, options=None, stores_per_task=None, cache_path=FOLDS_PATH, progress=None):
+    """
+    Rolling-origin backtest of one forecast engine on a Date / Store / Sales history.
+
+    cutoffs: explicit cutoff dates, else make_cutoffs(df['Date'], horizon, n_cutoffs, period, initial_days).
+    options: extra keyword arguments for the engine.
+    stores_per_task: stores fitted per pool task (default: all for engines.BATCHED_ENGINES, else 1).
+    cache_path: CSV of fold results reused across runs (None disables the cache).
+    progress(done, total, label), if given, is called as each task finishes.
+    Engines are looked up by name in every worker, so with workers > 1 they must be
+    registered as 'module:function'.
+
+    Returns one row per (cutoff, store): the fold key, its data hash and its error sums
+    (see summarize_backtest for the metrics). Failed folds are left out and reported
+    through instrumentation.
+    """
+    from forecast import get_model_events
+
+    options = dict(options or {})
+    history = df[['Date', 'Store', 'Sales']].copy()
+    history['Date'] = pd.to_datetime(history['Date'])
+    if cutoffs is None:
+        cutoffs = make_cutoffs(history['Date'], horizon, n_cutoffs, period, initial_days)
+    cutoffs = sorted(pd.Timestamp(c).normalize() for c in cutoffs)
+    if not cutoffs:
+        raise ValueError(f"History too short for a {horizon}-day backtest after {initial_days} days of training")
+    config = engine_config(engine, options)
+    hashes = fold_data_hashes(history, cutoffs, horizon)
+
+    # 1. Reuse cached folds whose key and data hash still match
+    cached = load_folds(cache_path)
+    wanted = pd.DataFrame([(engine, config, horizon, cutoff, store, data_hash)
+                           for (cutoff, store), data_hash in hashes.items()],
+                          columns=KEY_COLUMNS + ['Data_Hash'])
+    reused = wanted.merge(cached, on=KEY_COLUMNS + ['Data_Hash'], how='inner')
+    done_keys = set(zip(reused['Cutoff'], reused['Store']))
+    missing = [key for key in hashes if key not in done_keys]
+
+    # 2. Tasks: the stores still missing for each cutoff, in blocks of stores_per_task
+    if stores_per_task is None:
+        stores_per_task = len(hashes) if engine in engines.BATCHED_ENGINES else 1
+    slices = {str(store): group for store, group in history.groupby('Store', observed=True, sort=False)}
+    tasks = []
+    for cutoff in cutoffs:
+        stores = [store for c, store in missing if c == cutoff]
+        for start in range(0, len(stores), max(1, stores_per_task)):
+            block = stores[start:start + max(1, stores_per_task)]
+            end = cutoff + pd.Timedelta(days=horizon)
+            block_history = pd.concat([slices[s][slices[s]['Date'] <= end] for s in block], ignore_index=True)
+            tasks.append((cutoff, block, block_history))
+
+    # 3. One holiday frame for every fold
+    if tasks and events is None:
+        # Cached next to the fold results; without a fold cache, nothing is written to disk
+        events = get_model_events(history['Date'].min(), history['Date'].max(),
+                                  data_dir=os.path.dirname(os.path.abspath(cache_path)) if cache_path else None,
+                                  cache=bool(cache_path))
+
+    def collect(cutoff, block, outcome, rows):
+        scores, err, seconds = outcome
+        instrumentation.record('backtest_fold', engine=engine, cutoff=str(cutoff.date()), stores=len(block),
+                               seconds=round(seconds, 6), error=err)
+        if err is not None:
+            print(f"   - {engine} cutoff {cutoff.date()} ({len(block)} stores): failed ({err})")
+            return
+        scores = scores.assign(Engine=engine, Config=config, Horizon=horizon, Cutoff=cutoff,
+                               Fit_Seconds=seconds / len(block))
+        scores['Data_Hash'] = [hashes[(cutoff, store)] for store in scores['Store']]
+        rows.append(scores)
+
+    new_rows = []
+    if workers <= 1:
+        for i, (cutoff, block, block_history) in enumerate(tasks):
+            collect(cutoff, block, _fold_worker(engine, cutoff, horizon, block_history, events, options), new_rows)
+            if progress is not None:
+                progress(i + 1, len(tasks), f"{cutoff.date()}")
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_fold_worker, engine, cutoff, horizon, block_history, events, options):
+                       (cutoff, block) for cutoff, block, block_history in tasks}
+            try:
+                for i, future in enumerate(as_completed(futures)):
+                    cutoff, block = futures[future]
+                    collect(cutoff, block, future.result(), new_rows)
+                    if progress is not None:
+                        progress(i + 1, len(tasks), f"{cutoff.date()}")
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    computed = (pd.concat(new_rows, ignore_index=True)[KEY_COLUMNS + ['Data_Hash'] + SUM_COLUMNS]
+                if new_rows else reused.iloc[0:0])
+    folds = pd.concat([reused, computed], ignore_index=True)
+
+    # 4. Store new folds; a fold recomputed on changed data replaces its old entry
+    if cache_path and new_rows:
+        save_folds(pd.concat([cached, computed], ignore_index=True)
+                   .drop_duplicates(subset=KEY_COLUMNS, keep='last'), cache_path)
+    print(f"   - {engine}: {len(cutoffs)} cutoffs x {len(slices)} stores, "
+          f"{len(reused)} folds cached, {len(computed)} computed in {len(tasks)} tasks")
+    return folds.sort_values(['Cutoff', 'Store'], kind='stable').reset_index(drop=True)
+
+def summarize_backtest(folds, by=('Engine', 'Store')):
+    """
+    MAPE, WAPE and bias (in %) pooled over the folds of each group, with the number of
+    cutoffs and the fit time spent on the group.
+    """
+    by = list(by)
+    groups = folds.groupby(by, observed=True, sort=True)
+    sums = groups[SUM_COLUMNS].sum()
+    return pd.DataFrame({
+        'Cutoffs': groups['Cutoff'].nunique(),
+        'Points': sums['Points'].astype(np.int64),
+        'MAPE': 100 * sums['APE_Sum'] / sums['APE_Count'].where(sums['APE_Count'] > 0),
+        'WAPE': 100 * sums['Abs_Error'] / sums['Actual'].where(sums['Actual'] > 0),
+        'Bias': 100 * sums['Error'] / sums['Actual'].where(sums['Actual'] > 0),
+        'Fit_Seconds': sums['Fit_Seconds'],
+    }).reset_index()
+
+def compare_engines(df, engine_names=('prophet', 'fast'), **kwargs):
+    """
+    Backtest several engines on the same cutoffs and data. Returns (folds, per-engine summary).
+    """
+    if kwargs.get('cutoffs') is None:
+        kwargs['cutoffs'] = make_cutoffs(df['Date'], kwargs.get('horizon', 30), kwargs.pop('n_cutoffs', 3),
+                                         kwargs.pop('period', None), kwargs.pop('initial_days', 365))
+    folds = pd.concat([run_backtest(df, engine=name, **kwargs) for name in engine_names], ignore_index=True)
+    return folds, summarize_backtest(folds, by=['Engine'])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the forecast engines.")
+    parser.add_argument("--engines", nargs='+', choices=list(engines.FORECAST_ENGINES), default=['prophet'],
+                        help="Engines to backtest on the same cutoffs")
+    parser.add_argument("--horizon", type=int, default=30, help="Days scored after each cutoff")
+    parser.add_argument("--cutoffs", type=int, default=3, help="Number of cutoffs (latest first)")
+    parser.add_argument("--period", type=int, default=None, help="Days between cutoffs (default: horizon)")
+    parser.add_argument("--initial-days", type=int, default=365, help="Minimum training history before a cutoff")
+    parser.add_argument("--stores", nargs='+', default=None, help="Only these stores (default: all)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--no-cache", action="store_true", help="Refit every fold (and do not update the cache)")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.configure_from_args(args)
+
+    try:
+        with instrumentation.span('load') as span:
+            df = local_store.read_dataset('sales_history', columns=['Date', 'Store', 'Sales'], stores=args.stores)
+            span['rows'] = len(df)
+    except FileNotFoundError as e:
+        print(f"Error: {e}. Please run data_gen.py first.")
+        exit()
+
+    with instrumentation.span('backtest', engines=','.join(args.engines), workers=args.workers):
+        folds, summary = compare_engines(df, args.engines, horizon=args.horizon, n_cutoffs=args.cutoffs,
+                                         period=args.period, initial_days=args.initial_days, workers=args.workers,
+                                         cache_path=None if args.no_cache else FOLDS_PATH)
+
+    fmt = lambda x: f"{x:.2f}"
+    print(f"\nCutoffs: {', '.join(str(c.date()) for c in sorted(folds['Cutoff'].unique()))}")
+    print(summarize_backtest(folds).to_string(index=False, float_format=fmt))
+    print()
+    print(summary.to_string(index=False, float_format=fmt))
+
+    output_path = os.path.join(local_store.DATA_DIR, 'backtest_summary.csv')
+    summarize_backtest(folds).to_csv(output_path, index=False)
+    print(f"Summary saved to: {output_path}")
+
+    if args.metrics:
+        print(f"Metrics written to: {instrumentation.write_metrics(args.metrics, script='backtest')}")
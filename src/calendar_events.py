@@ -0,0 +1,123 @@
+import pandas as pd
+import numpy as np
+import glob
+import os
+import uuid
+
+# Shared event/holiday calendar for the forecasting models.
+# Built once per run with vectorized date arithmetic and cached on disk,
+# so every store's Prophet model receives the same holidays frame.
+# The cache lives in <data_dir>/calendar; without a data_dir, in $CALENDAR_DIR if set,
+# else data/calendar.
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+DEFAULT_CALENDAR_DIR = os.path.join(project_root, 'data', 'calendar')
+CALENDAR_DIR_ENV = 'CALENDAR_DIR'
+
+def calendar_dir_for(data_dir=None):
+    """
+    Calendar cache directory for a data directory (or the $CALENDAR_DIR / project default).
+    """
+    if data_dir is not None:
+        return os.path.join(os.fspath(data_dir), 'calendar')
+    return os.getenv(CALENDAR_DIR_ENV) or DEFAULT_CALENDAR_DIR
+
+def special_events(dates):
+    """
+    Vectorized Payday / DoubleDay events for the given dates.
+    Returns a DataFrame with Prophet's holiday columns: 'ds' and 'holiday'.
+    """
+    dates = pd.DatetimeIndex(dates)
+    day = dates.day.to_numpy()
+    month = dates.month.to_numpy()
+
+    event = np.full(len(dates), None, dtype=object)
+    # Payday
+    event[(day >= 25) & (day <= 31)] = 'Payday'
+    # Double Day
+    event[day == month] = 'DoubleDay'
+
+    mask = pd.notna(event)
+    return pd.DataFrame({'ds': dates[mask], 'holiday': event[mask]})
+
+def country_holidays(start, end, country='TH'):
+    """
+    Public holidays for a country between start and end (inclusive).
+    Same frame as prophet.make_holidays.make_holidays_df, without importing Prophet.
+    """
+    import holidays
+
+    years = list(range(pd.Timestamp(start).year, pd.Timestamp(end).year + 1))
+    country_cal = holidays.country_holidays(country, expand=False, language='en_US', years=years)
+
+    holidays_df = pd.DataFrame(
+        [(date, country_cal.get_list(date)) for date in country_cal],
+        columns=['ds', 'holiday'],
+    ).explode('holiday')
+    holidays_df['ds'] = pd.to_datetime(holidays_df['ds'])
+    return holidays_df.reset_index(drop=True)
+
+def build_event_calendar(start, end, country='TH'):
+    """
+    Compute the full events frame (Payday, DoubleDay and country holidays) for a date range.
+    """
+    dates = pd.date_range(start=pd.Timestamp(start).normalize(), end=pd.Timestamp(end).normalize(), freq='D')
+    frames = [special_events(dates)]
+    if country:
+        holidays_df = country_holidays(dates.min(), dates.max(), country)
+        frames.append(holidays_df[(holidays_df['ds'] >= dates.min()) & (holidays_df['ds'] <= dates.max())])
+
+    events = pd.concat(frames, ignore_index=True)
+    return events.sort_values(['ds', 'holiday'], kind='stable').reset_index(drop=True)
+
+def _cache_files(calendar_dir, country):
+    pattern = os.path.join(calendar_dir, f"events_{country or 'none'}_*_*.csv")
+    for path in glob.glob(pattern):
+        try:
+            _, _, start, end = os.path.basename(path)[:-len('.csv')].rsplit('_', 3)
+            yield path, pd.Timestamp(start), pd.Timestamp(end)
+        except ValueError:
+            continue
+
+def get_event_calendar(start, end, country='TH', calendar_dir=None, data_dir=None, cache=True):
+    """
+    Return the events frame for [start, end], served from the on-disk cache when it covers the range.
+    The cache is built for whole calendar years, so daily runs keep hitting the same file.
+    calendar_dir defaults to calendar_dir_for(data_dir). Pass cache=False to skip the disk cache.
+    """
+    start = pd.Timestamp(start).normalize()
+    end = pd.Timestamp(end).normalize()
+    calendar_dir = (calendar_dir or calendar_dir_for(data_dir)) if cache else None
+
+    events = None
+    if calendar_dir is not None:
+        for path, cached_start, cached_end in _cache_files(calendar_dir, country):
+            if cached_start <= start and end <= cached_end:
+                try:
+                    events = pd.read_csv(path, parse_dates=['ds'])
+                    break
+                except FileNotFoundError:
+                    continue  # Removed by another process in the meantime
+
+    if events is None:
+        year_start = pd.Timestamp(year=start.year, month=1, day=1)
+        year_end = pd.Timestamp(year=end.year, month=12, day=31)
+        events = build_event_calendar(year_start, year_end, country)
+        if calendar_dir is not None:
+            os.makedirs(calendar_dir, exist_ok=True)
+            path = os.path.join(calendar_dir, f"events_{country or 'none'}_{year_start:%Y%m%d}_{year_end:%Y%m%d}.csv")
+            # Unique temp name: worker processes may build the same range concurrently
+            tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+            events.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, path)
+            # Only files whose range the new file fully covers are superseded
+            for old_path, old_start, old_end in list(_cache_files(calendar_dir, country)):
+                if old_path != path and year_start <= old_start and old_end <= year_end:
+                    try:
+                        os.remove(old_path)
+                    except FileNotFoundError:
+                        pass
+
+    mask = (events['ds'] >= start) & (events['ds'] <= end)
+    return events.loc[mask].reset_index(drop=True)
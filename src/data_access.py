@@ -0,0 +1,241 @@
+import pandas as pd
+import os
+
+import local_store
+
+# Data-access layer for the dashboard.
+# Every function takes a `source`: either a SQLAlchemy engine (Supabase / PostgreSQL),
+# where filters and aggregates are pushed down into parameterized SQL, a local Parquet
+# dataset path (OFFLINE_MODE, see local_store.py), where filters are pushed down into the
+# Parquet reader, or a DataFrame, where the same filters run in pandas.
+# Wide history ranges are served from weekly/monthly rollups instead of daily rows.
+
+ROLLUP_VIEWS = {
+    'week': 'sales_history_weekly',
+    'month': 'sales_history_monthly',
+}
+
+# Date spans (days) above which the history chart switches to a coarser grain
+WEEKLY_THRESHOLD_DAYS = 180
+MONTHLY_THRESHOLD_DAYS = 3 * 365
+
+def choose_grain(start_date, end_date):
+    """
+    Pick 'day', 'week' or 'month' for a date range so the payload stays small.
+    """
+    span = (pd.Timestamp(end_date) - pd.Timestamp(start_date)).days
+    if span > MONTHLY_THRESHOLD_DAYS:
+        return 'month'
+    if span > WEEKLY_THRESHOLD_DAYS:
+        return 'week'
+    return 'day'
+
+def _is_frame(source):
+    return isinstance(source, pd.DataFrame)
+
+def _is_dataset(source):
+    return isinstance(source, (str, os.PathLike))
+
+def _read_dataset(source, **kwargs):
+    path = os.fspath(source)
+    return local_store.read_dataset(os.path.basename(path), data_dir=os.path.dirname(path), **kwargs)
+
+def _text(sql):
+    # SQLAlchemy is only needed for database sources, so it is imported on first use
+    from sqlalchemy import text as sql_text
+
+    return sql_text(sql)
+
+def _read_sql(engine, sql, params=None):
+    with engine.connect() as conn:
+        return pd.read_sql(_text(sql), conn, params=params or {})
+
+# --- Rollups (materialized views) ---
+
+def ensure_rollups(engine):
+    """
+    Create the weekly/monthly materialized views over sales_history (if missing)
+    with unique keys, so they can be refreshed without blocking readers.
+    """
+    with engine.begin() as conn:
+        for grain, view in ROLLUP_VIEWS.items():
+            conn.execute(_text(
+                f'CREATE MATERIALIZED VIEW IF NOT EXISTS {view} AS '
+                f'SELECT "Store", date_trunc(\'{grain}\', "Date") AS "Date", '
+                f'SUM("Sales")::bigint AS "Sales", COUNT(*) AS "Days" '
+                f'FROM sales_history GROUP BY 1, 2'
+            ))
+            conn.execute(_text(f'CREATE UNIQUE INDEX IF NOT EXISTS {view}_key ON {view} ("Store", "Date")'))
+
+def refresh_rollups(engine):
+    """
+    Bring the rollups up to date after sales_history changed.
+    """
+    ensure_rollups(engine)
+    with engine.begin() as conn:
+        for view in ROLLUP_VIEWS.values():
+            conn.execute(_text(f'REFRESH MATERIALIZED VIEW CONCURRENTLY {view}'))
+
+def drop_rollups(engine):
+    """
+    Drop the rollups, e.g. before sales_history itself is dropped and recreated.
+    """
+    with engine.begin() as conn:
+        for view in ROLLUP_VIEWS.values():
+            conn.execute(_text(f'DROP MATERIALIZED VIEW IF EXISTS {view}'))
+
+# --- History ---
+
+def get_history_bounds(source):
+    """
+    Stores and date range available in the sales history: (stores, min_date, max_date).
+    """
+    if _is_dataset(source):
+        source = _read_dataset(source, columns=['Date', 'Store'])
+    if _is_frame(source):
+        return sorted(source['Store'].unique()), source['Date'].min(), source['Date'].max()
+
+    df = _read_sql(source, 'SELECT "Store", MIN("Date") AS min_date, MAX("Date") AS max_date '
+                           'FROM sales_history GROUP BY "Store" ORDER BY "Store"')
+    return df['Store'].tolist(), pd.Timestamp(df['min_date'].min()), pd.Timestamp(df['max_date'].max())
+
+def query_history(source, stores, start_date, end_date, grain='day'):
+    """
+    Sales for the given stores between start_date and end_date (inclusive),
+    at 'day', 'week' or 'month' grain. Returns Date / Store / Sales.
+    """
+    start_date = pd.Timestamp(start_date)
+    end_date = pd.Timestamp(end_date)
+    stores = list(stores)
+    if not stores:
+        return pd.DataFrame(columns=['Date', 'Store', 'Sales'])
+
+    if _is_dataset(source):
+        # Read only the requested stores and the days of the whole periods covering the range
+        first, last = start_date, end_date
+        if grain != 'day':
+            period = 'W-SUN' if grain == 'week' else 'M'
+            first = start_date.to_period(period).start_time
+            last = end_date.to_period(period).end_time.normalize()
+        source = _read_dataset(source, stores=stores, start_date=first, end_date=last)
+    if _is_frame(source):
+        if grain == 'day':
+            mask = source['Store'].isin(stores) & (source['Date'] >= start_date) & (source['Date'] <= end_date)
+            return source.loc[mask, ['Date', 'Store', 'Sales']]
+        # Same semantics as the rollups: whole periods whose start falls in the range
+        period = 'W-SUN' if grain == 'week' else 'M'
+        df = source.loc[source['Store'].isin(stores), ['Date', 'Store', 'Sales']]
+        df = df.assign(Date=df['Date'].dt.to_period(period).dt.start_time)
+        period_start = start_date.to_period(period).start_time
+        df = df[(df['Date'] >= period_start) & (df['Date'] <= end_date)]
+        return df.groupby(['Date', 'Store'], as_index=False, observed=True)['Sales'].sum()
+
+    params = {'stores': stores, 'start_date': start_date, 'end_date': end_date}
+    if grain == 'day':
+        sql = ('SELECT "Date", "Store", "Sales" FROM sales_history '
+               'WHERE "Store" = ANY(:stores) AND "Date" BETWEEN :start_date AND :end_date '
+               'ORDER BY "Store", "Date"')
+        return _read_sql(source, sql, params)
+
+    # Periods are labelled by their start and always cover the whole period,
+    # so the first period may begin before start_date and the last may end after end_date
+    view = ROLLUP_VIEWS[grain]
+    rollup_sql = (f'SELECT "Date", "Store", "Sales" FROM {view} '
+                  f'WHERE "Store" = ANY(:stores) AND "Date" BETWEEN date_trunc(\'{grain}\', CAST(:start_date AS timestamp)) '
+                  f'AND :end_date ORDER BY "Store", "Date"')
+    try:
+        return _read_sql(source, rollup_sql, params)
+    except Exception:
+        # Rollups not created yet: aggregate on the server from the base table
+        sql = (f'SELECT date_trunc(\'{grain}\', "Date") AS "Date", "Store", SUM("Sales")::bigint AS "Sales" '
+               f'FROM sales_history WHERE "Store" = ANY(:stores) '
+               f'AND "Date" >= date_trunc(\'{grain}\', CAST(:start_date AS timestamp)) '
+               f'AND date_trunc(\'{grain}\', "Date") <= :end_date '
+               f'GROUP BY 1, 2 ORDER BY 2, 1')
+        return _read_sql(source, sql, params)
+
+# --- Forecast ---
+
+def get_forecast_dates(source):
+    """
+    Distinct forecast dates, in order.
+    """
+    if _is_dataset(source):
+        source = _read_dataset(source, columns=['Date'])
+    if _is_frame(source):
+        return list(pd.to_datetime(sorted(source['Date'].unique())))
+    df = _read_sql(source, 'SELECT DISTINCT "Date" FROM forecast_results ORDER BY "Date"')
+    return list(pd.to_datetime(df['Date']))
+
+def get_forecast_stores(source):
+    if _is_dataset(source):
+        source = _read_dataset(source, columns=['Store'])
+    if _is_frame(source):
+        return sorted(source['Store'].unique())
+    return _read_sql(source, 'SELECT DISTINCT "Store" FROM forecast_results ORDER BY "Store"')['Store'].tolist()
+
+def _table_columns(engine, table):
+    df = _read_sql(engine, 'SELECT column_name FROM information_schema.columns '
+                           'WHERE table_schema = current_schema() AND table_name = :table', {'table': table})
+    return set(df['column_name'])
+
+def query_forecast(source, stores=None, date=None):
+    """
+    Forecast rows, filtered by stores and/or a single date. Returns Date / Store / Predicted_Demand,
+    plus Predicted_Lower / Predicted_Upper where the forecast has intervals.
+    """
+    if _is_dataset(source):
+        source = _read_dataset(source, stores=stores, start_date=date, end_date=date)
+    if _is_frame(source):
+        mask = pd.Series(True, index=source.index)
+        if stores is not None:
+            mask &= source['Store'].isin(list(stores))
+        if date is not None:
+            mask &= source['Date'] == pd.Timestamp(date)
+        return source.loc[mask]
+
+    clauses, params = [], {}
+    if stores is not None:
+        clauses.append('"Store" = ANY(:stores)')
+        params['stores'] = list(stores)
+    if date is not None:
+        clauses.append('"Date" = :date')
+        params['date'] = pd.Timestamp(date)
+    where = f'WHERE {" AND ".join(clauses)} ' if clauses else ''
+    columns = ['Date', 'Store', 'Predicted_Demand']
+    columns += [col for col in local_store.EXTRA_COLUMNS['forecast_results']
+                if col in _table_columns(source, 'forecast_results')]
+    select = ', '.join(f'"{col}"' for col in columns)
+    return _read_sql(source, f'SELECT {select} FROM forecast_results {where}'
+                             f'ORDER BY "Store", "Date"', params)
+
+# --- Scenarios ---
+
+SCENARIO_COLUMNS = ['Date', 'Stock_Level_Pct', 'Cost_Multiplier', 'Cost_Pct', 'Store',
+                    'Predicted_Demand', 'Allocated_Qty', 'Shortage_Qty', 'Total_Cost']
+
+def query_scenarios(source, date=None):
+    """
+    Pre-computed what-if rows (scenarios.py) for a single date, or all dates.
+    The source is the engine, a DataFrame or the local scenario_results.csv path.
+    Returns an empty frame when no sweep has been stored.
+    """
+    if _is_dataset(source):
+        if not os.path.exists(source):
+            return pd.DataFrame(columns=SCENARIO_COLUMNS)
+        source = pd.read_csv(source, parse_dates=['Date'])
+    if _is_frame(source):
+        if date is not None:
+            source = source[source['Date'] == pd.Timestamp(date)]
+        return source.reset_index(drop=True)
+
+    where, params = '', {}
+    if date is not None:
+        where, params = 'WHERE "Date" = :date ', {'date': pd.Timestamp(date)}
+    try:
+        columns = ', '.join(f'"{col}"' for col in SCENARIO_COLUMNS)
+        return _read_sql(source, f'SELECT {columns} FROM scenario_results {where}'
+                                 f'ORDER BY "Cost_Pct", "Stock_Level_Pct", "Store"', params)
+    except Exception:
+        # Table not published yet
+        return pd.DataFrame(columns=SCENARIO_COLUMNS)
@@ -1,71 +1,251 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+import argparse
+import hashlib
 import os
 
-def generate_sales_data(days=730):
-    """
-    Simulate sales data for 5 stores over a period of 2 year.
-    Each store will have different demand patterns.
-    """
-    np.random.seed(42)  # Ensure reproducibility
-    stores = ['Store_A', 'Store_B', 'Store_C', 'Store_D', 'Store_E']
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=days)
-    
-    # Create a list of dates from (Today - 365) to Yesterday
-    dates = [start_date + timedelta(days=i) for i in range(days)]
-    
-    
-    data = []
-    
-    for store in stores:
-        # Define base demand (varies by store location)
-        base_demand = np.random.randint(50, 200) 
-        
-        for date in dates:
-            # Apply seasonality: Sales fluctuate based on the day of the week
-            # Example: Weekend sales (Fri, Sat, Sun) receive a 20% boost
-            weekday_factor = 1.2 if date.weekday() >= 5 else 0.9 
-            # Payday
-            factor = 1.0
-            if 25 <= date.day <= 31:
-                factor *= 1.3  
-            
-            # Double Days (1.1, 2.2, ... 12.12)
-            if date.day == date.month:
-                factor *= 2.5  
-                
-            # Black Friday
-            if date.month == 11 and 24 <= date.day <= 30 and date.weekday() == 4:
-                factor *= 3.0  
-
-            noise = np.random.normal(0, 10)  # Add random fluctuation
-            
-            # Calculate daily demand and ensure it's non-negative
-            demand = int((base_demand * weekday_factor * factor) + noise)
-            demand = max(0, demand) 
-            
-            data.append([date, store, demand])
-            
-    # Create DataFrame
-    df = pd.DataFrame(data, columns=['Date', 'Store', 'Sales'])
-    return df
+import instrumentation
+import local_store
+import schema
+
+DEFAULT_STORES = ['Store_A', 'Store_B', 'Store_C', 'Store_D', 'Store_E']
+
+# Random numbers are keyed by (seed, store, date) instead of drawn from one sequential stream:
+# every value comes from hashing its key (splitmix64), so any day of any store can be
+# regenerated on its own and comes out identical whatever the window, network size,
+# store order or chunking. This lets the history grow by appending only the missing days.
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_BASE_DEMAND_KEY = np.uint64(0x5BD1E995)
+
+def make_store_names(n_stores):
+    """
+    Build store IDs for a network of n_stores.
+    Small networks keep the familiar Store_A ... Store_Z naming.
+    """
+    if n_stores <= 26:
+        return [f"Store_{chr(ord('A') + i)}" for i in range(n_stores)]
+    width = len(str(n_stores))
+    return [f"Store_{i:0{width}d}" for i in range(1, n_stores + 1)]
+
+def get_date_factors(dates):
+    """
+    Compute the demand multiplier for every date once, as an array.
+    Combines weekday seasonality, Payday, Double Days and Black Friday.
+    """
+    dates = pd.DatetimeIndex(dates)
+    day = dates.day.to_numpy()
+    month = dates.month.to_numpy()
+    weekday = dates.weekday.to_numpy()
+
+    # Weekend sales (Sat, Sun) receive a boost, weekdays are slightly lower
+    factor = np.where(weekday >= 5, 1.2, 0.9)
+    # Payday
+    factor = factor * np.where((day >= 25) & (day <= 31), 1.3, 1.0)
+    # Double Days (1.1, 2.2, ... 12.12)
+    factor = factor * np.where(day == month, 2.5, 1.0)
+    # Black Friday
+    black_friday = (month == 11) & (day >= 24) & (day <= 30) & (weekday == 4)
+    factor = factor * np.where(black_friday, 3.0, 1.0)
+    return factor
+
+def _splitmix64(x):
+    """
+    splitmix64 finalizer on uint64 arrays (wrapping arithmetic): a well-mixed hash of x.
+    """
+    with np.errstate(over='ignore'):
+        z = np.asarray(x, dtype=np.uint64) + _GOLDEN
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+def _store_keys(stores, seed):
+    """
+    One uint64 key per store, from the seed and the store name (not its position).
+    """
+    names = np.array([int.from_bytes(hashlib.blake2b(str(s).encode('utf-8'), digest_size=8).digest(), 'little')
+                      for s in stores], dtype=np.uint64)
+    return _splitmix64(names ^ _splitmix64(np.uint64(seed)))
+
+def _uniform(keys):
+    # Top 53 bits as a float in [0, 1)
+    return (keys >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+def keyed_normal(stores, dates, seed=42):
+    """
+    Standard normal draws, one per (store, date), shape (stores x days).
+    Each draw depends only on seed, store name and date (Box-Muller on two hashed uniforms).
+    """
+    days = pd.DatetimeIndex(dates).to_numpy().astype('datetime64[D]').astype(np.int64).astype(np.uint64)
+    keys = _splitmix64(_store_keys(stores, seed)[:, None] ^ _splitmix64(days)[None, :])
+    u1 = _uniform(keys)
+    u2 = _uniform(_splitmix64(keys))
+    return np.sqrt(-2.0 * np.log1p(-u1)) * np.cos(2.0 * np.pi * u2)
+
+def store_base_demand(stores, seed=42):
+    """
+    Base daily demand per store (varies by store location), in [50, 200).
+    """
+    return (50 + _splitmix64(_store_keys(stores, seed) ^ _BASE_DEMAND_KEY) % np.uint64(150)).astype(np.int64)
+
+def _simulate_block(dates, stores, seed):
+    """
+    Simulate sales for a block of stores: (stores x days) in one shot.
+    """
+    # Broadcast per-store base demand against per-date factors
+    expected = store_base_demand(stores, seed)[:, None] * get_date_factors(dates)[None, :]
+    noise = 10 * keyed_normal(stores, dates, seed)  # Add random fluctuation
+
+    # Truncate to whole units and ensure it's non-negative
+    demand = np.maximum(0, (expected + noise).astype(np.int32))
+
+    # Store IDs as codes into the shared store dictionary (see schema.py)
+    store_dtype = schema.register_stores(stores)
+    codes = store_dtype.categories.get_indexer(stores)
+
+    return pd.DataFrame({
+        'Date': np.tile(dates.to_numpy(), len(stores)),
+        'Store': pd.Categorical.from_codes(np.repeat(codes, len(dates)), dtype=store_dtype),
+        'Sales': demand.ravel()
+    })
+
+def last_complete_day():
+    """
+    Last day with complete sales: yesterday.
+    """
+    return pd.Timestamp(datetime.now()).normalize() - timedelta(days=1)
+
+def _iter_sales_blocks(days, stores, seed, chunk_size, end_date=None):
+    # Create the date range of `days` days ending at end_date (default: yesterday)
+    end_date = pd.Timestamp(end_date).normalize() if end_date is not None else last_complete_day()
+    dates = pd.date_range(end=end_date, periods=days, freq='D')
+
+    stores = np.asarray(stores)
+    for start in range(0, len(stores), chunk_size):
+        yield _simulate_block(dates, stores[start:start + chunk_size], seed)
+
+def generate_sales_data(days=730, n_stores=None, stores=None, seed=42, end_date=None):
+    """
+    Simulate sales data for a network of stores over a period of 2 years (ending yesterday,
+    or at end_date). Each store will have different demand patterns.
+    By default 5 stores (Store_A ... Store_E) are simulated.
+    """
+    if stores is None:
+        stores = DEFAULT_STORES if n_stores is None else make_store_names(n_stores)
+    blocks = _iter_sales_blocks(days, stores, seed, chunk_size=max(1, len(stores)), end_date=end_date)
+    return schema.compact_stores(pd.concat(blocks, ignore_index=True))
+
+def generate_days(dates, stores, seed=42):
+    """
+    Sales of the given stores on the given dates only; identical to the same store-days
+    of any full generation with this seed.
+    """
+    return schema.compact_stores(_simulate_block(pd.DatetimeIndex(dates).normalize(), np.asarray(stores), seed))
+
+def generate_missing_days(latest_dates, end_date=None, seed=42):
+    """
+    Sales for the days after each store's latest stored date, up to end_date (default: yesterday).
+    latest_dates: Series of last stored Date per Store. Returns an empty frame if nothing is missing.
+    """
+    end_date = pd.Timestamp(end_date).normalize() if end_date is not None else last_complete_day()
+    latest_dates = pd.to_datetime(latest_dates)
+    blocks = []
+    # Stores are normally all at the same date: one block per distinct latest date
+    for last_date, group in latest_dates.groupby(latest_dates):
+        dates = pd.date_range(start=last_date + timedelta(days=1), end=end_date, freq='D')
+        if len(dates):
+            blocks.append(_simulate_block(dates, np.asarray(group.index.astype(str)), seed))
+    if not blocks:
+        return generate_days(pd.DatetimeIndex([]), [], seed)
+    # Blocks share the full dictionary dtype, so they concatenate as categoricals
+    return schema.compact_stores(pd.concat(blocks, ignore_index=True))
+
+def append_missing_days(end_date=None, seed=42, data_dir=local_store.DATA_DIR):
+    """
+    Append the days missing since the last stored date to the sales_history dataset.
+    Only the newest month partition is read in full (plus the rows of stores missing from it),
+    and only the new days are written.
+    Returns the appended rows.
+    """
+    new_rows = generate_missing_days(local_store.latest_dates('sales_history', data_dir=data_dir), end_date, seed)
+    if len(new_rows):
+        local_store.write_dataset(new_rows, 'sales_history', data_dir=data_dir, append=True)
+    return new_rows
+
+def write_sales_data_chunked(output_path=None, days=730, n_stores=None, stores=None, seed=42, chunk_size=250,
+                             data_dir=local_store.DATA_DIR):
+    """
+    Stream the simulation to disk in blocks of chunk_size stores.
+    Blocks go to the local Parquet dataset (data/sales_history/) or, if output_path
+    is given, to that CSV file. Only one block is held in memory at a time.
+    Returns the number of rows written.
+    """
+    if stores is None:
+        stores = DEFAULT_STORES if n_stores is None else make_store_names(n_stores)
+
+    schema.use_data_dir(data_dir)
+    rows = 0
+    for i, block in enumerate(_iter_sales_blocks(days, stores, seed, chunk_size)):
+        if output_path is None:
+            local_store.write_dataset(block, 'sales_history', data_dir=data_dir, append=(i > 0))
+        else:
+            block.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        rows += len(block)
+    return rows
 
 # Main execution block
 if __name__ == "__main__":
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    project_root = os.path.dirname(current_dir)
-    data_dir = os.path.join(project_root, 'data')
+    parser = argparse.ArgumentParser(description="Generate synthetic sales history.")
+    parser.add_argument("--stores", type=int, default=None, help="Number of stores (default: Store_A..Store_E)")
+    parser.add_argument("--days", type=int, default=730, help="Days of history to simulate")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="Stream stores to disk in blocks of this size instead of building one DataFrame")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Append only the days missing since the last stored date (use the same --seed "
+                             "as the stored history); generates the full history if none is stored yet")
+    parser.add_argument("--csv", action="store_true", help="Also export data/sales_history.csv")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.configure_from_args(args)
+
+    data_dir = local_store.DATA_DIR
     os.makedirs(data_dir, exist_ok=True)
-    
-    # create sales data
-    df = generate_sales_data()
-    
-    # Save to CSV
-    output_path = os.path.join(data_dir, 'sales_history.csv')
-    df.to_csv(output_path, index=False)
-    
-    print(f"Sales data generated successfully: {output_path}")
-    print(df.head())
\ No newline at end of file
+    schema.use_data_dir(data_dir)
+    output_path = local_store.dataset_path('sales_history')
+
+    if args.incremental and local_store.dataset_exists('sales_history'):
+        with instrumentation.span('generate', mode='incremental') as span:
+            new_rows = append_missing_days(seed=args.seed)
+            span['rows'] = len(new_rows)
+        if len(new_rows):
+            print(f"Appended {len(new_rows)} rows ({new_rows['Date'].min().date()} to "
+                  f"{new_rows['Date'].max().date()}) to {output_path}")
+        else:
+            print(f"Sales history is up to date: {output_path}")
+    elif args.chunk_size:
+        with instrumentation.span('generate', chunk_size=args.chunk_size) as span:
+            rows = write_sales_data_chunked(days=args.days, n_stores=args.stores,
+                                            seed=args.seed, chunk_size=args.chunk_size)
+            span['rows'] = rows
+        print(f"Sales data generated successfully: {output_path} ({rows} rows)")
+    else:
+        # create sales data
+        with instrumentation.span('generate') as span:
+            df = generate_sales_data(days=args.days, n_stores=args.stores, seed=args.seed)
+            span['rows'] = len(df)
+
+        # Save to the local Parquet dataset
+        with instrumentation.span('save', rows=len(df)):
+            local_store.write_dataset(df, 'sales_history')
+
+        print(f"Sales data generated successfully: {output_path}")
+        print(df.head())
+
+    print(f"Store codes: {schema.save_store_codes()}")
+
+    if args.csv:
+        print(f"CSV export: {local_store.export_csv('sales_history')}")
+
+    if args.metrics:
+        print(f"Metrics written to: {instrumentation.write_metrics(args.metrics, script='data_gen')}")
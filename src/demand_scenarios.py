@@ -0,0 +1,72 @@
+import pandas as pd
+import numpy as np
+
+# Demand uncertainty around a forecast, shared by the scenario-based allocation
+# (optimize.optimize_newsvendor) and the Monte Carlo stress test (simulation.py).
+# The spread of each store-day comes from, in order of preference:
+# 1. forecast sample paths (forecast_samples dataset: Date / Store / Sample / Predicted_Demand),
+# 2. the forecast interval (Predicted_Lower / Predicted_Upper, an 80% interval),
+# 3. a fixed coefficient of variation around Predicted_Demand.
+
+# Demand std as a fraction of the forecast when no interval is available
+DEFAULT_DEMAND_CV = 0.2
+# z-score of the forecast interval bounds (Prophet's default interval_width=0.8)
+INTERVAL_Z = 1.2816
+INTERVAL_COLUMNS = ['Predicted_Lower', 'Predicted_Upper']
+
+def has_intervals(forecast_df):
+    return set(INTERVAL_COLUMNS) <= set(forecast_df.columns)
+
+def demand_std(forecast_df, demand_cv=DEFAULT_DEMAND_CV):
+    """
+    Demand standard deviation per row: from the forecast interval where present,
+    else demand_cv * Predicted_Demand.
+    """
+    mean = forecast_df['Predicted_Demand'].to_numpy(dtype=np.float64)
+    fallback = demand_cv * mean
+    if not has_intervals(forecast_df):
+        return fallback
+    width = (forecast_df['Predicted_Upper'].to_numpy(dtype=np.float64)
+             - forecast_df['Predicted_Lower'].to_numpy(dtype=np.float64))
+    std = np.where(np.isnan(width), fallback, width / (2 * INTERVAL_Z))
+    return np.clip(std, 0, None)
+
+def sample_gamma(rng, mean, std, n):
+    """
+    n whole-unit demand draws per entry of mean/std, shape (n,) + mean.shape:
+    gamma with the given mean and std (non-negative and right-skewed like real sales), rounded.
+    Entries with zero mean or std are returned as the (rounded) mean.
+    """
+    mean = np.broadcast_to(np.asarray(mean, dtype=np.float64), (n,) + np.shape(mean))
+    std = np.broadcast_to(np.asarray(std, dtype=np.float64), mean.shape)
+    positive = (mean > 0) & (std > 0)
+    shape = np.where(positive, (mean / np.where(positive, std, 1)) ** 2, 1.0)
+    scale = np.where(positive, std ** 2 / np.where(positive, mean, 1), 0.0)
+    draws = np.where(positive, rng.gamma(shape, scale), mean)
+    return np.rint(draws)
+
+def sample_scenarios(forecast_df, n_scenarios=500, samples_df=None, demand_cv=DEFAULT_DEMAND_CV, seed=42):
+    """
+    Demand scenarios for every row of forecast_df, shape (n_scenarios, rows).
+
+    With samples_df, the stored sample paths of each (Date, Store) are used, resampled with
+    replacement to n_scenarios; rows without samples fall back to gamma draws from the
+    interval (or demand_cv). Draws are whole, non-negative units.
+    """
+    rng = np.random.default_rng(seed)
+    scenarios = sample_gamma(rng, forecast_df['Predicted_Demand'].to_numpy(dtype=np.float64),
+                             demand_std(forecast_df, demand_cv), n_scenarios)
+    if samples_df is None or samples_df.empty:
+        return scenarios
+
+    # (rows x samples) matrix of sample paths, aligned with forecast_df
+    paths = samples_df.pivot_table(index=['Date', 'Store'], columns='Sample', values='Predicted_Demand',
+                                   aggfunc='first', observed=True)
+    keys = pd.MultiIndex.from_arrays([pd.to_datetime(forecast_df['Date']), forecast_df['Store']])
+    paths.index = paths.index.set_levels(pd.to_datetime(paths.index.levels[0]), level=0)
+    paths = paths.reindex(keys).to_numpy(dtype=np.float64)
+    found = ~np.isnan(paths).any(axis=1)
+    if found.any():
+        picks = rng.integers(0, paths.shape[1], size=(n_scenarios, int(found.sum())))
+        scenarios[:, found] = np.clip(np.rint(np.take_along_axis(paths[found].T, picks, axis=0)), 0, None)
+    return scenarios
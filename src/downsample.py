@@ -0,0 +1,105 @@
+import pandas as pd
+import numpy as np
+
+# Server-side downsampling for line charts.
+# Long ranges for many stores would otherwise ship every row (and a marker per row)
+# to the browser. Each series is reduced to at most `max_points` points before plotting:
+# LTTB (Largest-Triangle-Three-Buckets) keeps the visual shape of the line, min/max bucketing
+# keeps every peak and trough and is vectorized across all series at once.
+
+# Width of a full-width dashboard chart; a line needs at most one point per 2 px
+DEFAULT_CHART_WIDTH_PX = 1200
+PIXELS_PER_POINT = 2
+# Total points across all series, so the payload stays bounded as stores are added
+MAX_TOTAL_POINTS = 20_000
+MIN_POINTS_PER_SERIES = 50
+# Above this many plotted points in total, markers only add clutter and payload
+MARKER_THRESHOLD = 400
+# LTTB walks each series bucket by bucket; beyond this many series use min/max bucketing
+LTTB_MAX_SERIES = 50
+
+def lttb_indices(x, y, n_out):
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets for one series.
+    x must be sorted and numeric. The first and last points are always kept.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # Bucket edges for the n - 2 interior points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third triangle vertex
+        nlo, nhi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+def _minmax(df, x, y, group, max_points):
+    """
+    Min/max bucketing for all series at once: per series, split into max_points // 2
+    buckets and keep the lowest and highest point of each (plus the series ends).
+    """
+    pos = df.groupby(group, sort=False, observed=True).cumcount().to_numpy()
+    size = df.groupby(group, sort=False, observed=True)[x].transform('size').to_numpy()
+    n_buckets = max(1, (max_points - 2) // 2)
+    bucket = pos * n_buckets // size
+
+    keys = [df[group].to_numpy(), bucket]
+    grouped = df[y].groupby(keys, sort=False)
+    keep = np.concatenate([
+        grouped.idxmin().to_numpy(), grouped.idxmax().to_numpy(),
+        df.index[(pos == 0) | (pos == size - 1)].to_numpy(),
+    ])
+    # Series that already fit are kept whole
+    keep = np.union1d(keep, df.index[size <= max_points].to_numpy())
+    return df.loc[keep]
+
+def downsample_series(df, x='Date', y='Sales', group='Store', max_points=None, method='auto'):
+    """
+    Reduce every series (one per `group` value) to at most max_points points
+    (default: points_per_series for a full-width chart).
+    method: 'lttb' (shape-preserving), 'minmax' (keeps extremes, fastest for many series)
+    or 'auto' (LTTB up to LTTB_MAX_SERIES series, min/max above).
+    Returns (reduced frame, number of points removed).
+    """
+    if df.empty:
+        return df, 0
+    df = df.sort_values([group, x], kind='stable').reset_index(drop=True)
+    if max_points is None:
+        max_points = points_per_series(df[group].nunique())
+
+    if method == 'auto':
+        method = 'lttb' if df[group].nunique() <= LTTB_MAX_SERIES else 'minmax'
+    if method == 'minmax':
+        reduced = _minmax(df, x, y, group, max_points)
+    elif method == 'lttb':
+        parts = []
+        for _, series in df.groupby(group, sort=False, observed=True):
+            xs = series[x]
+            xs = xs.astype('int64') if np.issubdtype(xs.dtype, np.datetime64) else xs
+            parts.append(series.iloc[lttb_indices(xs.to_numpy(), series[y].to_numpy(), max_points)])
+        reduced = pd.concat(parts)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+
+    reduced = reduced.sort_values([group, x], kind='stable').reset_index(drop=True)
+    return reduced, len(df) - len(reduced)
+
+def points_per_series(n_series, chart_width_px=DEFAULT_CHART_WIDTH_PX):
+    """
+    Point budget per series for a chart of the given width, shrinking when
+    many series would exceed MAX_TOTAL_POINTS together.
+    """
+    per_series = chart_width_px // PIXELS_PER_POINT
+    return max(MIN_POINTS_PER_SERIES, min(per_series, MAX_TOTAL_POINTS // max(1, n_series)))
@@ -0,0 +1,75 @@
+import importlib
+
+# Small engine interface over the forecasting and solver backends.
+# Engines are registered by name as 'module:function' strings and only imported when first
+# requested, so importing a module that offers several backends (or the dashboard) does not
+# pay for Prophet/Stan, PuLP/CBC or SciPy up front.
+#
+# Forecast engines: fn(df, days_ahead=30, events=None, **options)
+#   -> Date / Predicted_Demand / Predicted_Lower / Predicted_Upper / Store
+#   With samples=[] (and n_samples), sample-path frames (Date / Store / Sample / Predicted_Demand)
+#   are appended to that list. With progress=fn, fn(done, total, store) is called as stores
+#   finish (once per batch for batched engines); an exception it raises stops the engine.
+# Allocation solvers: fn(forecast_df, warehouse_stock, shipping_costs) -> allocation plan
+
+FORECAST_ENGINES = {
+    'prophet': 'engines:_prophet_engine',
+    'fast': 'fast_forecast:fast_forecast_all_stores',
+}
+
+# Engines that fit every store in one call (harnesses such as backtest.py hand them all stores at once)
+BATCHED_ENGINES = {'fast'}
+
+SOLVERS = {
+    'greedy': 'optimize:solve_allocation_greedy',  # NumPy only
+    'lp': 'optimize:solve_allocation_lp',          # PuLP / CBC
+}
+
+_loaded = {}
+
+def _load(spec):
+    if spec not in _loaded:
+        module_name, attr = spec.split(':')
+        _loaded[spec] = getattr(importlib.import_module(module_name), attr)
+    return _loaded[spec]
+
+def get_forecast_engine(name):
+    """
+    The forecast function registered under name, importing its backend on first use.
+    """
+    if name not in FORECAST_ENGINES:
+        raise ValueError(f"Unknown forecast engine '{name}' (available: {', '.join(FORECAST_ENGINES)})")
+    return _load(FORECAST_ENGINES[name])
+
+def get_solver(name):
+    """
+    The allocation solver registered under name, importing its backend on first use.
+    """
+    if name not in SOLVERS:
+        raise ValueError(f"Unknown solver '{name}' (available: {', '.join(SOLVERS)})")
+    return _load(SOLVERS[name])
+
+def register_forecast_engine(name, spec):
+    """
+    Add a forecast engine, given as 'module:function' (imported lazily) or as a callable.
+    """
+    if callable(spec):
+        _loaded[f'<callable>:{name}'] = spec
+        spec = f'<callable>:{name}'
+    FORECAST_ENGINES[name] = spec
+
+def _prophet_engine(df, days_ahead=30, events=None, workers=1, model_dir=None, cache_stats=None, errors=None,
+                    samples=None, n_samples=None, progress=None):
+    """
+    Per-store Prophet models (forecast.forecast_all_stores) behind the common engine signature.
+    Failed stores are left out of the result and reported in the errors dict, if given.
+    progress(done, total, store) is called as each store finishes.
+    """
+    from forecast import forecast_all_stores, SAMPLE_PATHS
+
+    result, failed = forecast_all_stores(df, days_ahead=days_ahead, workers=workers, model_dir=model_dir,
+                                         cache_stats=cache_stats, events=events, samples=samples,
+                                         n_samples=n_samples or SAMPLE_PATHS, progress=progress)
+    if errors is not None:
+        errors.update(failed)
+    return result
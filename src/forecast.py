@@ -1,95 +1,299 @@
 import pandas as pd
-from prophet import Prophet
-import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import time
+
+import calendar_events
+import engines
+import instrumentation
+import local_store
+import model_store
+import schema
 
 # Custom holiday/events for better forecasting
 def get_special_events(dates):
-    events = []
-    for date in dates:
-        event_name = None
-        # Payday
-        if 25 <= date.day <= 31:
-            event_name = 'Payday'
-        # Double Day
-        if date.day == date.month:
-            event_name = 'DoubleDay'
-            
-        if event_name:
-            events.append([date, event_name])
-            
-    return pd.DataFrame(events, columns=['ds', 'holiday'])
-
-def train_forecast_model(df, store_name, days_ahead=30):
+    return calendar_events.special_events(dates)
+
+def get_model_events(start_date, end_date, calendar_dir=None, data_dir=None, cache=True):
     """
-    Train a time-series forecasting model for a specific store using Prophet.
+    Shared events frame (special events + country holidays) covering training
+    history and a year of future dates. Computed once and reused by every store.
+    The calendar cache goes to calendar_dir, else <data_dir>/calendar (see calendar_events.py).
     """
-    # Prophet requires specific column names: 'ds' (Date) and 'y' (Target value)
-    store_data = df[df['Store'] == store_name].rename(columns={'Date': 'ds', 'Sales': 'y'})
-    
-    # Define special events in the data
-    min_date = pd.to_datetime(store_data['ds'].min())
-    max_date = pd.to_datetime(store_data['ds'].max())
-    future_end_date = max_date + pd.Timedelta(days=365)
+    future_end_date = pd.to_datetime(end_date) + pd.Timedelta(days=365)
+    return calendar_events.get_event_calendar(start_date, future_end_date,
+                                              country=MODEL_CONFIG['country_holidays'],
+                                              calendar_dir=calendar_dir, data_dir=data_dir, cache=cache)
 
+# Sample paths drawn per store-day when sample paths are requested
+SAMPLE_PATHS = 100
 
-    all_dates = pd.date_range(start=min_date, end=future_end_date, freq='D')
-    special_events_df = get_special_events(all_dates)
+# Model configuration that affects the fitted parameters.
+# Part of the model cache key: changing it invalidates every cached fit.
+MODEL_CONFIG = {
+    'daily_seasonality': True,
+    'country_holidays': 'TH',
+    'special_events': ['Payday', 'DoubleDay'],
+}
 
-    # Initialize and train the Prophet model
+def _build_model(store_data, events=None):
+    """
+    Create an (unfitted) Prophet model with our seasonality and holiday setup.
+    events is the shared calendar from get_model_events(); built here if not given.
+    """
+    if events is None:
+        events = get_model_events(store_data['ds'].min(), store_data['ds'].max())
+
+    # Prophet (and its Stan backend) is imported on first use, not with this module
+    from prophet import Prophet
+
+    # Initialize the Prophet model
     # daily_seasonality=True helps capture daily patterns automatically
-    model = Prophet(daily_seasonality=True, holidays=special_events_df)
-    model.add_country_holidays(country_name='TH')
-    model.fit(store_data)
+    # Country holidays are already part of the shared events frame
+    return Prophet(daily_seasonality=MODEL_CONFIG['daily_seasonality'], holidays=events)
+
+def _fit_store_model(store_data, store_name, model_dir=None, events=None):
+    """
+    Fit a store's model, reusing or warm-starting from the model cache when possible.
+    Returns (model, cache_status) where cache_status is 'hit', 'warm', 'miss' or None (no cache).
+    """
+    if model_dir is None:
+        model = _build_model(store_data, events)
+        model.fit(store_data)
+        return model, None
+
+    config_hash = model_store.hash_config(MODEL_CONFIG)
+    entry = model_store.load_model_entry(model_dir, store_name)
+    status = model_store.classify_entry(entry, store_data, config_hash)
+
+    if status == 'hit':
+        return model_store.load_model(entry), status
+
+    model = None
+    if status == 'warm':
+        try:
+            init = model_store.warm_start_params(model_store.load_model(entry))
+            model = _build_model(store_data, events)
+            model.fit(store_data, init=init)
+        except Exception:
+            # Parameter shapes can change (e.g. a new holiday appears in the window)
+            model, status = None, 'miss'
+    if model is None:
+        model = _build_model(store_data, events)
+        model.fit(store_data)
+
+    model_store.save_model_entry(model_dir, store_name, model, store_data, config_hash)
+    return model, status
+
+def _train_store(store_data, store_name, days_ahead, model_dir=None, events=None, n_samples=0):
+    # Prophet requires specific column names: 'ds' (Date) and 'y' (Target value)
+    store_data = store_data.rename(columns={'Date': 'ds', 'Sales': 'y'})[['ds', 'y']]
+
+    # Train the Prophet model (or reuse a cached fit)
+    model, cache_status = _fit_store_model(store_data, store_name, model_dir, events)
     
     # Create a dataframe to hold future dates for prediction
     future = model.make_future_dataframe(periods=days_ahead)
     forecast = model.predict(future)
     
     # Extract predictions for the next 'days_ahead' days
-    # 'yhat' is the predicted value
-    next_30_days = forecast.tail(days_ahead)[['ds', 'yhat']].copy()
+    # 'yhat' is the predicted value, 'yhat_lower'/'yhat_upper' its uncertainty interval
+    next_30_days = forecast.tail(days_ahead)[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].copy()
     next_30_days['Store'] = store_name
-    next_30_days.rename(columns={'ds': 'Date', 'yhat': 'Predicted_Demand'}, inplace=True)
+    next_30_days.rename(columns={'ds': 'Date', 'yhat': 'Predicted_Demand',
+                                 'yhat_lower': 'Predicted_Lower', 'yhat_upper': 'Predicted_Upper'}, inplace=True)
+    
+    # Optional sample paths (days x n_samples) from the model's predictive distribution
+    samples = None
+    if n_samples > 0:
+        paths = model.predictive_samples(future.tail(days_ahead))['yhat'][:, :n_samples]
+        samples = sample_paths_frame(next_30_days['Date'].to_numpy(), store_name, paths)
     
+    return next_30_days, cache_status, samples
+
+def sample_paths_frame(dates, store_name, paths):
+    """
+    Long Date / Store / Sample / Predicted_Demand frame from a (days x samples) array.
+    """
+    n_days, n_samples = paths.shape
+    return pd.DataFrame({
+        'Date': np.repeat(dates, n_samples),
+        'Store': store_name,
+        'Sample': np.tile(np.arange(n_samples, dtype=np.int32), n_days),
+        'Predicted_Demand': paths.ravel(),
+    })
+
+def train_forecast_model(df, store_name, days_ahead=30, model_dir=None, events=None):
+    """
+    Train a time-series forecasting model for a specific store using Prophet.
+    If model_dir is given, fitted models are cached there and reused across runs.
+    events is an optional shared holidays frame (see get_model_events).
+    """
+    store_data = df[df['Store'] == store_name]
+    next_30_days, _, _ = _train_store(store_data, store_name, days_ahead, model_dir, events)
     return next_30_days
 
+def _forecast_store_worker(store_name, store_df, days_ahead, model_dir=None, events=None, n_samples=0):
+    """
+    Process pool entry point: train one store and never raise.
+    Returns (store_name, forecast or None, sample paths or None, cache status, error message or None, seconds).
+    """
+    start = time.perf_counter()
+    try:
+        fc, cache_status, samples = _train_store(store_df, store_name, days_ahead, model_dir, events, n_samples)
+        return store_name, fc, samples, cache_status, None, time.perf_counter() - start
+    except Exception as e:
+        return store_name, None, None, None, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+def forecast_all_stores(df, days_ahead=30, workers=1, model_dir=None, cache_stats=None, events=None,
+                        samples=None, n_samples=SAMPLE_PATHS, progress=None):
+    """
+    Train one Prophet model per store, optionally across a process pool.
+    Each worker only receives its own store's slice of df.
+    Results keep the order in which stores appear in df; stores whose fit
+    fails are reported in the returned errors dict instead of aborting the batch.
+    If cache_stats (a dict) is given, it is filled with hit/warm/miss counts.
+    events is the shared holidays frame; built from df's date range if not given.
+    If samples (a list) is given, n_samples sample paths per store-day are drawn and one
+    Date / Store / Sample / Predicted_Demand frame per store is appended to it.
+    progress(done, total, store), if given, is called as each store finishes; an exception
+    it raises (e.g. a cancelled background job) stops the batch and skips the remaining stores.
+    """
+    stores = list(df['Store'].unique())
+    slices = {store: store_df for store, store_df in df.groupby('Store', sort=False, observed=True)}
+
+    # One events calendar for the whole run, handed to every model
+    if events is None:
+        dates = pd.to_datetime(df['Date'])
+        events = get_model_events(dates.min(), dates.max())
+
+    n_samples = n_samples if samples is not None else 0
+    outcomes = []
+    if workers <= 1:
+        for store in stores:
+            outcomes.append(_forecast_store_worker(store, slices[store], days_ahead, model_dir, events, n_samples))
+            if progress is not None:
+                progress(len(outcomes), len(stores), store)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_forecast_store_worker, store, slices[store], days_ahead, model_dir, events,
+                                   n_samples) for store in stores]
+            finished = {}
+            try:
+                for future in as_completed(futures):
+                    outcome = future.result()
+                    finished[outcome[0]] = outcome
+                    if progress is not None:
+                        progress(len(finished), len(stores), outcome[0])
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+            # Keep the order of stores in df
+            outcomes = [finished[store] for store in stores]
+
+    all_forecasts = []
+    errors = {}
+    for store, fc, store_samples, cache_status, err, seconds in outcomes:
+        # Fit + predict time per store, measured inside the worker
+        instrumentation.record('store_fit', store=store, seconds=round(seconds, 6), cache=cache_status,
+                               rows=len(slices[store]), error=err)
+        if err is not None:
+            errors[store] = err
+            continue
+        all_forecasts.append(fc)
+        if samples is not None and store_samples is not None:
+            samples.append(store_samples)
+        if cache_stats is not None and cache_status is not None:
+            cache_stats[cache_status] = cache_stats.get(cache_status, 0) + 1
+
+    if not all_forecasts:
+        return pd.DataFrame(columns=['Date', 'Predicted_Demand', 'Predicted_Lower', 'Predicted_Upper', 'Store']), errors
+    return pd.concat(all_forecasts, ignore_index=True), errors
+
+def round_forecast(df):
+    """
+    Whole, non-negative units (can't sell 0.5 units) for the forecast and its interval columns,
+    in the shared schema (categorical Store, int32 units).
+    """
+    df = df.copy()
+    for col in ['Predicted_Demand', 'Predicted_Lower', 'Predicted_Upper']:
+        if col in df.columns:
+            df[col] = df[col].round().clip(lower=0)
+    return schema.apply_schema(df)
+
 # Main execution block
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train per-store demand forecasts.")
+    parser.add_argument("--engine", choices=list(engines.FORECAST_ENGINES), default='prophet',
+                        help="prophet: per-store Prophet models; fast: batched NumPy regression for all stores")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes for per-store training (default: 1, sequential)")
+    parser.add_argument("--days-ahead", type=int, default=30, help="Forecast horizon in days")
+    parser.add_argument("--model-dir", default=model_store.DEFAULT_MODEL_DIR,
+                        help="Directory of cached fitted models (default: data/models)")
+    parser.add_argument("--no-cache", action="store_true", help="Always refit every store from scratch")
+    parser.add_argument("--samples", type=int, default=0,
+                        help="Also write this many demand sample paths per store-day (forecast_samples dataset)")
+    parser.add_argument("--csv", action="store_true", help="Also export data/forecast_results.csv")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.configure_from_args(args)
+
     # Load historical sales data generated by data_gen.py
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(current_dir)
-    data_dir = os.path.join(project_root, 'data')
-    
-    input_path = os.path.join(data_dir, 'sales_history.csv')
-    
-    if not os.path.exists(input_path):
-        print(f"Error: {input_path} not found. Please run data_gen.py first.")
+    try:
+        with instrumentation.span('load') as span:
+            df = local_store.read_dataset('sales_history', columns=['Date', 'Store', 'Sales'])
+            span['rows'] = len(df)
+    except FileNotFoundError as e:
+        print(f"Error: {e}. Please run data_gen.py first.")
         exit()
-
-    df = pd.read_csv(input_path)
     
-    all_forecasts = []
-    unique_stores = df['Store'].unique()
-    
-    print("Training forecast models for each store...")
+    if args.engine == 'fast':
+        print("Fitting batched fast-forecast engine for all stores...")
+        with instrumentation.span('forecast', engine='fast', stores=int(df['Store'].nunique())):
+            dates = pd.to_datetime(df['Date'])
+            events = get_model_events(dates.min(), dates.max())
+            samples = [] if args.samples > 0 else None
+            final_forecast = engines.get_forecast_engine('fast')(df, days_ahead=args.days_ahead, events=events,
+                                                                 samples=samples, n_samples=args.samples)
+    else:
+        print(f"Training forecast models for each store (workers={args.workers})...")
+
+        # Train individual models per store and combine into a single DataFrame
+        model_dir = None if args.no_cache else args.model_dir
+        cache_stats = {}
+        with instrumentation.span('forecast', engine='prophet', stores=int(df['Store'].nunique()),
+                                  workers=args.workers):
+            errors = {}
+            samples = [] if args.samples > 0 else None
+            final_forecast = engines.get_forecast_engine('prophet')(df, days_ahead=args.days_ahead, workers=args.workers,
+                                                                    model_dir=model_dir, cache_stats=cache_stats,
+                                                                    errors=errors, samples=samples,
+                                                                    n_samples=args.samples)
+        for store, err in errors.items():
+            print(f"   - {store}: forecast failed ({err})")
+        if model_dir is not None:
+            print(f"Model cache: {cache_stats.get('hit', 0)} hits, {cache_stats.get('warm', 0)} warm starts, "
+                  f"{cache_stats.get('miss', 0)} misses")
     
-    # Loop through each store to train individual models
-    for store in unique_stores:
-        fc = train_forecast_model(df, store)
-        all_forecasts.append(fc)
-        
-    # Combine forecasts from all stores into a single DataFrame
-    final_forecast = pd.concat(all_forecasts)
+    # Round predictions (and their intervals) to whole, non-negative units
+    final_forecast = round_forecast(final_forecast)
     
-    # Round predicted demand to nearest integer (can't sell 0.5 units)
-    final_forecast['Predicted_Demand'] = final_forecast['Predicted_Demand'].round().astype(int)
+    # Save results
+    with instrumentation.span('save', rows=len(final_forecast)):
+        local_store.write_dataset(final_forecast, 'forecast_results')
+        if samples:
+            sample_paths = round_forecast(pd.concat(samples, ignore_index=True))
+            local_store.write_dataset(sample_paths, 'forecast_samples')
+            print(f"Sample paths ({args.samples} per store-day): {local_store.dataset_path('forecast_samples')}")
     
-    # Ensure no negative predictions
-    final_forecast['Predicted_Demand'] = final_forecast['Predicted_Demand'].apply(lambda x: max(0, x))
+    print(f"Forecasting completed: {local_store.dataset_path('forecast_results')}")
+    print(final_forecast.head())
     
-    # Save results
-    output_path = os.path.join(data_dir, 'forecast_results.csv')
-    final_forecast.to_csv(output_path, index=False)
+    if args.csv:
+        print(f"CSV export: {local_store.export_csv('forecast_results')}")
     
-    print(f"Forecasting completed: {output_path}")
-    print(final_forecast.head())
\ No newline at end of file
+    if args.metrics:
+        print(f"Metrics written to: {instrumentation.write_metrics(args.metrics, script='forecast', engine=args.engine)}")
\ No newline at end of file
@@ -0,0 +1,161 @@
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Lightweight per-stage instrumentation for the ETL scripts.
+# - span(name, **attrs): context manager timing a block (nested spans get '/'-joined paths)
+#   and, when memory tracing is on, its tracemalloc peak.
+# - record(kind, **fields): one structured event, e.g. a store fit, a solver call or a DB write.
+# - write_metrics(path): everything collected so far as one JSON document.
+# - configure(profile_stage=...): cProfile the span with that name and dump its stats.
+# Nothing is kept until configure() enables collection (the scripts do this for --metrics),
+# so library calls from long-running processes such as the dashboard do not accumulate events;
+# spans still time their block. tracemalloc and cProfile only run when asked for.
+
+_state = {
+    'enabled': False,
+    'spans': [],
+    'events': [],
+    'trace_memory': False,
+    'profile_stage': None,
+    'profile_path': None,
+}
+_lock = threading.Lock()
+_local = threading.local()
+
+def configure(enabled=True, trace_memory=False, profile_stage=None, profile_path=None):
+    """
+    Start collecting spans and events, optionally with tracemalloc peaks for every span
+    and/or cProfile for the span named profile_stage.
+    """
+    _state['enabled'] = enabled
+    _state['trace_memory'] = trace_memory
+    _state['profile_stage'] = profile_stage
+    _state['profile_path'] = profile_path
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Time a block. Yields a dict to which the block can add attributes (e.g. rows).
+    """
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    entry = {'name': f"{parent['name']}/{name}" if parent else name, **attrs}
+
+    tracing = _state['trace_memory'] and tracemalloc.is_tracing()
+    if tracing:
+        # Keep the parent's peak so far before resetting the counter for this block
+        current, peak = tracemalloc.get_traced_memory()
+        if parent is not None:
+            parent['_peak'] = max(parent.get('_peak', 0), peak)
+        tracemalloc.reset_peak()
+        entry['_start_mem'] = current
+
+    profiler = None
+    if _state['profile_stage'] == name:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    stack.append(entry)
+    start = time.perf_counter()
+    try:
+        yield entry
+    finally:
+        entry['seconds'] = round(time.perf_counter() - start, 6)
+        stack.pop()
+        if profiler is not None:
+            profiler.disable()
+            path = _state['profile_path'] or f"profile_{name}.prof"
+            profiler.dump_stats(path)
+            entry['profile'] = path
+        if tracing:
+            peak = max(tracemalloc.get_traced_memory()[1], entry.pop('_peak', 0))
+            entry['peak_mb'] = round((peak - entry.pop('_start_mem')) / 1e6, 3)
+            if parent is not None:
+                parent['_peak'] = max(parent.get('_peak', 0), peak)
+        if _state['enabled']:
+            with _lock:
+                _state['spans'].append(entry)
+
+def record(kind, **fields):
+    """
+    Record one structured event (e.g. kind='store_fit', 'solver', 'db_write').
+    """
+    stack = _stack()
+    event = {'kind': kind, 'span': stack[-1]['name'] if stack else None, **fields}
+    if _state['enabled']:
+        with _lock:
+            _state['events'].append(event)
+    return event
+
+def timed_solve(solver_name, solve, status_of=None, **fields):
+    """
+    Run solve(), record its wall time and status, and return its result.
+    status_of maps the result (or the solver object) to a readable status.
+    """
+    start = time.perf_counter()
+    result = solve()
+    record('solver', solver=solver_name, seconds=round(time.perf_counter() - start, 6),
+           status=status_of(result) if status_of else None, **fields)
+    return result
+
+def frame_bytes(df):
+    """
+    In-memory size of a DataFrame, used as the payload size of to_sql writes.
+    """
+    return int(df.memory_usage(index=False, deep=True).sum())
+
+def get_metrics():
+    with _lock:
+        return {'spans': list(_state['spans']), 'events': list(_state['events'])}
+
+def reset():
+    with _lock:
+        _state['spans'].clear()
+        _state['events'].clear()
+
+def write_metrics(path, **meta):
+    """
+    Write all spans and events as JSON. Returns the path.
+    """
+    metrics = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'trace_memory': _state['trace_memory'],
+        **meta,
+        **get_metrics(),
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(metrics, f, indent=2, default=str)
+    return path
+
+def add_arguments(parser):
+    """
+    Shared CLI flags for the pipeline scripts.
+    """
+    parser.add_argument("--metrics", default=None,
+                        help="Write per-stage timings/events as JSON to this path")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Track tracemalloc peaks per stage (slower)")
+    parser.add_argument("--profile-stage", default=None,
+                        help="cProfile the stage with this name and dump stats next to the metrics file")
+
+def configure_from_args(args):
+    profile_path = None
+    if args.profile_stage:
+        base = os.path.splitext(args.metrics)[0] if args.metrics else 'profile'
+        profile_path = f"{base}_{args.profile_stage}.prof"
+    configure(enabled=bool(args.metrics or args.trace_memory or args.profile_stage),
+              trace_memory=args.trace_memory, profile_stage=args.profile_stage, profile_path=profile_path)
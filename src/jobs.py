@@ -0,0 +1,230 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Background jobs for long-running work started from the dashboard (optimization,
+# multi-day plans, re-forecasts), so a session does not block until the solver returns.
+# - One JobManager is shared by every session (st.cache_resource). Jobs wait in the
+#   executor's queue and at most `max_workers` run at a time, whatever the number of sessions.
+# - `max_pending` caps unfinished jobs overall and `max_per_owner` per session: submitting
+#   beyond a cap raises JobLimitError instead of queueing without bound.
+# - Every job has an id, a status, a progress fraction and a message that can be polled.
+# - Cancellation: a queued job never starts. A running job is stopped at its next progress
+#   checkpoint (report() raises JobCancelled); a job without checkpoints (one LP solve)
+#   runs to the end and its result is discarded.
+# Jobs run on threads: CBC and Stan (Prophet) run as child processes and NumPy/pandas release
+# the GIL, and forecast jobs can fan out over their own process pool (workers=...).
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+class JobCancelled(Exception):
+    """
+    Raised inside a job at a progress checkpoint once cancellation was requested.
+    """
+
+class JobLimitError(RuntimeError):
+    """
+    Too many unfinished jobs (overall or for one owner) to accept another.
+    """
+
+class Job:
+    """
+    State of one submitted job. Fields are written by the worker thread and read by pollers.
+    """
+    def __init__(self, job_id, name, owner=None):
+        self.id = job_id
+        self.name = name
+        self.owner = owner
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = ''
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def report(self, fraction, message=None):
+        """
+        Progress checkpoint for the job function: record progress (0..1) and stop
+        with JobCancelled if cancellation was requested.
+        """
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+        self.progress = min(max(float(fraction), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+    def wait(self, timeout=None):
+        """
+        Block until the job is finished or timeout seconds have passed. Returns True if finished.
+        """
+        return self._done.wait(timeout)
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started
+
+    def _finish(self, status, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        if status == DONE:
+            self.progress = 1.0
+        self.status = status
+        self._done.set()
+
+    def snapshot(self):
+        """
+        Plain dict of the job's state for display (without the result).
+        """
+        return {
+            'id': self.id,
+            'name': self.name,
+            'owner': self.owner,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'error': self.error,
+            'seconds': round(self.elapsed(), 3),
+        }
+
+class JobManager:
+    """
+    Bounded pool of background jobs with ids, progress polling and cancellation.
+    """
+    def __init__(self, max_workers=2, max_pending=8, max_per_owner=2, keep_finished=50):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_per_owner = max_per_owner
+        self.keep_finished = keep_finished
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = OrderedDict()  # job id -> Job, in submission order
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, name=None, owner=None, progress=False, **kwargs):
+        """
+        Queue fn(*args, **kwargs) and return its job id.
+        With progress=True, fn also receives progress=job.report as a keyword argument.
+        Raises JobLimitError when max_pending (or max_per_owner for this owner) jobs are unfinished.
+        """
+        with self._lock:
+            active = [job for job in self._jobs.values() if not job.finished]
+            if len(active) >= self.max_pending:
+                raise JobLimitError(f"{len(active)} jobs are already queued or running; try again shortly")
+            if owner is not None and sum(job.owner == owner for job in active) >= self.max_per_owner:
+                raise JobLimitError(f"At most {self.max_per_owner} jobs per session can run at a time")
+
+            job = Job(uuid.uuid4().hex[:12], name or getattr(fn, '__name__', 'job'), owner)
+            self._jobs[job.id] = job
+            self._futures[job.id] = self._pool.submit(self._run, job, fn, args, kwargs, progress)
+            self._prune()
+        return job.id
+
+    def _run(self, job, fn, args, kwargs, progress):
+        if job.cancel_requested:
+            job._finish(CANCELLED)
+            return
+        job.started = time.time()
+        job.status = RUNNING
+        try:
+            if progress:
+                kwargs = dict(kwargs, progress=job.report)
+            result = fn(*args, **kwargs)
+        except JobCancelled:
+            job._finish(CANCELLED)
+        except Exception as e:
+            job._finish(FAILED, error=f"{type(e).__name__}: {e}")
+        else:
+            # Cancelled while in a step without checkpoints: the result is discarded
+            if job.cancel_requested:
+                job._finish(CANCELLED)
+            else:
+                job._finish(DONE, result=result)
+        finally:
+            with self._lock:
+                self._futures.pop(job.id, None)
+
+    def _prune(self):
+        # Forget the oldest finished jobs beyond keep_finished (unfinished jobs are kept)
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        """
+        The Job with this id, or None if unknown (or already pruned).
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id, timeout=None):
+        """
+        Wait up to timeout seconds for a job; returns the Job (finished or not) or None if unknown.
+        """
+        job = self.get(job_id)
+        if job is not None:
+            job.wait(timeout)
+        return job
+
+    def cancel(self, job_id):
+        """
+        Request cancellation. Queued jobs are cancelled at once; running jobs stop at their
+        next progress checkpoint. Returns False if the job is unknown or already finished.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            job._cancel.set()
+            future = self._futures.get(job_id)
+            if future is not None and future.cancel():
+                self._futures.pop(job_id, None)
+                job._finish(CANCELLED)
+        return True
+
+    def jobs(self, owner=None):
+        """
+        Known jobs (optionally of one owner), newest first.
+        """
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job for job in reversed(jobs) if owner is None or job.owner == owner]
+
+    def stats(self):
+        """
+        Counters for display: running, queued and finished jobs plus the configured limits.
+        """
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            'running': statuses.count(RUNNING),
+            'queued': statuses.count(QUEUED),
+            'finished': sum(status in FINISHED for status in statuses),
+            'max_workers': self.max_workers,
+            'max_pending': self.max_pending,
+        }
+
+    def shutdown(self, wait=True):
+        """
+        Cancel queued jobs and stop the pool (running jobs finish first if wait is True).
+        """
+        for job in self.jobs():
+            if job.status == QUEUED:
+                self.cancel(job.id)
+        self._pool.shutdown(wait=wait, cancel_futures=True)
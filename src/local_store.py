@@ -0,0 +1,211 @@
+import pandas as pd
+import numpy as np
+import glob
+import os
+import shutil
+import time
+import uuid
+
+import schema
+
+# Columnar local data store: Parquet datasets under data/, one per table,
+# hive-partitioned by month (data/sales_history/Month=2025-01/...).
+# Columns are typed (date32 Date, dictionary-encoded Store, int32 measures) and files are
+# sorted by Store and Date, so readers get column projection, partition pruning on Month,
+# row-group pruning on Store/Date and memory-mapped reads. CSV is an export format only.
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+DATA_DIR = os.path.join(project_root, 'data')
+
+PARTITION_COLUMN = 'Month'
+
+# A reader that hits a dataset swap in progress (see write_dataset) retries this often
+SWAP_RETRIES = 40
+SWAP_RETRY_SECONDS = 0.05
+
+# Measure column (stored as int32) for each dataset
+DATASETS = {
+    'sales_history': 'Sales',
+    'forecast_results': 'Predicted_Demand',
+    'forecast_samples': 'Predicted_Demand',
+}
+
+# Further int32 columns, written when the frame has them (forecast intervals, sample ids)
+EXTRA_COLUMNS = {
+    'forecast_results': ['Predicted_Lower', 'Predicted_Upper'],
+    'forecast_samples': ['Sample'],
+}
+
+def _schema(name, extra=()):
+    import pyarrow as pa
+
+    return pa.schema([
+        ('Date', pa.date32()),
+        ('Store', pa.dictionary(pa.int32(), pa.string())),
+        (DATASETS[name], pa.int32()),
+    ] + [(col, pa.int32()) for col in extra])
+
+def dataset_path(name, data_dir=DATA_DIR):
+    return os.path.join(data_dir, name)
+
+def _swap_in_progress(name, data_dir=DATA_DIR):
+    return bool(glob.glob(f"{glob.escape(dataset_path(name, data_dir))}.old-*"))
+
+def dataset_exists(name, data_dir=DATA_DIR):
+    return (bool(glob.glob(os.path.join(dataset_path(name, data_dir), '**', '*.parquet'), recursive=True))
+            or _swap_in_progress(name, data_dir))
+
+def write_dataset(df, name, data_dir=DATA_DIR, partition_by_store=False, append=False):
+    """
+    Write a Date / Store / <measure> (+ EXTRA_COLUMNS present in df) frame as a Parquet dataset partitioned by month
+    (and optionally by store). Without append, the new dataset is written next to the old one
+    and swapped in with two renames; the path is briefly missing in between, which
+    read_dataset waits out. With append, new files are added next to the existing ones
+    (e.g. streamed store blocks).
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    measure = DATASETS[name]
+    extra = [col for col in EXTRA_COLUMNS.get(name, []) if col in df.columns]
+    frame = pd.DataFrame({
+        'Date': pd.to_datetime(df['Date']).dt.normalize(),
+        'Store': df['Store'].astype(str),
+        **{col: np.asarray(df[col]).round().astype(np.int32) for col in [measure] + extra},
+    }).sort_values(['Store', 'Date'], kind='stable')
+    # 'YYYY-MM' labels, formatted once per month rather than once per row
+    month_key = frame['Date'].dt.year * 100 + frame['Date'].dt.month
+    frame[PARTITION_COLUMN] = month_key.map({k: f"{k // 100:04d}-{k % 100:02d}" for k in month_key.unique()})
+
+    # Every stored store is in the directory's dictionary (latest_dates lists stores from it)
+    schema.use_data_dir(data_dir)
+    stores = frame['Store'].unique()
+    if not set(stores) <= schema.store_codes().keys():
+        schema.register_stores(stores)
+        schema.save_store_codes()
+
+    arrow_schema = _schema(name, extra).append(pa.field(PARTITION_COLUMN, pa.string()))
+    table = pa.Table.from_pandas(frame, schema=arrow_schema, preserve_index=False)
+    partition_cols = [PARTITION_COLUMN] + (['Store'] if partition_by_store else [])
+
+    target = dataset_path(name, data_dir)
+    out_dir = target if append else f"{target}.tmp-{uuid.uuid4().hex[:8]}"
+    ds.write_dataset(
+        table, out_dir, format='parquet',
+        partitioning=ds.partitioning(table.select(partition_cols).schema, flavor='hive'),
+        basename_template=f"part-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore',
+        max_rows_per_group=128 * 1024,
+    )
+
+    if not append:
+        # Swap the new dataset in, then remove the old one (readers retry while .old-* exists)
+        old_dir = f"{target}.old-{uuid.uuid4().hex[:8]}"
+        if os.path.exists(target):
+            os.replace(target, old_dir)
+        os.replace(out_dir, target)
+        shutil.rmtree(old_dir, ignore_errors=True)
+    return len(frame)
+
+def read_dataset(name, columns=None, stores=None, start_date=None, end_date=None, data_dir=DATA_DIR):
+    """
+    Read a dataset with column projection and predicate push-down.
+    Only the months overlapping [start_date, end_date] are opened, and row groups are
+    skipped by their Store/Date statistics. Files are memory-mapped.
+    Falls back to the legacy CSV (data/<name>.csv) if the dataset does not exist yet.
+    A read that runs into a write_dataset swap is retried on the new dataset.
+    """
+    import pyarrow.parquet as pq
+
+    schema.use_data_dir(data_dir)  # Store codes come from this directory's dictionary
+    columns = list(columns) if columns is not None else None
+    start_date = pd.Timestamp(start_date) if start_date is not None else None
+    end_date = pd.Timestamp(end_date) if end_date is not None else None
+
+    if not dataset_exists(name, data_dir):
+        csv_path = f"{dataset_path(name, data_dir)}.csv"
+        if not os.path.exists(csv_path):
+            raise FileNotFoundError(f"No dataset or CSV found for '{name}' in {data_dir}")
+        df = schema.apply_schema(pd.read_csv(csv_path, parse_dates=['Date']))
+        columns = columns or list(df.columns)
+        mask = pd.Series(True, index=df.index)
+        if stores is not None:
+            mask &= df['Store'].isin(list(stores))
+        if start_date is not None:
+            mask &= df['Date'] >= start_date
+        if end_date is not None:
+            mask &= df['Date'] <= end_date
+        return df.loc[mask, columns].reset_index(drop=True)
+
+    filters = []
+    if stores is not None:
+        filters.append(('Store', 'in', [str(s) for s in stores]))
+    if start_date is not None:
+        filters.append((PARTITION_COLUMN, '>=', start_date.strftime('%Y-%m')))
+        filters.append(('Date', '>=', start_date.date()))
+    if end_date is not None:
+        filters.append((PARTITION_COLUMN, '<=', end_date.strftime('%Y-%m')))
+        filters.append(('Date', '<=', end_date.date()))
+
+    for attempt in range(SWAP_RETRIES):
+        try:
+            table = pq.read_table(dataset_path(name, data_dir), columns=columns, filters=filters or None,
+                                  memory_map=True, partitioning='hive')
+            break
+        except FileNotFoundError:
+            # Path missing between the two renames, or files removed with the old dataset
+            if attempt == SWAP_RETRIES - 1:
+                raise
+            time.sleep(SWAP_RETRY_SECONDS)
+    if columns is None:
+        # All stored columns, without the partition key
+        table = table.drop([PARTITION_COLUMN])
+    df = table.to_pandas(date_as_object=False)
+
+    # Shared in-memory dtypes: datetime64 Date, categorical Store (shared codes), int32 measures
+    df = schema.apply_schema(df)
+    if 'Date' in df and 'Store' in df:
+        df = df.sort_values(['Store', 'Date'], kind='stable')
+    return df.reset_index(drop=True)
+
+def latest_dates(name, data_dir=DATA_DIR):
+    """
+    Last stored Date per Store (a Series indexed by Store).
+    Dates come from the newest month partition. The store list comes from the persisted
+    store-codes dictionary, so only stores without rows in the newest month are looked up
+    in the older partitions (their rows only). Falls back to the legacy CSV if the dataset does not exist yet.
+    """
+    if not dataset_exists(name, data_dir):
+        df = read_dataset(name, columns=['Date', 'Store'], data_dir=data_dir)
+        return df.groupby('Store', observed=True)['Date'].max()
+
+    prefix = f"{PARTITION_COLUMN}="
+    months = sorted(d[len(prefix):] for d in os.listdir(dataset_path(name, data_dir)) if d.startswith(prefix))
+    newest = pd.Timestamp(f"{months[-1]}-01")
+    latest = read_dataset(name, columns=['Date', 'Store'], start_date=newest,
+                          data_dir=data_dir).groupby('Store', observed=True)['Date'].max()
+
+    # Stores that stopped before the newest month (or were added to older months only)
+    schema.use_data_dir(data_dir)
+    stores = schema.store_codes()
+    if not stores:
+        # Dataset written before the dictionary was persisted: scan Store once and save it
+        stores = read_dataset(name, columns=['Store'], data_dir=data_dir)['Store'].unique()
+        schema.register_stores(stores)
+        schema.save_store_codes()
+    missing = [str(s) for s in stores if s not in latest.index]
+    if missing:
+        older = read_dataset(name, columns=['Date', 'Store'], stores=missing, end_date=newest - pd.Timedelta(days=1),
+                             data_dir=data_dir).groupby('Store', observed=True)['Date'].max()
+        latest = pd.concat([latest, older])
+        latest.index = schema.encode_stores(latest.index.astype(str))
+    return latest.sort_index()
+
+def export_csv(name, output_path=None, data_dir=DATA_DIR):
+    """
+    Export a dataset to CSV (default: data/<name>.csv). Returns the output path.
+    """
+    output_path = output_path or f"{dataset_path(name, data_dir)}.csv"
+    read_dataset(name, data_dir=data_dir).to_csv(output_path, index=False)
+    return output_path
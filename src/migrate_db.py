@@ -1,53 +1,451 @@
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import glob
+import io
 import os
-import streamlit as st
+import time
+
+import data_access
+import instrumentation
+import local_store
 
 # Function to get DB connection URL
 def get_db_connection_url():
-    # 1. Try to get from Streamlit Secrets
+    # 1. Try to get from Streamlit Secrets (streamlit is only imported here, not by the ETL scripts)
     try:
+        import streamlit as st
+
         return st.secrets["connections"]["supabase"]["url"]
-    except (FileNotFoundError, KeyError):
+    except (ImportError, FileNotFoundError, KeyError):
         pass # Maybe run in GitHub Actions?
 
     # 2. try to get from Environment Variables (GitHub Actions)
     url = os.environ.get("SUPABASE_URL")
     if url:
         return url
-    
+
     raise ValueError("Database connection URL not found in st.secrets or Environment Variables.")
 
-# 1. Load local CSV files
-current_dir = os.path.dirname(os.path.abspath(__file__))
-project_root = os.path.dirname(current_dir)
-data_dir = os.path.join(project_root, 'data')
-
-try:
-    df_history = pd.read_csv(os.path.join(data_dir, 'sales_history.csv'))
-    df_forecast = pd.read_csv(os.path.join(data_dir, 'forecast_results.csv'))
-    print("Downloaded local CSV files successfully.")
-except FileNotFoundError:
-    print("Data files not found locally. Please run data_gen.py and forecast.py first.")
-    exit()
-
-# 2. connect to Cloud Database
-conn_str = get_db_connection_url()
-engine = create_engine(
-    conn_str,
-    connect_args={'prepare_threshold': None} 
-)
-
-print("Connected to Cloud Database successfully.")
-
-# 3. pass data to Cloud Database
-try:
-    df_history.to_sql('sales_history', engine, if_exists='replace', index=False)
-    print("   - Table 'sales_history': Uploaded")
-    
-    df_forecast.to_sql('forecast_results', engine, if_exists='replace', index=False)
-    print("   - Table 'forecast_results': Uploaded")
-    
-    print("\n Migration completed successfully!")
-except Exception as e:
-    print(f"\n Error: {e}")
\ No newline at end of file
+def get_engine(conn_str=None, pool_size=5):
+    """
+    Create the SQLAlchemy engine for the Cloud Database.
+    """
+    return create_engine(
+        conn_str or get_db_connection_url(),
+        connect_args={'prepare_threshold': None},
+        pool_size=pool_size
+    )
+
+# Table definitions: key columns for upserts and the value columns to compare/update
+TABLES = {
+    'sales_history': {'key': ['Store', 'Date'], 'values': ['Sales']},
+    'forecast_results': {'key': ['Store', 'Date'], 'values': ['Predicted_Demand', 'Predicted_Lower', 'Predicted_Upper']},
+}
+
+def _q(name):
+    return f'"{name}"'
+
+def ensure_schema(engine):
+    """
+    Create the tables (if missing) plus the unique key and indexes that
+    incremental sync relies on. Safe to run on every sync.
+    """
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE IF NOT EXISTS sales_history ('
+            '"Date" TIMESTAMP NOT NULL, "Store" TEXT NOT NULL, "Sales" BIGINT, '
+            'PRIMARY KEY ("Store", "Date"))'
+        ))
+        conn.execute(text(
+            'CREATE TABLE IF NOT EXISTS forecast_results ('
+            '"Date" TIMESTAMP NOT NULL, "Predicted_Demand" BIGINT, "Store" TEXT NOT NULL, '
+            '"Predicted_Lower" BIGINT, "Predicted_Upper" BIGINT, '
+            'PRIMARY KEY ("Store", "Date"))'
+        ))
+        # Tables written by older versions (to_sql of an unparsed CSV) store "Date" as text,
+        # which the rollups and date comparisons cannot use: convert it once, in place
+        legacy = conn.execute(text(
+            "SELECT table_name FROM information_schema.columns WHERE table_schema = current_schema() "
+            "AND column_name = 'Date' AND data_type IN ('text', 'character varying') "
+            "AND table_name IN ('sales_history', 'forecast_results')"
+        )).scalars().all()
+        for table in legacy:
+            conn.execute(text(f'ALTER TABLE {table} ALTER COLUMN "Date" TYPE timestamp USING "Date"::timestamp'))
+        # Forecast intervals were added later; tables from older versions get the columns here
+        for col in ['Predicted_Lower', 'Predicted_Upper']:
+            conn.execute(text(f'ALTER TABLE forecast_results ADD COLUMN IF NOT EXISTS {_q(col)} BIGINT'))
+        # Tables created by a full replace (to_sql) have no key yet
+        for table, spec in TABLES.items():
+            key_cols = ', '.join(_q(c) for c in spec['key'])
+            conn.execute(text(f'CREATE UNIQUE INDEX IF NOT EXISTS {table}_store_date_key ON {table} ({key_cols})'))
+            conn.execute(text(f'CREATE INDEX IF NOT EXISTS {table}_date_idx ON {table} ("Date")'))
+
+def get_watermarks(engine, table='sales_history'):
+    """
+    Latest stored Date per store: {store: Timestamp}.
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(text(f'SELECT "Store", MAX("Date") FROM {table} GROUP BY "Store"')).fetchall()
+    return {store: pd.Timestamp(max_date) for store, max_date in rows}
+
+def _columns(table, df):
+    """
+    Key and value columns of a table that df provides (older forecasts have no intervals).
+    """
+    spec = TABLES[table]
+    return spec['key'] + [c for c in spec['values'] if c in df.columns]
+
+def _rows_after_watermark(df, watermarks, lookback_days=0):
+    """
+    Rows newer than each store's watermark (minus an optional lookback to catch late corrections).
+    Stores without a watermark are sent in full.
+    """
+    cutoff = df['Store'].map(watermarks)
+    cutoff = pd.to_datetime(cutoff) - pd.Timedelta(days=lookback_days)
+    return df[cutoff.isna() | (df['Date'] > cutoff)]
+
+def upsert_rows(engine, table, df):
+    """
+    Load df into a staging table, then INSERT ... ON CONFLICT into the target.
+    Only rows whose values actually changed are rewritten. Returns the number of rows upserted.
+    """
+    if df.empty:
+        return 0
+    spec = TABLES[table]
+    columns = _columns(table, df)
+    values = columns[len(spec['key']):]
+    col_list = ', '.join(_q(c) for c in columns)
+    key_list = ', '.join(_q(c) for c in spec['key'])
+    updates = ', '.join(f'{_q(c)} = EXCLUDED.{_q(c)}' for c in values)
+    changed = ' OR '.join(f'{table}.{_q(c)} IS DISTINCT FROM EXCLUDED.{_q(c)}' for c in values)
+    staging = f'{table}_staging'
+
+    with instrumentation.span('upsert', table=table), engine.begin() as conn:
+        df[columns].to_sql(staging, conn, if_exists='replace', index=False)
+        result = conn.execute(text(
+            f'INSERT INTO {table} ({col_list}) SELECT {col_list} FROM {staging} '
+            f'ON CONFLICT ({key_list}) DO UPDATE SET {updates} WHERE {changed}'
+        ))
+        conn.execute(text(f'DROP TABLE {staging}'))
+    instrumentation.record('db_write', table=table, method='upsert', rows=len(df),
+                           bytes=instrumentation.frame_bytes(df[columns]), rows_changed=result.rowcount)
+    return result.rowcount
+
+def swap_table(engine, table, df):
+    """
+    Replace the full contents of a table atomically through a staging table.
+    Readers see either the old or the new data, never an empty table; grants and
+    policies on the target table are kept because it is never dropped.
+    """
+    columns = _columns(table, df)
+    col_list = ', '.join(_q(c) for c in columns)
+    staging = f'{table}_staging'
+
+    with instrumentation.span('swap', table=table):
+        # Stage outside the swap transaction so the slow part does not hold locks
+        df[columns].to_sql(staging, engine, if_exists='replace', index=False)
+        with engine.begin() as conn:
+            conn.execute(text(f'DELETE FROM {table}'))
+            conn.execute(text(f'INSERT INTO {table} ({col_list}) SELECT {col_list} FROM {staging}'))
+            conn.execute(text(f'DROP TABLE {staging}'))
+    instrumentation.record('db_write', table=table, method='swap', rows=len(df),
+                           bytes=instrumentation.frame_bytes(df[columns]))
+    return len(df)
+
+COPY_CHUNK_SIZE = 1 << 20  # Bytes per write to COPY
+
+class _RangeReader:
+    """
+    File-like view over a byte range of a file, counting bytes and lines as COPY reads them.
+    """
+    def __init__(self, path, start, end):
+        self._f = open(path, 'rb')
+        self._f.seek(start)
+        self._remaining = end - start
+        self.bytes_sent = 0
+        self.rows_sent = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        chunk = self._f.read(size)
+        self._remaining -= len(chunk)
+        self.bytes_sent += len(chunk)
+        self.rows_sent += chunk.count(b'\n')
+        return chunk
+
+    def close(self):
+        self._f.close()
+
+def _csv_partitions(path, n_parts):
+    """
+    Split a CSV file (after its header) into n_parts byte ranges aligned to line boundaries.
+    Returns (header columns, [(start, end), ...]). Assumes no quoted newlines, as in our exports.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.readline()
+        data_start = f.tell()
+        bounds = [data_start]
+        for i in range(1, n_parts):
+            f.seek(max(data_start + (size - data_start) * i // n_parts, bounds[-1]))
+            if f.tell() > data_start:
+                f.readline()  # Move to the start of the next full line
+            bounds.append(min(f.tell(), size))
+        bounds.append(size)
+    columns = header.decode('utf-8').strip().split(',')
+    ranges = [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+    return columns, ranges
+
+def _copy_stream(raw_conn, copy_sql, reader):
+    """
+    Stream a file-like object into COPY FROM STDIN (psycopg2 or psycopg 3).
+    """
+    cursor = raw_conn.cursor()
+    try:
+        if hasattr(cursor, 'copy_expert'):  # psycopg2
+            cursor.copy_expert(copy_sql, reader, size=COPY_CHUNK_SIZE)
+        else:  # psycopg 3
+            with cursor.copy(copy_sql) as copy:
+                while chunk := reader.read(COPY_CHUNK_SIZE):
+                    copy.write(chunk)
+        raw_conn.commit()
+    finally:
+        cursor.close()
+
+def _arrow_partitions(path, n_parts):
+    """
+    Split a Parquet file, or a partitioned Parquet dataset directory, into groups of
+    (file, row group) pieces, one group per connection.
+    """
+    import pyarrow.parquet as pq
+
+    files = sorted(glob.glob(os.path.join(path, '**', '*.parquet'), recursive=True)) if os.path.isdir(path) else [path]
+    pieces = [(f, rg) for f in files for rg in range(pq.ParquetFile(f).num_row_groups)]
+    # Only the data columns; hive partition keys (e.g. Month) live in the directory names
+    columns = pq.ParquetFile(files[0]).schema_arrow.names
+    size = max(1, -(-len(pieces) // n_parts))
+    return columns, [pieces[i:i + size] for i in range(0, len(pieces), size)]
+
+class _ArrowCsvReader:
+    """
+    File-like stream of CSV bytes rendered batch by batch from Parquet row groups.
+    """
+    def __init__(self, pieces):
+        self._batches = self._iter_batches(pieces)
+        self._buffer = b''
+        self.bytes_sent = 0
+        self.rows_sent = 0
+
+    @staticmethod
+    def _iter_batches(pieces):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        for path, row_group in pieces:
+            for batch in pq.ParquetFile(path).iter_batches(row_groups=[row_group]):
+                # Dictionary-encoded columns (e.g. Store) are written out as plain strings
+                yield pa.RecordBatch.from_arrays(
+                    [col.dictionary_decode() if pa.types.is_dictionary(col.type) else col for col in batch.columns],
+                    names=batch.schema.names)
+
+    def read(self, size=-1):
+        import pyarrow.csv as pacsv
+
+        while size < 0 or len(self._buffer) < size:
+            batch = next(self._batches, None)
+            if batch is None:
+                break
+            out = io.BytesIO()
+            pacsv.write_csv(batch, out, write_options=pacsv.WriteOptions(include_header=False))
+            self._buffer += out.getvalue()
+            self.rows_sent += batch.num_rows
+        size = len(self._buffer) if size < 0 else size
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        self.bytes_sent += len(chunk)
+        return chunk
+
+    def close(self):
+        pass
+
+def copy_load_file(engine, table, path, workers=4):
+    """
+    Bulk-load a CSV file, Parquet file or local Parquet dataset directory into a table
+    with COPY FROM STDIN.
+    The file is split into `workers` partitions and each partition is streamed over its
+    own pooled connection into an UNLOGGED staging table, without reading the file into pandas.
+    The staging data then replaces the table contents in one transaction.
+    Returns stats: rows, bytes sent, seconds and rows/sec.
+    """
+    start_time = time.perf_counter()
+    is_arrow = os.path.isdir(path) or path.endswith(('.parquet', '.arrow'))
+    if is_arrow:
+        columns, partitions = _arrow_partitions(path, workers)
+        make_reader = lambda part: _ArrowCsvReader(part)
+    else:
+        columns, partitions = _csv_partitions(path, workers)
+        make_reader = lambda part: _RangeReader(path, *part)
+
+    col_list = ', '.join(_q(c) for c in columns)
+    staging = f'{table}_staging'
+    copy_sql = f'COPY {staging} ({col_list}) FROM STDIN WITH (FORMAT csv)'
+
+    ensure_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(text(f'DROP TABLE IF EXISTS {staging}'))
+        conn.execute(text(f'CREATE UNLOGGED TABLE {staging} (LIKE {table} INCLUDING DEFAULTS)'))
+
+    def load_partition(part):
+        reader = make_reader(part)
+        raw_conn = engine.raw_connection()
+        try:
+            _copy_stream(raw_conn, copy_sql, reader)
+        finally:
+            raw_conn.close()
+            reader.close()
+        return reader.rows_sent, reader.bytes_sent
+
+    with ThreadPoolExecutor(max_workers=max(1, len(partitions))) as pool:
+        results = list(pool.map(load_partition, partitions))
+
+    # Swap the staged rows in atomically
+    with engine.begin() as conn:
+        conn.execute(text(f'DELETE FROM {table}'))
+        conn.execute(text(f'INSERT INTO {table} ({col_list}) SELECT {col_list} FROM {staging}'))
+        conn.execute(text(f'DROP TABLE {staging}'))
+
+    elapsed = time.perf_counter() - start_time
+    rows = sum(r for r, _ in results)
+    instrumentation.record('db_write', table=table, method='copy', rows=rows,
+                           bytes=sum(b for _, b in results), seconds=round(elapsed, 6), partitions=len(partitions))
+    return {
+        'table': table,
+        'rows': rows,
+        'bytes_sent': sum(b for _, b in results),
+        'partitions': len(partitions),
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed > 0 else float('nan'),
+    }
+
+def sync_incremental(engine, df_history, df_forecast, lookback_days=0):
+    """
+    Incremental sync: upsert only sales rows past each store's watermark
+    and swap the forecast table atomically.
+    """
+    ensure_schema(engine)
+
+    watermarks = get_watermarks(engine, 'sales_history')
+    new_history = _rows_after_watermark(df_history, watermarks, lookback_days)
+    history_rows = upsert_rows(engine, 'sales_history', new_history)
+    print(f"   - Table 'sales_history': {len(new_history)} rows past watermark, {history_rows} inserted/updated")
+
+    forecast_rows = swap_table(engine, 'forecast_results', df_forecast)
+    print(f"   - Table 'forecast_results': {forecast_rows} rows swapped in")
+
+    with instrumentation.span('refresh_rollups'):
+        data_access.refresh_rollups(engine)
+    print("   - Rollups (weekly/monthly sales): Refreshed")
+
+def sync_full(engine, df_history, df_forecast):
+    """
+    Full reload: replace both tables, then add the keys, indexes and rollups.
+    """
+    # The rollup views depend on sales_history, which to_sql drops and recreates
+    data_access.drop_rollups(engine)
+    for table, df in [('sales_history', df_history), ('forecast_results', df_forecast)]:
+        with instrumentation.span('to_sql', table=table) as s:
+            df.to_sql(table, engine, if_exists='replace', index=False)
+        instrumentation.record('db_write', table=table, method='to_sql', rows=len(df),
+                               bytes=instrumentation.frame_bytes(df), seconds=s['seconds'])
+        print(f"   - Table '{table}': Uploaded")
+
+    ensure_schema(engine)
+    with instrumentation.span('refresh_rollups'):
+        data_access.refresh_rollups(engine)
+    print("   - Rollups (weekly/monthly sales): Refreshed")
+
+def upload_scenarios(engine, df_scenarios):
+    """
+    Replace the pre-computed what-if table (src/scenarios.py).
+    """
+    df_scenarios.to_sql('scenario_results', engine, if_exists='replace', index=False)
+    instrumentation.record('db_write', table='scenario_results', method='to_sql', rows=len(df_scenarios),
+                           bytes=instrumentation.frame_bytes(df_scenarios))
+    print("   - Table 'scenario_results': Uploaded")
+
+def _write_metrics(args):
+    if args.metrics:
+        print(f"Metrics written to: {instrumentation.write_metrics(args.metrics, script='migrate_db', mode=args.mode)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upload generated data to the Cloud Database.")
+    parser.add_argument("--mode", choices=['full', 'incremental'], default='full',
+                        help="full: replace tables; incremental: upsert new history rows and swap forecasts")
+    parser.add_argument("--lookback-days", type=int, default=0,
+                        help="Incremental mode: also re-check this many days before each store's watermark")
+    parser.add_argument("--loader", choices=['to_sql', 'copy'], default='to_sql',
+                        help="Full mode: 'copy' streams the local datasets into COPY FROM STDIN in parallel")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel connections for the COPY loader")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.configure_from_args(args)
+
+    # 1. Load local data (Parquet datasets under data/)
+    data_dir = local_store.DATA_DIR
+
+    if args.mode == 'full' and args.loader == 'copy':
+        # Stream the files straight into the database without loading them into pandas
+        engine = get_engine(pool_size=args.workers)
+        try:
+            with instrumentation.span('upload'):
+                for table in ['sales_history', 'forecast_results']:
+                    path = local_store.dataset_path(table)
+                    if not local_store.dataset_exists(table):
+                        path = f'{path}.csv'
+                    stats = copy_load_file(engine, table, path, workers=args.workers)
+                    print(f"   - Table '{table}': {stats['rows']} rows, {stats['bytes_sent'] / 1e6:.1f} MB "
+                          f"in {stats['seconds']:.2f}s ({stats['rows_per_sec']:,.0f} rows/sec, "
+                          f"{stats['partitions']} partitions)")
+                with instrumentation.span('refresh_rollups'):
+                    data_access.refresh_rollups(engine)
+            print("   - Rollups (weekly/monthly sales): Refreshed")
+            print("\n Migration completed successfully!")
+        except Exception as e:
+            print(f"\n Error: {e}")
+        _write_metrics(args)
+        exit()
+
+    try:
+        with instrumentation.span('load') as span:
+            df_history = local_store.read_dataset('sales_history')
+            df_forecast = local_store.read_dataset('forecast_results')
+            span['rows'] = len(df_history) + len(df_forecast)
+        print("Loaded local datasets successfully.")
+    except FileNotFoundError:
+        print("Data files not found locally. Please run data_gen.py and forecast.py first.")
+        exit()
+
+    # 2. connect to Cloud Database
+    engine = get_engine()
+
+    print("Connected to Cloud Database successfully.")
+
+    # 3. pass data to Cloud Database
+    try:
+        with instrumentation.span('upload'):
+            if args.mode == 'incremental':
+                sync_incremental(engine, df_history, df_forecast, lookback_days=args.lookback_days)
+            else:
+                sync_full(engine, df_history, df_forecast)
+
+            # Optional: pre-computed what-if scenarios (src/scenarios.py)
+            scenario_path = os.path.join(data_dir, 'scenario_results.csv')
+            if os.path.exists(scenario_path):
+                upload_scenarios(engine, pd.read_csv(scenario_path, parse_dates=['Date']))
+
+        print("\n Migration completed successfully!")
+    except Exception as e:
+        print(f"\n Error: {e}")
+    _write_metrics(args)
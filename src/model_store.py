@@ -0,0 +1,114 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import json
+import os
+import re
+
+# On-disk cache of fitted Prophet models, one JSON file per store.
+# Each entry records what the model was trained on so the next run can decide
+# whether to reuse it as-is ('hit'), warm-start from it ('warm') or refit ('miss').
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+DEFAULT_MODEL_DIR = os.path.join(project_root, 'data', 'models')
+
+def hash_config(config):
+    """
+    Stable hash of the model configuration (holiday rules, seasonality flags).
+    """
+    payload = json.dumps(config, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+def hash_training_data(store_data, n_rows=None):
+    """
+    Content hash of a Prophet training slice (columns 'ds' and 'y').
+    If n_rows is given, only the first n_rows (in date order) are hashed.
+    """
+    data = store_data.sort_values('ds')
+    if n_rows is not None:
+        data = data.head(n_rows)
+    ds = pd.to_datetime(data['ds']).to_numpy(dtype='datetime64[ns]').view(np.int64)
+    y = data['y'].to_numpy(dtype=np.float64)
+
+    h = hashlib.sha256()
+    h.update(np.ascontiguousarray(ds).tobytes())
+    h.update(np.ascontiguousarray(y).tobytes())
+    return h.hexdigest()
+
+def _entry_path(model_dir, store_name):
+    safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', str(store_name))
+    return os.path.join(model_dir, f"{safe_name}.json")
+
+def load_model_entry(model_dir, store_name):
+    """
+    Return the cached entry for a store, or None if there is none (or it is unreadable).
+    """
+    path = _entry_path(model_dir, store_name)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_model_entry(model_dir, store_name, model, store_data, config_hash):
+    """
+    Serialize a fitted model together with the fingerprint of its inputs.
+    """
+    from prophet.serialize import model_to_json
+
+    os.makedirs(model_dir, exist_ok=True)
+    entry = {
+        'store': store_name,
+        'config_hash': config_hash,
+        'data_hash': hash_training_data(store_data),
+        'n_rows': int(len(store_data)),
+        'model': model_to_json(model),
+    }
+    path = _entry_path(model_dir, store_name)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, path)  # Atomic swap so readers never see a half-written file
+
+def classify_entry(entry, store_data, config_hash):
+    """
+    Compare a cached entry against the current training slice.
+    - 'hit':  same config and identical data -> reuse the fitted model
+    - 'warm': same config and the cached data is a prefix of the new data -> warm start
+    - 'miss': anything else -> full refit
+    """
+    if entry is None or entry.get('config_hash') != config_hash:
+        return 'miss'
+    n_rows = entry.get('n_rows', 0)
+    if n_rows == len(store_data) and entry.get('data_hash') == hash_training_data(store_data):
+        return 'hit'
+    if 0 < n_rows < len(store_data) and entry.get('data_hash') == hash_training_data(store_data, n_rows):
+        return 'warm'
+    return 'miss'
+
+def load_model(entry):
+    """
+    Rebuild the Prophet model stored in a cache entry.
+    """
+    from prophet.serialize import model_from_json
+    return model_from_json(entry['model'])
+
+def warm_start_params(model):
+    """
+    Extract fitted parameters to use as Stan initial values for a new fit.
+    """
+    res = {}
+    for pname in ['k', 'm', 'sigma_obs']:
+        if model.mcmc_samples == 0:
+            res[pname] = model.params[pname][0][0]
+        else:
+            res[pname] = np.mean(model.params[pname])
+    for pname in ['delta', 'beta']:
+        if model.mcmc_samples == 0:
+            res[pname] = model.params[pname][0]
+        else:
+            res[pname] = np.mean(model.params[pname], axis=0)
+    return res
@@ -1,8 +1,94 @@
 import pandas as pd
-from pulp import *
+import numpy as np
+import argparse
 import os
+import time
+import zlib
 
-def optimize_distribution(forecast_df, warehouse_stock, shipping_costs):
+import instrumentation
+import local_store
+import schema
+from demand_scenarios import DEFAULT_DEMAND_CV, sample_scenarios
+
+# Penalty for not selling an item (Lost Opportunity) -> Set high to prioritize fulfillment
+SHORTAGE_PENALTY = 1000
+
+# Default Shipping Costs (Store A is far, Store E is close)
+DEFAULT_SHIPPING_COSTS = {
+    'Store_A': 15, # Expensive to ship
+    'Store_B': 10,
+    'Store_C': 12,
+    'Store_D': 8,
+    'Store_E': 5   # Cheap to ship
+}
+
+def shipping_costs_for(stores, seed=0):
+    """
+    Shipping cost for every store: DEFAULT_SHIPPING_COSTS where defined, otherwise a
+    seeded cost in the same 3-19 THB range. Each store's cost depends only on its name
+    and the seed, so it does not change when stores are added or removed.
+    """
+    costs = {}
+    for store in stores:
+        store = str(store)
+        if store in DEFAULT_SHIPPING_COSTS:
+            costs[store] = DEFAULT_SHIPPING_COSTS[store]
+        else:
+            rng = np.random.default_rng([seed, zlib.crc32(store.encode())])
+            costs[store] = int(rng.integers(3, 20))
+    return costs
+
+def _is_whole(values):
+    values = np.asarray(values, dtype=np.float64)
+    return bool(np.all(np.isfinite(values)) and np.all(values == np.round(values)))
+
+def can_solve_greedy(forecast_df, warehouse_stock, shipping_costs):
+    """
+    Check whether the allocation fits the single-warehouse structure that
+    solve_allocation_greedy() handles exactly: unique stores, a cost for every store,
+    non-negative whole-unit demands and stock.
+    """
+    stores = forecast_df['Store'].tolist()
+    demands = forecast_df['Predicted_Demand'].to_numpy()
+    if len(set(stores)) != len(stores) or any(s not in shipping_costs for s in stores):
+        return False
+    if not _is_whole(demands) or (demands < 0).any():
+        return False
+    return _is_whole([warehouse_stock]) and warehouse_stock >= 0
+
+def solve_allocation_greedy(forecast_df, warehouse_stock, shipping_costs):
+    """
+    Exact closed-form solution of the single-warehouse allocation, O(n log n).
+
+    With a uniform SHORTAGE_PENALTY, every unit shipped to store s saves
+    (SHORTAGE_PENALTY - shipping_costs[s]). The optimum therefore fills stores in
+    order of increasing shipping cost until the warehouse runs out, and never ships
+    to a store whose cost is at least the penalty.
+    Returns the same DataFrame as optimize_distribution().
+    """
+    stores = forecast_df['Store'].to_numpy()
+    demands = forecast_df['Predicted_Demand'].to_numpy(dtype=np.int64)
+    costs = np.array([shipping_costs[s] for s in stores], dtype=np.float64)
+
+    # Fill the cheapest stores first (stable, so ties keep input order)
+    order = np.argsort(costs, kind='stable')
+    sorted_demand = np.where(costs[order] < SHORTAGE_PENALTY, demands[order], 0)
+    shipped_before = np.cumsum(sorted_demand) - sorted_demand
+    sorted_alloc = np.clip(int(warehouse_stock) - shipped_before, 0, sorted_demand)
+
+    allocated = np.empty_like(demands)
+    allocated[order] = sorted_alloc
+    shortage = demands - allocated
+
+    return pd.DataFrame({
+        'Store': stores,
+        'Predicted_Demand': forecast_df['Predicted_Demand'].to_numpy(),
+        'Allocated_Qty': allocated.astype(int),
+        'Shortage_Qty': shortage.astype(int),
+        'Status': np.where(shortage == 0, 'Fulfilled', 'Stockout')
+    })
+
+def optimize_distribution(forecast_df, warehouse_stock, shipping_costs, solver='auto'):
     """
     Use Linear Programming to calculate the optimal amount of stock to send to each store.
     Objective: Minimize Total Costs (Shipping Cost + Shortage Penalty Cost).
@@ -10,11 +96,25 @@ def optimize_distribution(forecast_df, warehouse_stock, shipping_costs):
     Constraints:
     1. Cannot ship more than available warehouse stock.
     2. Ideally, shipped amount should meet predicted demand (soft constraint).
+
+    solver: 'auto' uses the exact closed-form greedy fill when the problem fits it
+    and falls back to the PuLP/CBC model otherwise; 'greedy' or 'lp' force one path.
     """
-    
+    if solver == 'greedy' or (solver == 'auto' and can_solve_greedy(forecast_df, warehouse_stock, shipping_costs)):
+        return instrumentation.timed_solve('greedy', lambda: solve_allocation_greedy(forecast_df, warehouse_stock, shipping_costs),
+                                           status_of=lambda _: 'Optimal', stores=len(forecast_df))
+    return solve_allocation_lp(forecast_df, warehouse_stock, shipping_costs)
+
+def solve_allocation_lp(forecast_df, warehouse_stock, shipping_costs):
+    """
+    The allocation as an integer program solved by PuLP/CBC.
+    PuLP is imported here, on first use, so importing this module stays cheap.
+    """
+    import pulp
+
     # 1. Setup the Problem
     # We want to minimize costs
-    prob = LpProblem("Inventory_Allocation_Optimization", LpMinimize)
+    prob = pulp.LpProblem("Inventory_Allocation_Optimization", pulp.LpMinimize)
     
     # Get list of stores and their predicted demand
     stores = forecast_df['Store'].tolist()
@@ -23,24 +123,22 @@ def optimize_distribution(forecast_df, warehouse_stock, shipping_costs):
     
     # 2. Define Variables (Decision Variables)
     # 'ship_vars': How much to send to each store? (Integer, >= 0)
-    ship_vars = LpVariable.dicts("Ship", stores, lowBound=0, cat='Integer')
+    ship_vars = pulp.LpVariable.dicts("Ship", stores, lowBound=0, cat='Integer')
     
     # 'shortage_vars': How much demand is unfulfilled? (Integer, >= 0)
     # We need this to calculate penalty for lost sales
-    shortage_vars = LpVariable.dicts("Shortage", stores, lowBound=0, cat='Integer')
+    shortage_vars = pulp.LpVariable.dicts("Shortage", stores, lowBound=0, cat='Integer')
     
-    # 3. Define Costs
-    # Penalty for not selling an item (Lost Opportunity) -> Set high to prioritize fulfillment
-    SHORTAGE_PENALTY = 1000  
+    # 3. Costs: shipping_costs per store plus the module-level SHORTAGE_PENALTY
     
     # 4. Objective Function: Minimize (Shipping Costs + Shortage Penalties)
-    prob += lpSum([shipping_costs[s] * ship_vars[s] for s in stores]) + \
-            lpSum([SHORTAGE_PENALTY * shortage_vars[s] for s in stores])
+    prob += pulp.lpSum([shipping_costs[s] * ship_vars[s] for s in stores]) + \
+            pulp.lpSum([SHORTAGE_PENALTY * shortage_vars[s] for s in stores])
             
     # 5. Constraints
     
     # Constraint A: Total shipped amount cannot exceed Warehouse Stock
-    prob += lpSum([ship_vars[s] for s in stores]) <= warehouse_stock, "Warehouse_Capacity"
+    prob += pulp.lpSum([ship_vars[s] for s in stores]) <= warehouse_stock, "Warehouse_Capacity"
     
     # Constraint B: Demand fulfillment logic
     # Amount Shipped + Shortage Amount = Predicted Demand
@@ -49,15 +147,15 @@ def optimize_distribution(forecast_df, warehouse_stock, shipping_costs):
         prob += ship_vars[s] + shortage_vars[s] == demand_dict[s], f"Demand_Balance_{s}"
         
     # 6. Solve the problem
-    prob.solve()
+    instrumentation.timed_solve('cbc', prob.solve, status_of=lambda status: pulp.LpStatus[status], stores=len(stores))
     
     # 7. Extract Results
     results = []
-    print(f"\nOptimization Status: {LpStatus[prob.status]}")
+    print(f"\nOptimization Status: {pulp.LpStatus[prob.status]}")
     
     for s in stores:
-        shipped_qty = value(ship_vars[s])
-        shortage_qty = value(shortage_vars[s])
+        shipped_qty = pulp.value(ship_vars[s])
+        shortage_qty = pulp.value(shortage_vars[s])
         
         results.append({
             'Store': s,
@@ -69,25 +167,428 @@ def optimize_distribution(forecast_df, warehouse_stock, shipping_costs):
         
     return pd.DataFrame(results)
 
+def _as_daily_array(values, dates, default=0):
+    """
+    Turn a scalar, dict {date: qty} or Series indexed by date into one value per date.
+    """
+    if values is None:
+        return np.full(len(dates), default, dtype=np.float64)
+    if np.isscalar(values):
+        return np.full(len(dates), values, dtype=np.float64)
+    series = pd.Series(values)
+    series.index = pd.to_datetime(series.index)
+    return series.reindex(dates).fillna(default).to_numpy(dtype=np.float64)
+
+def optimize_horizon(forecast_df, initial_stock, shipping_costs, inbound=None,
+                     store_inventory=None, holding_cost=1.0, warehouse_holding_cost=0.1):
+    """
+    Plan allocations for every forecast day in a single model, with inventory carry-over.
+
+    Per store s and day t:
+        store_inv[s,t] = store_inv[s,t-1] + ship[s,t] - (demand[s,t] - shortage[s,t])
+    Per day t:
+        warehouse_inv[t] = warehouse_inv[t-1] + inbound[t] - sum_s ship[s,t]
+    Objective: shipping + SHORTAGE_PENALTY * lost sales + holding costs.
+
+    The constraint matrix is assembled from index arrays (no per-variable Python loops)
+    and solved with HiGHS through scipy. It is a network-flow structure, so with whole-unit
+    demands and stock the LP optimum is already integral.
+
+    inbound: replenishment arriving at the warehouse (scalar per day, dict or Series by date).
+    store_inventory: opening stock per store (dict), default 0.
+    holding_cost / warehouse_holding_cost: cost per unit per day left at a store / the warehouse.
+    A small warehouse holding cost makes the plan serve earlier days first instead of
+    leaving ties to the solver, which also speeds up the solve considerably.
+    Returns (plan, warehouse_plan): the per store-day allocation and the warehouse inventory per day.
+    """
+    from scipy.optimize import linprog
+    from scipy.sparse import coo_matrix
+
+    # 1. Demand as a (stores x days) matrix
+    demand_df = forecast_df.copy()
+    demand_df['Date'] = pd.to_datetime(demand_df['Date'])
+    demand = demand_df.pivot_table(index='Store', columns='Date', values='Predicted_Demand',
+                                   aggfunc='sum', fill_value=0, sort=False, observed=True)
+    stores = demand.index.to_numpy()
+    dates = demand.columns
+    D = demand.to_numpy(dtype=np.float64)
+    n_stores, n_days = D.shape
+    n = n_stores * n_days
+
+    costs = np.array([shipping_costs[s] for s in stores], dtype=np.float64)
+    opening = np.array([(store_inventory or {}).get(s, 0) for s in stores], dtype=np.float64)
+    inbound_qty = _as_daily_array(inbound, dates)
+
+    # 2. Variable layout: [ship | shortage | store_inv] (each stores x days, row-major), then warehouse_inv (days)
+    SHIP, SHORT, SINV, WINV = 0, n, 2 * n, 3 * n
+    n_vars = 3 * n + n_days
+    sd = np.arange(n).reshape(n_stores, n_days)  # flat index of (s, t)
+
+    c = np.concatenate([
+        np.repeat(costs, n_days),
+        np.full(n, SHORTAGE_PENALTY, dtype=np.float64),
+        np.full(n, holding_cost, dtype=np.float64),
+        np.full(n_days, warehouse_holding_cost, dtype=np.float64)
+    ])
+
+    # 3. Store balance rows (one per store-day):
+    #    store_inv[s,t] - store_inv[s,t-1] - ship[s,t] - shortage[s,t] = -demand[s,t] (+ opening at t=0)
+    rows_s = sd.ravel()
+    prev = sd[:, :-1].ravel()
+    store_rows = np.concatenate([rows_s, sd[:, 1:].ravel(), rows_s, rows_s])
+    store_cols = np.concatenate([SINV + rows_s, SINV + prev, SHIP + rows_s, SHORT + rows_s])
+    store_vals = np.concatenate([np.ones(n), -np.ones(len(prev)), -np.ones(n), -np.ones(n)])
+    store_rhs = -D.copy()
+    store_rhs[:, 0] += opening
+
+    # 4. Warehouse balance rows (one per day):
+    #    warehouse_inv[t] - warehouse_inv[t-1] + sum_s ship[s,t] = inbound[t] (+ initial_stock at t=0)
+    days = np.arange(n_days)
+    wh_rows = n + np.concatenate([days, days[1:], np.tile(days, n_stores)])
+    wh_cols = np.concatenate([WINV + days, WINV + days[:-1], SHIP + rows_s])
+    wh_vals = np.concatenate([np.ones(n_days), -np.ones(n_days - 1), np.ones(n)])
+    wh_rhs = inbound_qty.copy()
+    wh_rhs[0] += initial_stock
+
+    A_eq = coo_matrix(
+        (np.concatenate([store_vals, wh_vals]),
+         (np.concatenate([store_rows, wh_rows]), np.concatenate([store_cols, wh_cols]))),
+        shape=(n + n_days, n_vars)
+    ).tocsr()
+    b_eq = np.concatenate([store_rhs.ravel(), wh_rhs])
+
+    # 5. Solve
+    result = instrumentation.timed_solve(
+        'highs_horizon', lambda: linprog(c, A_eq=A_eq, b_eq=b_eq, bounds=(0, None), method='highs'),
+        status_of=lambda r: r.message, variables=len(c))
+    print(f"\nHorizon Optimization Status: {result.message}")
+    if result.status != 0:
+        raise RuntimeError(f"Horizon optimization failed: {result.message}")
+
+    # 6. Extract Results
+    x = np.round(result.x).astype(np.int64)
+    ship = x[SHIP:SHIP + n].reshape(n_stores, n_days)
+    shortage = x[SHORT:SHORT + n].reshape(n_stores, n_days)
+    store_inv = x[SINV:SINV + n].reshape(n_stores, n_days)
+
+    plan = pd.DataFrame({
+        'Date': np.tile(dates.to_numpy(), n_stores),
+        'Store': np.repeat(stores, n_days),
+        'Predicted_Demand': D.ravel().astype(np.int64),
+        'Allocated_Qty': ship.ravel(),
+        'Shortage_Qty': shortage.ravel(),
+        'End_Inventory': store_inv.ravel(),
+    })
+    plan['Status'] = np.where(plan['Shortage_Qty'] == 0, 'Fulfilled', 'Stockout')
+    plan = schema.apply_schema(plan)
+
+    warehouse_plan = pd.DataFrame({
+        'Date': dates,
+        'Inbound_Qty': inbound_qty.astype(np.int64),
+        'Shipped_Qty': ship.sum(axis=0),
+        'Warehouse_Inventory': x[WINV:WINV + n_days],
+    })
+    return plan, warehouse_plan
+
+def make_network(stores, total_stock, n_warehouses=3, seed=0):
+    """
+    Synthetic multi-warehouse network for the stores: total_stock split evenly over
+    n_warehouses, and a lane cost per (warehouse, store) of the store's shipping_costs_for()
+    cost plus a seeded 0-9 THB detour. Returns (warehouse_capacity, {warehouse: {store: cost}}).
+    """
+    warehouses = [f"WH_{i + 1}" for i in range(n_warehouses)]
+    base = shipping_costs_for(stores, seed=seed)
+    rng = np.random.default_rng(seed)
+    detour = rng.integers(0, 10, size=(n_warehouses, len(base)))
+    capacity = {w: int(total_stock) // n_warehouses + (i < int(total_stock) % n_warehouses)
+                for i, w in enumerate(warehouses)}
+    costs = {w: {store: cost + int(detour[i, j]) for j, (store, cost) in enumerate(base.items())}
+             for i, w in enumerate(warehouses)}
+    return capacity, costs
+
+def _lane_matrix(values, warehouses, stores):
+    """
+    (warehouses x stores) float matrix from a DataFrame indexed by warehouse with a column per
+    store, or from a {warehouse: {store: value}} dict. Missing lanes are NaN.
+    """
+    frame = values if isinstance(values, pd.DataFrame) else pd.DataFrame.from_dict(values, orient='index')
+    frame = frame.rename(index=str, columns=str)
+    return frame.reindex(index=[str(w) for w in warehouses], columns=[str(s) for s in stores]).to_numpy(dtype=np.float64)
+
+def optimize_network(forecast_df, warehouse_capacity, shipping_costs, lane_limits=None):
+    """
+    Multi-warehouse -> store transportation model, built as sparse matrices and solved with HiGHS.
+
+    forecast_df: one row per store with 'Store' and 'Predicted_Demand'.
+    warehouse_capacity: {warehouse: available stock}.
+    shipping_costs: cost per unit as {warehouse: {store: cost}} or a DataFrame indexed by warehouse
+    with a column per store. A missing or NaN cost marks a lane that does not exist; a warehouse
+    or store without any finite cost raises ValueError.
+    lane_limits: optional maximum units per lane, in the same layout. NaN means unlimited.
+
+    Objective: Minimize shipping cost + SHORTAGE_PENALTY * unmet demand.
+    Returns (plan, shipments, stats):
+    plan has the optimize_distribution() columns per store, shipments one row per used lane,
+    and stats the solver status, objective and separate build/solve timings in seconds.
+    """
+    from scipy.optimize import linprog
+    from scipy.sparse import coo_matrix, hstack, identity
+
+    build_start = time.perf_counter()
+
+    # 1. Align inputs on (warehouses x stores)
+    stores = forecast_df['Store'].to_numpy()
+    demands = forecast_df['Predicted_Demand'].to_numpy(dtype=np.float64)
+    warehouses = list(warehouse_capacity.keys())
+    capacity = np.array([warehouse_capacity[w] for w in warehouses], dtype=np.float64)
+    costs = _lane_matrix(shipping_costs, warehouses, stores)
+    n_wh, n_stores = costs.shape
+    n_lanes = n_wh * n_stores
+
+    # A warehouse or store without any lane would silently ship nothing or stock out
+    lanes = np.isfinite(costs)
+    no_lane_wh = [w for w, has in zip(warehouses, lanes.any(axis=1)) if not has]
+    no_lane_store = [s for s, has in zip(stores, lanes.any(axis=0)) if not has]
+    if no_lane_wh or no_lane_store:
+        raise ValueError(f"No finite shipping cost for warehouses {no_lane_wh} / stores {no_lane_store}; "
+                         f"shipping_costs must be {{warehouse: {{store: cost}}}} or a warehouses x stores DataFrame")
+
+    # 2. Bounds: missing lanes are fixed at 0, lane limits cap the rest
+    upper = np.full(n_lanes, np.inf)
+    if lane_limits is not None:
+        limits = _lane_matrix(lane_limits, warehouses, stores)
+        upper = np.where(np.isnan(limits), np.inf, limits).ravel()
+    upper[~lanes.ravel()] = 0.0
+    lane_costs = np.where(lanes, costs, 0.0).ravel()
+    bounds = np.column_stack([np.zeros(n_lanes + n_stores),
+                              np.concatenate([upper, np.full(n_stores, np.inf)])])
+
+    # 3. Variables: ship[w, s] (row-major) then shortage[s]
+    c = np.concatenate([lane_costs, np.full(n_stores, SHORTAGE_PENALTY, dtype=np.float64)])
+    lane = np.arange(n_lanes)
+    wh_of_lane = lane // n_stores
+    store_of_lane = lane % n_stores
+
+    # Capacity: sum_s ship[w, s] <= capacity[w]
+    A_ub = coo_matrix((np.ones(n_lanes), (wh_of_lane, lane)), shape=(n_wh, n_lanes + n_stores)).tocsr()
+
+    # Demand balance: sum_w ship[w, s] + shortage[s] = demand[s]
+    A_eq = hstack([
+        coo_matrix((np.ones(n_lanes), (store_of_lane, lane)), shape=(n_stores, n_lanes)),
+        identity(n_stores)
+    ]).tocsr()
+
+    build_seconds = time.perf_counter() - build_start
+
+    # 4. Solve in-process
+    solve_start = time.perf_counter()
+    result = instrumentation.timed_solve(
+        'highs_network', lambda: linprog(c, A_ub=A_ub, b_ub=capacity, A_eq=A_eq, b_eq=demands, bounds=bounds, method='highs'),
+        status_of=lambda r: r.message, variables=len(c))
+    solve_seconds = time.perf_counter() - solve_start
+
+    stats = {
+        'status': result.message,
+        'objective': float(result.fun) if result.status == 0 else None,
+        'build_seconds': build_seconds,
+        'solve_seconds': solve_seconds,
+        'variables': n_lanes + n_stores,
+        'constraints': n_wh + n_stores,
+    }
+    print(f"\nNetwork Optimization Status: {result.message} "
+          f"(build {build_seconds:.3f}s, solve {solve_seconds:.3f}s)")
+    if result.status != 0:
+        raise RuntimeError(f"Network optimization failed: {result.message}")
+
+    # 5. Extract Results (transportation problems have integral optima for whole-unit data)
+    x = np.round(result.x).astype(np.int64)
+    ship = x[:n_lanes].reshape(n_wh, n_stores)
+    shortage = x[n_lanes:]
+
+    plan = pd.DataFrame({
+        'Store': stores,
+        'Predicted_Demand': forecast_df['Predicted_Demand'].to_numpy(),
+        'Allocated_Qty': ship.sum(axis=0),
+        'Shortage_Qty': shortage,
+    })
+    plan['Status'] = np.where(plan['Shortage_Qty'] == 0, 'Fulfilled', 'Stockout')
+
+    used = np.flatnonzero(ship.ravel() > 0)
+    shipments = pd.DataFrame({
+        'Warehouse': np.asarray(warehouses, dtype=object)[wh_of_lane[used]],
+        'Store': stores[store_of_lane[used]],
+        'Shipped_Qty': ship.ravel()[used],
+        'Unit_Cost': lane_costs[used],
+    })
+    return plan, shipments, stats
+
+def _newsvendor_units(scenarios, capacity, costs, holding_cost):
+    """
+    Sample-average newsvendor for one day: units per store that maximize the expected
+    saving over all scenarios, shipping at most `capacity` units in total.
+
+    The k-th unit sent to store s saves SHORTAGE_PENALTY * P(D_s >= k) and costs
+    shipping_cost[s] + holding_cost * P(D_s < k). These gains only fall with k, so
+    taking the `capacity` largest positive gains over all stores is the exact optimum.
+    scenarios: (n_scenarios x stores) whole-unit demands.
+    """
+    n_scenarios, n_stores = scenarios.shape
+    max_units = int(scenarios.max()) if scenarios.size else 0
+    if max_units <= 0 or capacity <= 0:
+        return np.zeros(n_stores, dtype=np.int64)
+
+    # P(D_s >= k) for k = 1..max_units from the scenario counts of every demand value
+    offsets = np.arange(n_stores) * (max_units + 1)
+    counts = np.bincount((scenarios.astype(np.int64) + offsets).ravel(),
+                         minlength=n_stores * (max_units + 1)).reshape(n_stores, max_units + 1)
+    at_least = counts[:, ::-1].cumsum(axis=1)[:, ::-1][:, 1:] / n_scenarios
+
+    gain = SHORTAGE_PENALTY * at_least - costs[:, None] - holding_cost * (1 - at_least)
+    rows, _ = np.nonzero(gain > 0)
+    values = gain[gain > 0]
+    if len(values) > capacity:
+        rows = rows[np.argpartition(-values, int(capacity) - 1)[:int(capacity)]]
+    return np.bincount(rows, minlength=n_stores)
+
+def optimize_newsvendor(forecast_df, warehouse_stock, shipping_costs, n_scenarios=500, samples_df=None,
+                        holding_cost=1.0, demand_cv=DEFAULT_DEMAND_CV, seed=42):
+    """
+    Scenario-based allocation: per day, ship the quantities that minimize expected
+    shipping + SHORTAGE_PENALTY * lost sales + holding_cost * unsold units over n_scenarios
+    sampled demands, within the day's warehouse stock.
+
+    Unlike optimize_distribution(), which plans against the point forecast, scarce stock goes
+    where it is most likely to sell, and uncertain stores get a buffer when stock allows.
+    Scenarios come from forecast sample paths (samples_df) or the forecast interval, see
+    demand_scenarios.sample_scenarios(). Every day is solved as one vectorized model for all stores.
+
+    forecast_df: Date / Store / Predicted_Demand (+ Predicted_Lower / Predicted_Upper).
+    warehouse_stock: stock per day (scalar, dict or Series by date).
+    Returns the optimize_distribution() columns per store-day, plus Date, Expected_Shortage
+    (mean lost sales over the scenarios) and Service_Level (share of scenarios fully served).
+    Shortage_Qty and Status are measured against the point forecast.
+    """
+    forecast_df = forecast_df.copy()
+    forecast_df['Date'] = pd.to_datetime(forecast_df['Date'])
+    days = list(forecast_df.groupby('Date', sort=True))
+    stock = _as_daily_array(warehouse_stock, pd.DatetimeIndex([date for date, _ in days]))
+
+    samples_by_date = {}
+    if samples_df is not None:
+        samples_by_date = {date: group for date, group in samples_df.groupby(pd.to_datetime(samples_df['Date']))}
+
+    frames = []
+    start = time.perf_counter()
+    for i, (date, daily) in enumerate(days):
+        daily_samples = samples_by_date.get(date)
+        scenarios = sample_scenarios(daily, n_scenarios, daily_samples, demand_cv, seed=seed + i)
+        costs = np.array([shipping_costs[s] for s in daily['Store']], dtype=np.float64)
+        allocated = _newsvendor_units(scenarios, int(stock[i]), costs, holding_cost)
+
+        demand = daily['Predicted_Demand'].to_numpy(dtype=np.int64)
+        frames.append(pd.DataFrame({
+            'Date': date,
+            'Store': daily['Store'].to_numpy(),
+            'Predicted_Demand': demand,
+            'Allocated_Qty': allocated,
+            'Shortage_Qty': np.clip(demand - allocated, 0, None),
+            'Expected_Shortage': np.clip(scenarios - allocated, 0, None).mean(axis=0),
+            'Service_Level': (scenarios <= allocated).mean(axis=0),
+        }))
+    instrumentation.record('solver', solver='newsvendor', seconds=round(time.perf_counter() - start, 6),
+                           status='Optimal', stores=int(forecast_df['Store'].nunique()), days=len(days),
+                           scenarios=n_scenarios)
+
+    plan = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+        columns=['Date', 'Store', 'Predicted_Demand', 'Allocated_Qty', 'Shortage_Qty',
+                 'Expected_Shortage', 'Service_Level'])
+    plan['Status'] = np.where(plan['Shortage_Qty'] == 0, 'Fulfilled', 'Stockout')
+    return schema.apply_schema(plan)
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Optimize stock allocation from the warehouse to stores.")
+    parser.add_argument("--horizon", action="store_true",
+                        help="Plan all forecast days in one model with inventory carry-over")
+    parser.add_argument("--inbound-pct", type=float, default=80,
+                        help="Horizon mode: daily warehouse replenishment as %% of average daily demand")
+    parser.add_argument("--newsvendor", action="store_true",
+                        help="Plan every store-day against sampled demand scenarios instead of the point forecast")
+    parser.add_argument("--scenarios", type=int, default=500, help="Newsvendor mode: demand scenarios per day")
+    parser.add_argument("--network", type=int, default=None, metavar="WAREHOUSES",
+                        help="Plan tomorrow from this many warehouses (synthetic lanes, see make_network)")
+    args = parser.parse_args()
+
     # --- Path Setup ---
     current_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(current_dir)
     data_dir = os.path.join(project_root, 'data')
     
     # Load Forecast Data (Created in Phase 2)
-    forecast_path = os.path.join(data_dir, 'forecast_results.csv')
-    
-    if not os.path.exists(forecast_path):
+    try:
+        df_forecast = local_store.read_dataset('forecast_results')
+    except FileNotFoundError:
         print("Error: Forecast data not found. Run forecast.py first.")
         exit()
+    
+    shipping_costs = shipping_costs_for(df_forecast['Store'].unique())
+    
+    if args.horizon:
+        # Scenario: opening stock covers the first day, daily inbound covers part of average demand
+        daily_totals = df_forecast.groupby('Date')['Predicted_Demand'].sum()
+        initial_stock = int(daily_totals.iloc[0])
+        inbound = int(daily_totals.mean() * args.inbound_pct / 100)
+        
+        print(f"Optimizing allocation for {len(daily_totals)} days: {daily_totals.index.min()} - {daily_totals.index.max()}")
+        print(f"   Opening Stock: {initial_stock} units, Daily Inbound: {inbound} units")
+        
+        horizon_plan, warehouse_plan = optimize_horizon(df_forecast, initial_stock, shipping_costs, inbound=inbound)
         
-    df_forecast = pd.read_csv(forecast_path)
+        print("\nWarehouse Inventory Plan:")
+        print(warehouse_plan)
+        
+        output_path = os.path.join(data_dir, 'allocation_plan_horizon.csv')
+        horizon_plan.to_csv(output_path, index=False)
+        print(f"\nPlan saved to: {output_path}")
+        exit()
+    
+    if args.newsvendor:
+        # Same scarcity scenario as below, for every forecast day: 80% of the day's demand in stock
+        daily_stock = (df_forecast.groupby('Date')['Predicted_Demand'].sum() * 0.8).astype(int)
+        try:
+            samples_df = local_store.read_dataset('forecast_samples')
+            print(f"Using forecast sample paths ({samples_df['Sample'].nunique()} per store-day)")
+        except FileNotFoundError:
+            samples_df = None
+            print("Using forecast intervals (run forecast.py --samples N for sample paths)")
+        
+        newsvendor_plan = optimize_newsvendor(df_forecast, daily_stock, shipping_costs,
+                                              n_scenarios=args.scenarios, samples_df=samples_df)
+        print(newsvendor_plan.groupby('Date')[['Allocated_Qty', 'Expected_Shortage']].sum().head())
+        
+        output_path = os.path.join(data_dir, 'allocation_plan_newsvendor.csv')
+        newsvendor_plan.to_csv(output_path, index=False)
+        print(f"\nPlan saved to: {output_path}")
+        exit()
     
     # Let's optimize for "Tomorrow" (Pick the first date in forecast)
     target_date = df_forecast['Date'].min()
     daily_demand = df_forecast[df_forecast['Date'] == target_date].copy()
     
+    if args.network:
+        # Same scarcity scenario (80% of demand), held in several warehouses
+        capacity, lane_costs = make_network(daily_demand['Store'], int(daily_demand['Predicted_Demand'].sum() * 0.8),
+                                            n_warehouses=args.network)
+        print(f"Optimizing allocation for date: {target_date} from {len(capacity)} warehouses {capacity}")
+        
+        network_plan, shipments, stats = optimize_network(daily_demand, capacity, lane_costs)
+        print(shipments.groupby('Warehouse')['Shipped_Qty'].sum())
+        print(network_plan)
+        
+        output_path = os.path.join(data_dir, 'network_shipments.csv')
+        shipments.to_csv(output_path, index=False)
+        print(f"\nShipments saved to: {output_path}")
+        exit()
+    
     print(f"Optimizing allocation for date: {target_date}")
     print(f"   Total Predicted Demand: {daily_demand['Predicted_Demand'].sum()} units")
     
@@ -99,15 +600,6 @@ if __name__ == "__main__":
     
     print(f"   Warehouse Available Stock: {warehouse_stock} units (Scarcity Scenario!)")
     
-    # Define Shipping Costs (Store A is far, Store E is close)
-    shipping_costs = {
-        'Store_A': 15, # Expensive to ship
-        'Store_B': 10,
-        'Store_C': 12,
-        'Store_D': 8,
-        'Store_E': 5   # Cheap to ship
-    }
-    
     # Run Optimization
     allocation_plan = optimize_distribution(daily_demand, warehouse_stock, shipping_costs)
     
@@ -0,0 +1,355 @@
+import pandas as pd
+import numpy as np
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import engines
+import instrumentation
+import local_store
+import schema
+
+# Single-process pipeline runner: generate -> forecast -> optimize -> publish.
+# Stages hand DataFrames to each other in memory, so imports and parsing are paid once per run.
+# Every stage output is fingerprinted by content; a stage is skipped when its code, parameters
+# and input fingerprints match the last successful run recorded in data/pipeline_manifest.json
+# (and its stored outputs are untouched). Any stage can be re-run on its own from the CLI,
+# in which case its inputs are loaded from the outputs stored by earlier runs.
+
+MANIFEST_PATH = os.path.join(local_store.DATA_DIR, 'pipeline_manifest.json')
+
+STAGES = ['generate', 'forecast', 'optimize', 'publish']
+
+# Upstream outputs each stage reads
+INPUTS = {
+    'generate': [],
+    'forecast': ['sales_history'],
+    'optimize': ['forecast_results'],
+    'publish': ['sales_history', 'forecast_results', 'scenario_results'],
+}
+
+# Outputs each stage produces
+OUTPUTS = {
+    'generate': ['sales_history'],
+    'forecast': ['forecast_results'],
+    'optimize': ['allocation_plan', 'newsvendor_plan', 'scenario_results'],
+    'publish': [],
+}
+
+# Stored outputs a stage extends instead of replacing: the stored version (if any) is passed to
+# the stage as an input, and the stage returns (full frame, new rows) so only new rows are appended
+EXTENDS = {
+    'generate': ['sales_history'],
+    'forecast': [],
+    'optimize': [],
+    'publish': [],
+}
+
+# Source files whose changes invalidate a stage
+SOURCES = {
+    'generate': ['data_gen.py'],
+    'forecast': ['forecast.py', 'fast_forecast.py', 'calendar_events.py', 'model_store.py', 'engines.py'],
+    'optimize': ['optimize.py', 'scenarios.py', 'demand_scenarios.py'],
+    'publish': ['migrate_db.py', 'data_access.py'],
+}
+
+DEFAULT_PARAMS = {
+    'generate': {'mode': 'incremental', 'days': 730, 'stores': None, 'seed': 42},
+    'forecast': {'engine': 'prophet', 'workers': 1, 'days_ahead': 30},
+    'optimize': {'stock_pct': 80, 'workers': 1, 'scenarios': 500},
+    'publish': {'mode': 'incremental', 'lookback_days': 0},
+}
+
+# --- Fingerprints ---
+
+def fingerprint_frame(df):
+    """
+    Content hash of a DataFrame, independent of row order and of storage dtypes
+    (e.g. int32 on disk vs int64 in memory).
+    """
+    keys = [c for c in ['Store', 'Date'] if c in df.columns]
+    if keys:
+        # Categorical stores sort by code; sort by name so the hash does not depend on the codes
+        df = df.sort_values(keys, kind='stable',
+                            key=lambda col: col.astype(str) if isinstance(col.dtype, pd.CategoricalDtype) else col)
+    h = hashlib.sha256()
+    for col in sorted(df.columns):
+        values = df[col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.astype('datetime64[ns]').astype(np.int64)
+        elif pd.api.types.is_numeric_dtype(values):
+            values = values.astype(np.float64)
+        else:
+            values = values.astype(str)
+        h.update(col.encode('utf-8'))
+        h.update(pd.util.hash_pandas_object(values.reset_index(drop=True), index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def _hash_json(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def _code_hash(stage):
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    h = hashlib.sha256()
+    for name in SOURCES[stage] + ['pipeline.py']:
+        with open(os.path.join(src_dir, name), 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+# --- Stored outputs ---
+
+def _output_path(name, data_dir):
+    if name in local_store.DATASETS:
+        return local_store.dataset_path(name, data_dir)
+    return os.path.join(data_dir, f'{name}.csv')
+
+def _storage_stamp(name, data_dir):
+    """
+    Cheap signature (file names, sizes, mtimes) of a stored output, or None if it is missing.
+    Detects outputs overwritten outside the pipeline (e.g. by running data_gen.py directly).
+    """
+    path = _output_path(name, data_dir)
+    if os.path.isdir(path):
+        files = sorted(os.path.join(root, f) for root, _, names in os.walk(path) for f in names)
+    elif os.path.exists(path):
+        files = [path]
+    else:
+        return None
+    return _hash_json([(os.path.relpath(f, data_dir), os.path.getsize(f), os.path.getmtime(f)) for f in files])
+
+def save_output(name, df, data_dir):
+    if name in local_store.DATASETS:
+        local_store.write_dataset(df, name, data_dir=data_dir)
+    else:
+        df.to_csv(_output_path(name, data_dir), index=False)
+
+def load_output(name, data_dir):
+    if name in local_store.DATASETS:
+        return local_store.read_dataset(name, data_dir=data_dir)
+    return schema.apply_schema(pd.read_csv(_output_path(name, data_dir), parse_dates=['Date']))
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {'stages': {}, 'outputs': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+# --- Stages ---
+
+def run_generate(inputs, params):
+    from data_gen import generate_sales_data, generate_missing_days
+
+    stored = inputs.get('sales_history')
+    if params['mode'] == 'incremental' and stored is not None and not stored.empty:
+        # Append-only: days after each store's latest date, keyed by (store, date)
+        new_rows = generate_missing_days(stored.groupby('Store', observed=True)['Date'].max(), seed=params['seed'])
+        print(f"   - {len(new_rows)} new rows")
+        history = pd.concat([stored, new_rows], ignore_index=True) if len(new_rows) else stored
+        schema.save_store_codes()
+        return {'sales_history': (schema.apply_schema(history), new_rows)}
+
+    # 'window' (or nothing stored yet): regenerate the full window ending yesterday
+    history = generate_sales_data(days=params['days'], n_stores=params['stores'], seed=params['seed'])
+    schema.save_store_codes()
+    return {'sales_history': history}
+
+def run_forecast(inputs, params):
+    import engines
+    import model_store
+    from forecast import get_model_events, round_forecast
+
+    df = inputs['sales_history']
+    events = get_model_events(df['Date'].min(), df['Date'].max())
+    engine = engines.get_forecast_engine(params['engine'])
+    if params['engine'] == 'prophet':
+        errors = {}
+        result = engine(df, days_ahead=params['days_ahead'], events=events, workers=params['workers'],
+                        model_dir=model_store.DEFAULT_MODEL_DIR, errors=errors)
+        for store, err in errors.items():
+            print(f"   - {store}: forecast failed ({err})")
+    else:
+        result = engine(df, days_ahead=params['days_ahead'], events=events)
+    # Whole, non-negative units, as forecast.py writes them
+    result = round_forecast(result)
+    return {'forecast_results': result}
+
+def run_optimize(inputs, params):
+    from optimize import optimize_distribution, optimize_newsvendor, shipping_costs_for
+    from scenarios import run_scenario_sweep
+
+    df_forecast = inputs['forecast_results']
+    # The five named stores keep their default costs; generated stores get seeded ones
+    shipping_costs = shipping_costs_for(df_forecast['Store'].unique())
+    # Tomorrow's plan under the default scarcity scenario, as optimize.py computes it
+    daily_demand = df_forecast[df_forecast['Date'] == df_forecast['Date'].min()]
+    warehouse_stock = int(daily_demand['Predicted_Demand'].sum() * params['stock_pct'] / 100)
+    plan = optimize_distribution(daily_demand, warehouse_stock, shipping_costs)
+    plan.insert(0, 'Date', daily_demand['Date'].iloc[0])
+
+    # Every store-day against sampled demand (forecast intervals), same stock rule per day
+    daily_stock = (df_forecast.groupby('Date')['Predicted_Demand'].sum() * params['stock_pct'] / 100).astype(int)
+    newsvendor_plan = optimize_newsvendor(df_forecast, daily_stock, shipping_costs,
+                                          n_scenarios=params['scenarios'])
+
+    scenarios = run_scenario_sweep(df_forecast, shipping_costs, workers=params['workers'])
+    return {'allocation_plan': plan, 'newsvendor_plan': newsvendor_plan, 'scenario_results': scenarios}
+
+def run_publish(inputs, params):
+    import migrate_db
+
+    engine = migrate_db.get_engine()
+    if params['mode'] == 'incremental':
+        migrate_db.sync_incremental(engine, inputs['sales_history'], inputs['forecast_results'],
+                                    lookback_days=params['lookback_days'])
+    else:
+        migrate_db.sync_full(engine, inputs['sales_history'], inputs['forecast_results'])
+    migrate_db.upload_scenarios(engine, inputs['scenario_results'])
+    return {}
+
+STAGE_FUNCTIONS = {
+    'generate': run_generate,
+    'forecast': run_forecast,
+    'optimize': run_optimize,
+    'publish': run_publish,
+}
+
+# --- Runner ---
+
+def stage_key(stage, params, input_fingerprints):
+    """
+    Fingerprint of everything a stage's result depends on.
+    Generation also depends on the calendar day, since its history ends yesterday.
+    """
+    payload = {'stage': stage, 'code': _code_hash(stage), 'params': params,
+               'inputs': {name: input_fingerprints[name] for name in INPUTS[stage]}}
+    if stage == 'generate':
+        payload['today'] = pd.Timestamp.now().normalize().isoformat()
+    return _hash_json(payload)
+
+def run_pipeline(stages=None, params=None, force=False, data_dir=local_store.DATA_DIR, manifest_path=None):
+    """
+    Run the given stages (default: all) in DAG order in this process.
+    Returns {stage: 'ran' | 'skipped'}. Stages not listed are never run; their stored
+    outputs are used as inputs instead.
+    """
+    stages = [s for s in STAGES if s in (stages or STAGES)]
+    params = {stage: {**DEFAULT_PARAMS[stage], **(params or {}).get(stage, {})} for stage in STAGES}
+    manifest_path = manifest_path or os.path.join(data_dir, os.path.basename(MANIFEST_PATH))
+    manifest = load_manifest(manifest_path)
+    os.makedirs(data_dir, exist_ok=True)
+    schema.use_data_dir(data_dir)  # Generated stores are registered in this directory's dictionary
+
+    frames = {}  # Outputs produced or loaded in this run
+
+    def get_frame(name):
+        if name not in frames:
+            if _storage_stamp(name, data_dir) is None:
+                raise FileNotFoundError(f"No stored '{name}' output; run the stage that produces it first")
+            frames[name] = load_output(name, data_dir)
+        return frames[name]
+
+    def get_fingerprint(name):
+        # Trust the manifest while the stored files are the ones it recorded
+        entry = manifest['outputs'].get(name)
+        if name not in frames and entry and entry['stamp'] == _storage_stamp(name, data_dir):
+            return entry['fingerprint']
+        return fingerprint_frame(get_frame(name))
+
+    statuses = {}
+    for stage in stages:
+        input_fps = {name: get_fingerprint(name) for name in INPUTS[stage]}
+        key = stage_key(stage, params[stage], input_fps)
+
+        previous = manifest['stages'].get(stage, {})
+        outputs_intact = all(
+            name in manifest['outputs'] and manifest['outputs'][name]['stamp'] == _storage_stamp(name, data_dir)
+            for name in OUTPUTS[stage]
+        )
+        if not force and previous.get('key') == key and outputs_intact:
+            print(f"[{stage}] unchanged, skipped")
+            statuses[stage] = 'skipped'
+            continue
+
+        print(f"[{stage}] running...")
+        start = time.perf_counter()
+        with instrumentation.span(stage):
+            stage_inputs = {name: get_frame(name) for name in INPUTS[stage]}
+            stage_inputs.update({name: get_frame(name) for name in EXTENDS[stage]
+                                 if _storage_stamp(name, data_dir) is not None})
+            results = STAGE_FUNCTIONS[stage](stage_inputs, params[stage])
+            for name, df in results.items():
+                if isinstance(df, tuple):
+                    # (full frame, new rows): append the new rows to the stored dataset
+                    df, new_rows = df
+                    if len(new_rows):
+                        local_store.write_dataset(new_rows, name, data_dir=data_dir, append=True)
+                else:
+                    save_output(name, df, data_dir)
+                frames[name] = df
+                manifest['outputs'][name] = {'fingerprint': fingerprint_frame(df),
+                                             'stamp': _storage_stamp(name, data_dir), 'rows': len(df)}
+
+        manifest['stages'][stage] = {'key': key, 'params': params[stage],
+                                     'finished_at': pd.Timestamp.now().isoformat(timespec='seconds'),
+                                     'seconds': round(time.perf_counter() - start, 3)}
+        # Saved after every stage, so a failure later on does not lose finished work
+        save_manifest(manifest, manifest_path)
+        print(f"[{stage}] done in {manifest['stages'][stage]['seconds']:.2f}s")
+        statuses[stage] = 'ran'
+    return statuses
+
+def expand_stages(stages=None, from_stage=None):
+    """
+    Stages to run from CLI options: an explicit list, or from_stage and everything downstream.
+    """
+    if from_stage:
+        return STAGES[STAGES.index(from_stage):]
+    return stages or STAGES
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run generate -> forecast -> optimize -> publish in one process.")
+    parser.add_argument("stages", nargs='*', default=None, metavar='stage',
+                        help="Stages to run (default: all). Other stages' stored outputs are used as inputs")
+    parser.add_argument("--from", dest="from_stage", choices=STAGES, default=None,
+                        help="Run this stage and every stage after it")
+    parser.add_argument("--force", action="store_true", help="Re-run stages even if their inputs are unchanged")
+    parser.add_argument("--generate-mode", choices=['incremental', 'window'], default='incremental',
+                        help="generate: append only the missing days to the stored history (incremental) "
+                             "or regenerate the full window ending yesterday")
+    parser.add_argument("--days", type=int, default=730, help="generate: days of history (window mode, first run)")
+    parser.add_argument("--stores", type=int, default=None, help="generate: number of stores")
+    parser.add_argument("--seed", type=int, default=42, help="generate: random seed")
+    parser.add_argument("--engine", choices=list(engines.FORECAST_ENGINES), default='prophet', help="forecast: engine")
+    parser.add_argument("--days-ahead", type=int, default=30, help="forecast: horizon in days")
+    parser.add_argument("--workers", type=int, default=1, help="forecast/optimize: worker processes")
+    parser.add_argument("--stock-pct", type=float, default=80, help="optimize: warehouse stock as %% of demand")
+    parser.add_argument("--scenarios", type=int, default=500, help="optimize: demand scenarios per day for the newsvendor plan")
+    parser.add_argument("--publish-mode", choices=['full', 'incremental'], default='incremental',
+                        help="publish: database sync mode")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    unknown = set(args.stages or []) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))} (choose from {', '.join(STAGES)})")
+    instrumentation.configure_from_args(args)
+
+    stage_params = {
+        'generate': {'mode': args.generate_mode, 'days': args.days, 'stores': args.stores, 'seed': args.seed},
+        'forecast': {'engine': args.engine, 'workers': args.workers, 'days_ahead': args.days_ahead},
+        'optimize': {'stock_pct': args.stock_pct, 'workers': args.workers, 'scenarios': args.scenarios},
+        'publish': {'mode': args.publish_mode},
+    }
+    try:
+        statuses = run_pipeline(expand_stages(args.stages, args.from_stage), stage_params, force=args.force)
+        print("Pipeline completed: " + ", ".join(f"{stage} {status}" for stage, status in statuses.items()))
+    finally:
+        if args.metrics:
+            print(f"Metrics written to: {instrumentation.write_metrics(args.metrics, script='pipeline')}")
@@ -0,0 +1,96 @@
+import threading
+from collections import OrderedDict
+
+# Bounded, thread-safe LRU cache for expensive results (e.g. optimization plans).
+# One instance can be shared by every dashboard session (st.cache_resource):
+# Streamlit serves sessions from threads of the same process, so concurrent requests
+# for the same key wait for the first computation instead of each running the solver.
+
+class LRUCache:
+    """
+    Least-recently-used cache holding at most `maxsize` results, with hit/miss counters.
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> Event set when the computing thread finishes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached result for key, or call compute() once and cache it.
+        Returns (value, hit). Concurrent callers with the same key share one computation.
+        """
+        while True:
+            with self._lock:
+                if key in self._data:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return self._data[key], True
+                event = self._inflight.get(key)
+                if event is None:
+                    # This thread computes; others wait on the event
+                    event = self._inflight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            event.wait()
+            # Loop: either the result is cached now, or the computation failed and we retry
+
+        try:
+            value = compute()
+            with self._lock:
+                self._store(key, value)
+            return value, False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """
+        Counters for display: size, maxsize, hits, misses, evictions and hit rate.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
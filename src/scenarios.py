@@ -0,0 +1,151 @@
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+from fractions import Fraction
+
+import local_store
+from optimize import optimize_distribution, shipping_costs_for, SHORTAGE_PENALTY
+
+# Scenario sweep: evaluate the allocation over a grid of
+# stock levels x shipping-cost multipliers x dates, in parallel across dates.
+# The result is one compact long table (one row per scenario and store), from which
+# what-if curves such as fulfillment rate vs. stock level are simple group-bys.
+
+# % of total demand over the dashboard slider's 50-150 range; the dashboard's live
+# what-if curves use this grid too, so stored and live curves have the same points
+DEFAULT_STOCK_LEVELS = list(range(50, 151, 5))
+DEFAULT_COST_MULTIPLIERS = [0.8, 1.0, 1.2]
+
+def cost_pct(multiplier):
+    """
+    Exact scenario key of a shipping-cost multiplier: the multiplier in whole percent.
+    """
+    return int(round(multiplier * 100))
+
+def cost_pct_for(shipping_costs, base_costs=None):
+    """
+    Cost_Pct whose scaled base costs (default: shipping_costs_for) equal shipping_costs
+    exactly, or None if the costs are not a whole-percent multiple of the base costs.
+    """
+    base_costs = shipping_costs_for(shipping_costs) if base_costs is None else base_costs
+    ratios = {Fraction(cost) * 100 / Fraction(base_costs[store]) for store, cost in shipping_costs.items()}
+    if len(ratios) != 1:
+        return None
+    pct = ratios.pop()
+    return int(pct) if pct.denominator == 1 else None
+
+def _sweep_dates(demand_by_date, shipping_costs, stock_levels, cost_multipliers):
+    """
+    Worker: evaluate every (stock level, cost multiplier) for the given dates.
+    demand_by_date is a list of (date, daily forecast slice).
+    """
+    frames = []
+    for date, daily_demand in demand_by_date:
+        total_demand = daily_demand['Predicted_Demand'].sum()
+        for multiplier in cost_multipliers:
+            pct = cost_pct(multiplier)
+            costs = {store: cost * pct / 100 for store, cost in shipping_costs.items()}
+            for stock_pct in stock_levels:
+                # Same stock rule as the dashboard slider
+                warehouse_stock = int(total_demand * (stock_pct / 100))
+                plan = optimize_distribution(daily_demand, warehouse_stock, costs)
+
+                unit_cost = plan['Store'].map(costs).to_numpy(dtype=np.float64)
+                frames.append(pd.DataFrame({
+                    'Date': date,
+                    'Stock_Level_Pct': stock_pct,
+                    'Cost_Multiplier': pct / 100,
+                    'Cost_Pct': pct,
+                    'Store': plan['Store'],
+                    'Predicted_Demand': plan['Predicted_Demand'],
+                    'Allocated_Qty': plan['Allocated_Qty'],
+                    'Shortage_Qty': plan['Shortage_Qty'],
+                    'Total_Cost': unit_cost * plan['Allocated_Qty'] + SHORTAGE_PENALTY * plan['Shortage_Qty'],
+                }))
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+def run_scenario_sweep(forecast_df, shipping_costs=None, stock_levels=None, cost_multipliers=None,
+                       dates=None, workers=1):
+    """
+    Evaluate the allocation for every combination of stock level (% of demand),
+    shipping-cost multiplier and date. Dates are split across a process pool.
+    Returns a compact long table, ordered by Date, Cost_Multiplier, Stock_Level_Pct, Store;
+    Cost_Pct (the multiplier in whole percent) is the exact key of the cost scenario.
+    """
+    stock_levels = DEFAULT_STOCK_LEVELS if stock_levels is None else list(stock_levels)
+    cost_multipliers = DEFAULT_COST_MULTIPLIERS if cost_multipliers is None else list(cost_multipliers)
+
+    forecast_df = forecast_df.copy()
+    if shipping_costs is None:
+        shipping_costs = shipping_costs_for(forecast_df['Store'].unique())
+    forecast_df['Date'] = pd.to_datetime(forecast_df['Date'])
+    if dates is not None:
+        forecast_df = forecast_df[forecast_df['Date'].isin(pd.to_datetime(list(dates)))]
+
+    demand_by_date = [(date, daily) for date, daily in forecast_df.groupby('Date')]
+    if not demand_by_date:
+        return pd.DataFrame(columns=['Date', 'Stock_Level_Pct', 'Cost_Multiplier', 'Cost_Pct', 'Store',
+                                     'Predicted_Demand', 'Allocated_Qty', 'Shortage_Qty', 'Total_Cost'])
+
+    if workers <= 1 or len(demand_by_date) == 1:
+        results = [_sweep_dates(demand_by_date, shipping_costs, stock_levels, cost_multipliers)]
+    else:
+        # A few batches per worker keeps the pool busy without shipping one task per date
+        batches = [b for b in np.array_split(np.arange(len(demand_by_date)), workers * 4) if len(b)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_sweep_dates, [demand_by_date[i] for i in batch],
+                                   shipping_costs, stock_levels, cost_multipliers) for batch in batches]
+            results = [future.result() for future in futures]
+
+    table = pd.concat([r for r in results if r is not None], ignore_index=True)
+
+    # Compact dtypes: the grid repeats the same few values many times
+    table['Store'] = table['Store'].astype('category')
+    table['Stock_Level_Pct'] = table['Stock_Level_Pct'].astype(np.int16)
+    table['Cost_Multiplier'] = table['Cost_Multiplier'].astype(np.float32)
+    table['Cost_Pct'] = table['Cost_Pct'].astype(np.int16)
+    for col in ['Predicted_Demand', 'Allocated_Qty', 'Shortage_Qty']:
+        table[col] = table[col].astype(np.int32)
+    table['Total_Cost'] = table['Total_Cost'].astype(np.float32)
+    return table
+
+def summarize_scenarios(table):
+    """
+    What-if curves: totals and fulfillment rate per (Date, Cost_Multiplier, Stock_Level_Pct).
+    """
+    summary = table.groupby(['Date', 'Cost_Multiplier', 'Stock_Level_Pct'], observed=True).agg(
+        Total_Demand=('Predicted_Demand', 'sum'),
+        Allocated_Qty=('Allocated_Qty', 'sum'),
+        Shortage_Qty=('Shortage_Qty', 'sum'),
+        Total_Cost=('Total_Cost', 'sum'),
+    ).reset_index()
+    summary['Fulfillment_Rate'] = 100 * summary['Allocated_Qty'] / summary['Total_Demand'].where(summary['Total_Demand'] > 0)
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-compute allocation what-if scenarios.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--stock-levels", type=int, nargs='+', default=DEFAULT_STOCK_LEVELS,
+                        help="Warehouse stock levels as %% of demand")
+    parser.add_argument("--cost-multipliers", type=float, nargs='+', default=DEFAULT_COST_MULTIPLIERS,
+                        help="Multipliers applied to all shipping costs")
+    args = parser.parse_args()
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(current_dir)
+    data_dir = os.path.join(project_root, 'data')
+
+    try:
+        df_forecast = local_store.read_dataset('forecast_results')
+    except FileNotFoundError:
+        print("Error: Forecast data not found. Run forecast.py first.")
+        exit()
+    table = run_scenario_sweep(df_forecast, stock_levels=args.stock_levels,
+                               cost_multipliers=args.cost_multipliers, workers=args.workers)
+
+    output_path = os.path.join(data_dir, 'scenario_results.csv')
+    table.to_csv(output_path, index=False)
+    print(f"Scenario sweep completed: {len(table)} rows saved to {output_path}")
+    print(summarize_scenarios(table).head())
@@ -0,0 +1,147 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+
+# Shared in-memory schema for the sales, forecast and plan frames.
+# - Date: datetime64[ns], parsed once where a frame is produced or loaded.
+# - Store: categorical over one store-code dictionary (1-2 bytes per row instead of a
+#   Python string). Codes are append-only: a new store gets the next code, existing codes
+#   never change. Each frame keeps only the stores it contains, in dictionary order, so
+#   frames over the same stores share a dtype and joins/concats stay categorical.
+#   The dictionary belongs to a data directory (<data_dir>/store_codes.json) and is loaded
+#   on first use; use_data_dir() switches to another directory's dictionary.
+# - Measures: whole units as int32, fractional values as float32.
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+STORE_CODES_FILE = 'store_codes.json'
+STORE_CODES_PATH = os.path.join(project_root, 'data', STORE_CODES_FILE)
+
+INT_COLUMNS = ['Sales', 'Predicted_Demand', 'Predicted_Lower', 'Predicted_Upper', 'Sample',
+               'Allocated_Qty', 'Shortage_Qty', 'End_Inventory']
+FLOAT_COLUMNS = ['Expected_Shortage', 'Service_Level']
+
+_codes = {}        # {store: code}
+_state = {'loaded': False, 'dtype': None, 'path': STORE_CODES_PATH}
+
+def use_data_dir(data_dir):
+    """
+    Use the dictionary of data_dir from now on. When the directory changes, the codes of
+    the previous one are dropped and the new file is loaded on first use (frames encoded
+    earlier keep their dtype; apply_schema re-encodes them). Returns the dictionary path.
+    """
+    path = os.path.join(os.fspath(data_dir), STORE_CODES_FILE)
+    if os.path.abspath(path) != os.path.abspath(_state['path']):
+        _codes.clear()
+        _state.update(loaded=False, dtype=None, path=path)
+    return path
+
+def load_store_codes(path=None):
+    """
+    Load the stored dictionary (default: the current data directory's). Stored codes win;
+    stores only known to this process are numbered after them.
+    """
+    path = path or _state['path']
+    _state['loaded'] = True
+    if not os.path.exists(path):
+        return dict(_codes)
+    with open(path, 'r', encoding='utf-8') as f:
+        stored = json.load(f)
+    pending = [s for s in sorted(_codes, key=_codes.get) if s not in stored]
+    _codes.clear()
+    _codes.update(stored)
+    for store in pending:
+        _codes[store] = len(_codes)
+    _state['dtype'] = None
+    return dict(_codes)
+
+def save_store_codes(path=None):
+    path = path or _state['path']
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(store_codes(), f, indent=0)
+    os.replace(tmp_path, path)
+    return path
+
+def store_codes():
+    if not _state['loaded']:
+        load_store_codes()
+    return dict(_codes)
+
+def register_stores(stores):
+    """
+    Give every unseen store the next code (new stores in sorted order). Returns the store dtype.
+    """
+    if not _state['loaded']:
+        load_store_codes()
+    new = sorted({str(s) for s in stores} - _codes.keys())
+    for store in new:
+        _codes[store] = len(_codes)
+    if new:
+        _state['dtype'] = None
+    return store_dtype()
+
+def store_dtype():
+    """
+    Categorical dtype over every registered store, in code order.
+    """
+    if not _state['loaded']:
+        load_store_codes()
+    if _state['dtype'] is None:
+        _state['dtype'] = pd.CategoricalDtype(sorted(_codes, key=_codes.get))
+    return _state['dtype']
+
+def encode_stores(values):
+    """
+    Store names (or an existing categorical) as a Categorical over the shared dictionary.
+    """
+    if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+        dtype = register_stores(values.dtype.categories)
+        codes = [_codes[str(s)] for s in values.dtype.categories]
+        if values.dtype == dtype or all(a < b for a, b in zip(codes, codes[1:])):
+            return values  # Already the dictionary (or a subset of it) in code order
+        return values.astype(dtype)
+    values = np.asarray(values, dtype=object)
+    return pd.Categorical(values, dtype=register_stores(pd.unique(values)))
+
+def compact_stores(df):
+    """
+    Drop the categories of stores that have no rows in df (codes keep dictionary order).
+    """
+    if 'Store' in df and isinstance(df['Store'].dtype, pd.CategoricalDtype):
+        df['Store'] = df['Store'].cat.remove_unused_categories()
+    return df
+
+def apply_schema(df):
+    """
+    Return df with the shared dtypes: parsed Date, categorical Store (only the stores
+    present), int32 / float32 measures. Columns that already have the right dtype are left
+    as they are (no re-parsing).
+    """
+    df = df.copy()
+    if 'Date' in df and not pd.api.types.is_datetime64_ns_dtype(df['Date']):
+        df['Date'] = pd.to_datetime(df['Date']).astype('datetime64[ns]')
+    if 'Store' in df:
+        df['Store'] = encode_stores(df['Store'])
+        compact_stores(df)
+    for col in INT_COLUMNS:
+        if col in df and df[col].dtype != np.int32:
+            values = df[col]
+            if pd.api.types.is_float_dtype(values):
+                values = values.round()
+            df[col] = values.astype(np.int32)
+    for col in FLOAT_COLUMNS:
+        if col in df and df[col].dtype != np.float32:
+            df[col] = df[col].astype(np.float32)
+    return df
+
+def memory_bytes(df):
+    """
+    Deep in-memory size of a frame (strings included).
+    """
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+def bytes_per_row(df):
+    return memory_bytes(df) / max(len(df), 1)
@@ -0,0 +1,186 @@
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+
+import local_store
+from demand_scenarios import DEFAULT_DEMAND_CV, INTERVAL_COLUMNS, demand_std, has_intervals, sample_gamma
+
+# Monte Carlo inventory simulation: how does an allocation plan play out when demand
+# and delivery times are uncertain?
+# A plan from optimize_distribution (one day) or optimize_horizon (one row per store-day)
+# is replayed over thousands of replications. Every replication draws daily demand around
+# the forecast and a lead time for every shipment; stores sell what they have on hand,
+# lose the rest, and carry leftover stock to the next day.
+# All replications of a chunk are simulated at once as (replications x stores) arrays,
+# and chunks are split across processes.
+
+# Probability that a shipment arrives 0, 1, 2 ... days after it is sent
+DEFAULT_LEAD_TIME_PROBS = [0.8, 0.15, 0.05]
+
+def _plan_arrays(plan, forecast_df=None, demand_cv=DEFAULT_DEMAND_CV):
+    """
+    (stores, dates, shipments, demand mean, demand std) as (stores x days) arrays.
+    The demand spread comes from the forecast interval (Predicted_Lower / Predicted_Upper,
+    taken from the plan or from forecast_df) when available, else from demand_cv.
+    """
+    plan = plan.copy()
+    if 'Date' not in plan.columns:
+        plan['Date'] = pd.Timestamp(0) if forecast_df is None else pd.to_datetime(forecast_df['Date']).min()
+    plan['Date'] = pd.to_datetime(plan['Date'])
+
+    if forecast_df is not None and not has_intervals(plan) and has_intervals(forecast_df):
+        bounds = forecast_df[['Date', 'Store'] + INTERVAL_COLUMNS].copy()
+        bounds['Date'] = pd.to_datetime(bounds['Date'])
+        plan = plan.merge(bounds, on=['Date', 'Store'], how='left')
+
+    plan = plan.assign(_mean=plan['Predicted_Demand'].astype(np.float64), _std=demand_std(plan, demand_cv))
+
+    wide = plan.pivot_table(index='Store', columns='Date', values=['Allocated_Qty', '_mean', '_std'],
+                            aggfunc='sum', fill_value=0, sort=False, observed=True)
+    stores = wide.index.to_numpy()
+    dates = wide['Allocated_Qty'].columns
+    return (stores, dates, wide['Allocated_Qty'].to_numpy(dtype=np.float64),
+            wide['_mean'].to_numpy(dtype=np.float64), wide['_std'].to_numpy(dtype=np.float64))
+
+def _simulate_chunk(seed, n_reps, shipments, mean, std, lead_time_probs, opening):
+    """
+    Worker: simulate n_reps replications. Returns per (replication, store) totals:
+    demand, sold, lost sales and the number of days with a stockout.
+    """
+    rng = np.random.default_rng(seed)
+    n_stores, n_days = shipments.shape
+    max_lead = len(lead_time_probs) - 1
+
+    # Arrivals: each day's shipment lands after its own random lead time
+    # (one shifted add per lead value; lead fits in int8)
+    lead = rng.choice(max_lead + 1, size=(n_reps, n_stores, n_days), p=lead_time_probs).astype(np.int8)
+    arrivals = np.zeros((n_reps, n_stores, n_days + max_lead))
+    for k in range(max_lead + 1):
+        arrivals[:, :, k:k + n_days] += np.where(lead == k, shipments, 0.0)
+    del lead
+
+    on_hand = np.broadcast_to(opening, (n_reps, n_stores)).astype(np.float64)
+    demand_total = np.zeros((n_reps, n_stores))
+    sold_total = np.zeros((n_reps, n_stores))
+    stockout_days = np.zeros((n_reps, n_stores), dtype=np.int32)
+    for t in range(n_days):
+        on_hand = on_hand + arrivals[:, :, t]
+        demand = sample_gamma(rng, mean[:, t], std[:, t], n_reps)
+        sold = np.minimum(on_hand, demand)
+        on_hand = on_hand - sold
+        demand_total += demand
+        sold_total += sold
+        stockout_days += demand > sold
+    return demand_total, sold_total, demand_total - sold_total, stockout_days
+
+def simulate_plan(plan, forecast_df=None, n_reps=2000, demand_cv=DEFAULT_DEMAND_CV,
+                  lead_time_probs=None, store_inventory=None, seed=42, workers=1, keep_replications=True):
+    """
+    Replay an allocation plan under demand and lead-time uncertainty.
+
+    plan: optimize_distribution() output (one day) or optimize_horizon() output (with Date).
+    forecast_df: optional forecast with Predicted_Lower / Predicted_Upper intervals.
+    lead_time_probs: probability of arriving 0, 1, 2 ... days after shipping.
+    store_inventory: opening stock per store (dict), default 0.
+    Replications are simulated in fixed chunks with independent random streams, spread over
+    `workers` processes, so results for a given seed do not depend on the number of workers.
+
+    Returns (summary, replications):
+    - summary: per store, mean/p5/p50/p95 fill rate (share of demand served), mean and p95
+      lost sales, and the probability of at least one stockout day.
+    - replications: per replication and store, Demand / Sold / Lost_Sales / Stockout_Days
+      (None if keep_replications is False).
+    """
+    lead_time_probs = np.asarray(DEFAULT_LEAD_TIME_PROBS if lead_time_probs is None else lead_time_probs, dtype=float)
+    lead_time_probs = lead_time_probs / lead_time_probs.sum()
+    stores, dates, shipments, mean, std = _plan_arrays(plan, forecast_df, demand_cv)
+    opening = np.array([(store_inventory or {}).get(s, 0) for s in stores], dtype=np.float64)
+
+    # Fixed chunking (independent of workers) keeps results reproducible
+    n_chunks = max(1, min(n_reps, 16))
+    sizes = np.full(n_chunks, n_reps // n_chunks)
+    sizes[:n_reps % n_chunks] += 1
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    args = [(seeds[i], int(sizes[i]), shipments, mean, std, lead_time_probs, opening) for i in range(n_chunks)]
+
+    if workers <= 1:
+        chunks = [_simulate_chunk(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(_simulate_chunk, *zip(*args)))
+    demand, sold, lost, stockout_days = (np.concatenate(part) for part in zip(*chunks))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fill_rate = np.where(demand > 0, sold / demand, 1.0)
+    summary = pd.DataFrame({
+        'Store': stores,
+        'Planned_Qty': shipments.sum(axis=1).astype(np.int64),
+        'Mean_Demand': demand.mean(axis=0),
+        'Fill_Rate_Mean': fill_rate.mean(axis=0),
+        'Fill_Rate_P5': np.percentile(fill_rate, 5, axis=0),
+        'Fill_Rate_P50': np.percentile(fill_rate, 50, axis=0),
+        'Fill_Rate_P95': np.percentile(fill_rate, 95, axis=0),
+        'Lost_Sales_Mean': lost.mean(axis=0),
+        'Lost_Sales_P95': np.percentile(lost, 95, axis=0),
+        'Stockout_Prob': (stockout_days > 0).mean(axis=0),
+    })
+
+    replications = None
+    if keep_replications:
+        n_stores = len(stores)
+        replications = pd.DataFrame({
+            'Replication': np.repeat(np.arange(n_reps), n_stores),
+            'Store': np.tile(stores, n_reps),
+            'Demand': demand.ravel().astype(np.int64),
+            'Sold': sold.ravel().astype(np.int64),
+            'Lost_Sales': lost.ravel().astype(np.int64),
+            'Stockout_Days': stockout_days.ravel(),
+        })
+    return summary, replications
+
+def network_service_levels(replications):
+    """
+    Network-wide totals per replication: Demand, Sold, Lost_Sales and Fill_Rate.
+    """
+    totals = replications.groupby('Replication')[['Demand', 'Sold', 'Lost_Sales']].sum()
+    totals['Fill_Rate'] = totals['Sold'] / totals['Demand'].where(totals['Demand'] > 0)
+    return totals.reset_index()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stress-test an allocation plan with Monte Carlo simulation.")
+    parser.add_argument("--plan", default=None,
+                        help="Plan CSV (default: data/allocation_plan.csv from optimize.py)")
+    parser.add_argument("--reps", type=int, default=5000, help="Number of replications")
+    parser.add_argument("--demand-cv", type=float, default=DEFAULT_DEMAND_CV,
+                        help="Demand std as a fraction of the forecast when no interval is available")
+    parser.add_argument("--lead-time-probs", type=float, nargs='+', default=DEFAULT_LEAD_TIME_PROBS,
+                        help="Probability of a shipment arriving after 0, 1, 2 ... days")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    plan_path = args.plan or os.path.join(local_store.DATA_DIR, 'allocation_plan.csv')
+    if not os.path.exists(plan_path):
+        print(f"Error: {plan_path} not found. Run optimize.py first.")
+        exit()
+    plan = pd.read_csv(plan_path)
+    try:
+        forecast_df = local_store.read_dataset('forecast_results')
+    except FileNotFoundError:
+        forecast_df = None
+    if 'Date' not in plan.columns and forecast_df is not None:
+        # optimize.py plans the first forecast day
+        plan['Date'] = forecast_df['Date'].min()
+
+    summary, replications = simulate_plan(plan, forecast_df, n_reps=args.reps, demand_cv=args.demand_cv,
+                                          lead_time_probs=args.lead_time_probs, seed=args.seed, workers=args.workers)
+    network = network_service_levels(replications)
+    print(summary.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    print(f"\nNetwork fill rate over {args.reps} replications: mean {network['Fill_Rate'].mean():.1%}, "
+          f"5th percentile {network['Fill_Rate'].quantile(0.05):.1%}")
+
+    output_path = os.path.join(local_store.DATA_DIR, 'simulation_summary.csv')
+    summary.to_csv(output_path, index=False)
+    print(f"Summary saved to: {output_path}")
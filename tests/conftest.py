@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# The modules in src/ import each other by name, as the scripts and app.py do
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import calendar_events
+
+@pytest.fixture(autouse=True)
+def calendar_dir(tmp_path, monkeypatch):
+    # Event calendars built by a test are cached in its tmp_path, not in data/calendar
+    path = tmp_path / 'calendar'
+    monkeypatch.setenv(calendar_events.CALENDAR_DIR_ENV, str(path))
+    return path
@@ -0,0 +1,103 @@
+import pandas as pd
+import pytest
+
+import backtest
+from data_gen import generate_sales_data
+
+END = pd.Timestamp('2025-06-30')
+
+def test_cutoffs_stay_on_the_grid_as_history_grows():
+    dates = pd.date_range(end=END, periods=600, freq='D')
+    grown = pd.date_range(end=END + pd.Timedelta(days=45), periods=645, freq='D')
+
+    before = backtest.make_cutoffs(dates, horizon=14, n_cutoffs=4)
+    after = backtest.make_cutoffs(grown, horizon=14, n_cutoffs=8)
+
+    assert len(before) == 4
+    assert set(before) <= set(after)
+    for cutoffs, series in [(before, dates), (after, grown)]:
+        assert all((c - pd.Timestamp(0)).days % 14 == 0 for c in cutoffs)
+        assert cutoffs[-1] + pd.Timedelta(days=14) <= series.max()
+        assert cutoffs[0] >= series.min() + pd.Timedelta(days=365)
+
+def test_cutoffs_respect_initial_days():
+    dates = pd.date_range(end=END, periods=400, freq='D')
+    assert len(backtest.make_cutoffs(dates, horizon=14, n_cutoffs=10, initial_days=365)) == 1
+
+def test_score_stores_sums_and_metrics():
+    dates = pd.date_range('2025-01-01', periods=3, freq='D')
+    forecast = pd.DataFrame({'Date': list(dates) * 2, 'Store': ['Store_A'] * 3 + ['Store_B'] * 3,
+                             'Predicted_Demand': [10, 20, 5, 7, 7, 7]})
+    # Store_B has actuals for two of its days only: the third day is not scored
+    actual = pd.DataFrame({'Date': list(dates) + list(dates[:2]), 'Store': ['Store_A'] * 3 + ['Store_B'] * 2,
+                           'Sales': [8, 25, 0, 7, 14]})
+
+    scores = backtest.score_stores(forecast, actual).set_index('Store')
+
+    assert scores.loc['Store_A', ['Points', 'Actual', 'Abs_Error', 'Error', 'APE_Count']].tolist() == [3, 33, 12, 2, 2]
+    assert scores.loc['Store_A', 'APE_Sum'] == pytest.approx(2 / 8 + 5 / 25)
+    assert scores.loc['Store_B', ['Points', 'Actual', 'Abs_Error', 'Error']].tolist() == [2, 21, 7, -7]
+
+    folds = scores.reset_index().assign(Engine='fast', Cutoff=dates[0], Fit_Seconds=0.0)
+    summary = backtest.summarize_backtest(folds).set_index('Store')
+    assert summary.loc['Store_A', 'MAPE'] == pytest.approx(100 * 0.45 / 2)
+    assert summary.loc['Store_A', 'WAPE'] == pytest.approx(100 * 12 / 33)
+    assert summary.loc['Store_A', 'Bias'] == pytest.approx(100 * 2 / 33)
+    assert summary.loc['Store_B', 'MAPE'] == pytest.approx(100 * (0.5 / 2))
+
+@pytest.fixture
+def fold_calls(monkeypatch):
+    # Count the folds actually fitted (workers=1 calls the worker in-process)
+    calls = []
+    worker = backtest._fold_worker
+
+    def counting_worker(engine_name, cutoff, horizon, history, events, options):
+        calls.append((cutoff, tuple(sorted(history['Store'].astype(str).unique()))))
+        return worker(engine_name, cutoff, horizon, history, events, options)
+
+    monkeypatch.setattr(backtest, '_fold_worker', counting_worker)
+    return calls
+
+def _run(history, cache_path, **kwargs):
+    kwargs = {'engine': 'fast', 'horizon': 14, 'n_cutoffs': 2, 'stores_per_task': 1, **kwargs}
+    return backtest.run_backtest(history, cache_path=cache_path, **kwargs)
+
+def test_fold_cache_is_reused_on_rerun(tmp_path, fold_calls):
+    history = generate_sales_data(days=500, seed=5, end_date=END)
+    cache_path = tmp_path / 'folds.csv'
+
+    first = _run(history, cache_path)
+    assert len(fold_calls) == 2 * 5
+
+    second = _run(history, cache_path)
+    assert len(fold_calls) == 2 * 5
+    pd.testing.assert_frame_equal(first[backtest.KEY_COLUMNS + backtest.SUM_COLUMNS],
+                                  second[backtest.KEY_COLUMNS + backtest.SUM_COLUMNS], check_dtype=False)
+
+def test_fold_cache_only_refits_what_changed(tmp_path, fold_calls):
+    history = generate_sales_data(days=500, seed=5, end_date=END)
+    cache_path = tmp_path / 'folds.csv'
+    _run(history, cache_path)
+    cutoffs = backtest.make_cutoffs(history['Date'], horizon=14, n_cutoffs=2)
+    fold_calls.clear()
+
+    # Later days do not touch existing folds: only the new cutoff is fitted
+    grown = generate_sales_data(days=514, seed=5, end_date=END + pd.Timedelta(days=14))
+    _run(grown, cache_path, n_cutoffs=3)
+    assert {cutoff for cutoff, _ in fold_calls} == {cutoffs[-1] + pd.Timedelta(days=14)}
+    fold_calls.clear()
+
+    # Changed actuals for one store in the last fold only: that store's last fold is refitted
+    edited = history.copy()
+    changed_day = cutoffs[-1] + pd.Timedelta(days=3)
+    edited.loc[(edited['Store'] == 'Store_C') & (edited['Date'] == changed_day), 'Sales'] += 50
+    _run(edited, cache_path)
+    assert fold_calls == [(cutoffs[-1], ('Store_C',))]
+    fold_calls.clear()
+
+    # Different engine settings: every fold is refitted
+    _run(history, cache_path, options={'seed': 7})
+    assert len(fold_calls) == 2 * 5
+    fold_calls.clear()
+    _run(history, cache_path, horizon=7)
+    assert len(fold_calls) == 2 * 5
@@ -0,0 +1,21 @@
+import os
+
+import pandas as pd
+
+import calendar_events
+
+def test_cache_follows_data_dir(tmp_path):
+    events = calendar_events.get_event_calendar('2025-03-01', '2025-04-30', data_dir=tmp_path)
+
+    assert os.listdir(tmp_path / 'calendar') == ['events_TH_20250101_20251231.csv']
+    assert events['ds'].between(pd.Timestamp('2025-03-01'), pd.Timestamp('2025-04-30')).all()
+
+def test_default_cache_dir_comes_from_environment(calendar_dir):
+    calendar_events.get_event_calendar('2025-03-01', '2025-04-30')
+
+    assert os.listdir(calendar_dir) == ['events_TH_20250101_20251231.csv']
+
+def test_cache_can_be_skipped(tmp_path):
+    calendar_events.get_event_calendar('2025-03-01', '2025-04-30', data_dir=tmp_path, cache=False)
+
+    assert not (tmp_path / 'calendar').exists()
@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_access
+import local_store
+from data_gen import generate_sales_data
+
+STORES = ['Store_A', 'Store_C', 'Store_E']
+RANGES = [('2024-03-05', '2024-04-20', 'day'), ('2023-09-01', '2024-08-15', 'week'),
+          ('2022-11-10', '2024-12-31', 'month')]
+
+@pytest.fixture(scope='module')
+def frames():
+    history = generate_sales_data(days=800, seed=3, end_date='2024-12-31')
+    dates = pd.date_range('2025-01-01', periods=14, freq='D')
+    demand = np.random.default_rng(3).integers(40, 200, (5, len(dates)))
+    forecast = pd.DataFrame({
+        'Date': np.tile(dates, 5),
+        'Store': np.repeat(['Store_A', 'Store_B', 'Store_C', 'Store_D', 'Store_E'], len(dates)),
+        'Predicted_Demand': demand.ravel(),
+        'Predicted_Lower': (demand * 0.8).round().astype(int).ravel(),
+        'Predicted_Upper': (demand * 1.2).round().astype(int).ravel(),
+    })
+    return history, forecast
+
+@pytest.fixture(scope='module')
+def datasets(frames, tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp('data')
+    history, forecast = frames
+    local_store.write_dataset(history, 'sales_history', data_dir=data_dir)
+    local_store.write_dataset(forecast, 'forecast_results', data_dir=data_dir)
+    return (local_store.dataset_path('sales_history', str(data_dir)),
+            local_store.dataset_path('forecast_results', str(data_dir)))
+
+@pytest.fixture(scope='module')
+def database(frames):
+    # A disposable PostgreSQL database: its sales_history / forecast_results are replaced
+    url = os.getenv('TEST_DATABASE_URL')
+    if not url:
+        pytest.skip('TEST_DATABASE_URL not set')
+    import migrate_db
+    from sqlalchemy import create_engine
+
+    engine = create_engine(url)
+    migrate_db.sync_full(engine, *frames)
+    yield engine
+    engine.dispose()
+
+def _normalize(df):
+    df = df.copy()
+    df['Date'] = pd.to_datetime(df['Date'])
+    df['Store'] = df['Store'].astype(str)
+    for col in df.columns.drop(['Date', 'Store']):
+        df[col] = df[col].astype(np.int64)
+    return df[sorted(df.columns)].sort_values(['Store', 'Date']).reset_index(drop=True)
+
+def _assert_same_source(expected_source, source, history=True):
+    if history:
+        stores, first, last = data_access.get_history_bounds(expected_source)
+        assert data_access.get_history_bounds(source) == (stores, first, last)
+        for start, end, grain in RANGES:
+            pd.testing.assert_frame_equal(
+                _normalize(data_access.query_history(source, STORES, start, end, grain)),
+                _normalize(data_access.query_history(expected_source, STORES, start, end, grain)))
+    else:
+        dates = data_access.get_forecast_dates(expected_source)
+        assert data_access.get_forecast_dates(source) == dates
+        assert data_access.get_forecast_stores(source) == data_access.get_forecast_stores(expected_source)
+        for kwargs in [{}, {'date': dates[3]}, {'stores': STORES, 'date': dates[-1]}]:
+            pd.testing.assert_frame_equal(_normalize(data_access.query_forecast(source, **kwargs)),
+                                          _normalize(data_access.query_forecast(expected_source, **kwargs)))
+
+def test_dataset_matches_frame(frames, datasets):
+    history, forecast = frames
+    _assert_same_source(history, datasets[0])
+    _assert_same_source(forecast, datasets[1], history=False)
+
+def test_database_matches_frame(frames, database):
+    history, forecast = frames
+    _assert_same_source(history, database)
+    _assert_same_source(forecast, database, history=False)
@@ -0,0 +1,62 @@
+import pandas as pd
+
+import local_store
+from data_gen import append_missing_days, generate_days, generate_sales_data
+
+END = pd.Timestamp('2025-03-31')
+
+def _sorted(df):
+    return df.astype({'Store': str}).sort_values(['Store', 'Date']).reset_index(drop=True)
+
+def test_generation_is_reproducible():
+    first = generate_sales_data(days=90, seed=7, end_date=END)
+    second = generate_sales_data(days=90, seed=7, end_date=END)
+    other = generate_sales_data(days=90, seed=8, end_date=END)
+
+    pd.testing.assert_frame_equal(first, second)
+    assert not first['Sales'].equals(other['Sales'])
+
+def test_store_days_do_not_depend_on_the_window_or_network():
+    full = generate_sales_data(days=90, n_stores=12, seed=7, end_date=END)
+    dates = pd.date_range('2025-02-10', '2025-02-20')
+    stores = list(full['Store'].cat.categories[[3, 11]])
+
+    part = generate_days(dates, stores, seed=7)
+    expected = full[full['Store'].isin(stores) & full['Date'].isin(dates)]
+
+    pd.testing.assert_frame_equal(_sorted(part), _sorted(expected))
+
+def test_append_matches_full_generation_and_is_idempotent(tmp_path):
+    early = generate_sales_data(days=80, seed=7, end_date=END - pd.Timedelta(days=10))
+    local_store.write_dataset(early, 'sales_history', data_dir=tmp_path)
+
+    appended = append_missing_days(end_date=END, seed=7, data_dir=tmp_path)
+    again = append_missing_days(end_date=END, seed=7, data_dir=tmp_path)
+
+    assert len(appended) == 10 * 5
+    assert len(again) == 0
+    stored = local_store.read_dataset('sales_history', data_dir=tmp_path)
+    expected = generate_sales_data(days=90, seed=7, end_date=END)
+    pd.testing.assert_frame_equal(_sorted(stored)[['Date', 'Store', 'Sales']],
+                                  _sorted(expected)[['Date', 'Store', 'Sales']], check_dtype=False)
+
+def test_latest_dates_reads_older_months_only_for_missing_stores(tmp_path, monkeypatch):
+    sales = generate_sales_data(days=90, seed=7, end_date=END)
+    stopped = sales['Store'].cat.categories[0]
+    sales = sales[(sales['Store'] != stopped) | (sales['Date'] <= '2025-02-14')]
+    local_store.write_dataset(sales, 'sales_history', data_dir=tmp_path)
+
+    reads = []
+    read_dataset = local_store.read_dataset
+    def counting_read(name, **kwargs):
+        reads.append(kwargs)
+        return read_dataset(name, **kwargs)
+    monkeypatch.setattr(local_store, 'read_dataset', counting_read)
+
+    latest = local_store.latest_dates('sales_history', data_dir=tmp_path)
+
+    assert latest[stopped] == pd.Timestamp('2025-02-14')
+    assert (latest.drop(stopped) == END).all()
+    # Newest month for every store, then only the stopped store's rows
+    assert [r.get('stores') for r in reads] == [None, [str(stopped)]]
+    assert reads[0]['start_date'] == pd.Timestamp('2025-03-01')
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from downsample import downsample_series, lttb_indices
+
+@pytest.mark.parametrize('n, n_out', [(1000, 100), (101, 3), (50, 49)])
+def test_lttb_keeps_endpoints_and_size(n, n_out):
+    x = np.arange(n, dtype=float)
+    y = np.random.default_rng(0).normal(size=n).cumsum()
+
+    keep = lttb_indices(x, y, n_out)
+
+    assert len(keep) == n_out
+    assert keep[0] == 0 and keep[-1] == n - 1
+    assert np.all(np.diff(keep) > 0)
+
+def test_lttb_returns_short_series_whole():
+    assert lttb_indices(np.arange(10.0), np.arange(10.0), 20).tolist() == list(range(10))
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+def test_downsample_series_bounds_every_series(method):
+    dates = pd.date_range('2024-01-01', periods=730, freq='D')
+    df = pd.DataFrame({
+        'Date': np.tile(dates, 3),
+        'Store': np.repeat(['Store_A', 'Store_B', 'Store_C'], len(dates)),
+        'Sales': np.random.default_rng(1).integers(0, 200, 3 * len(dates)),
+    })
+
+    reduced, removed = downsample_series(df, max_points=100, method=method)
+
+    assert removed == len(df) - len(reduced)
+    for store, series in reduced.groupby('Store'):
+        assert len(series) <= 100
+        assert series['Date'].iloc[0] == dates[0] and series['Date'].iloc[-1] == dates[-1]
@@ -0,0 +1,20 @@
+import os
+import threading
+
+import local_store
+from data_gen import generate_sales_data
+
+def test_read_waits_out_a_dataset_swap(tmp_path):
+    sales = generate_sales_data(days=60, seed=7)
+    local_store.write_dataset(sales, 'sales_history', data_dir=tmp_path)
+    target = local_store.dataset_path('sales_history', tmp_path)
+
+    # Between write_dataset's two renames only <target>.old-* exists
+    os.replace(target, f"{target}.old-test")
+    swap = threading.Timer(0.2, os.replace, (f"{target}.old-test", target))
+    swap.start()
+
+    assert local_store.dataset_exists('sales_history', tmp_path)
+    stored = local_store.read_dataset('sales_history', data_dir=tmp_path)
+    swap.join()
+    assert len(stored) == len(sales)
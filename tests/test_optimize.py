@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from optimize import SHORTAGE_PENALTY, make_network, optimize_network, solve_allocation_greedy, solve_allocation_lp
+
+def _objective(plan, costs):
+    return (plan['Store'].map(costs) * plan['Allocated_Qty']).sum() + SHORTAGE_PENALTY * plan['Shortage_Qty'].sum()
+
+@pytest.mark.parametrize('seed', range(8))
+def test_greedy_matches_lp(seed):
+    rng = np.random.default_rng(seed)
+    n_stores = int(rng.integers(2, 12))
+    stores = [f"Store_{i:02d}" for i in range(n_stores)]
+    demand = pd.DataFrame({'Store': stores, 'Predicted_Demand': rng.integers(0, 300, n_stores)})
+    # Distinct costs (one above the penalty) give a unique optimum
+    costs = dict(zip(stores, rng.permutation(np.arange(3, 3 + n_stores)).tolist()))
+    costs[stores[0]] = SHORTAGE_PENALTY + 5
+    stock = int(demand['Predicted_Demand'].sum() * rng.uniform(0.3, 1.2))
+
+    greedy = solve_allocation_greedy(demand, stock, costs)
+    lp = solve_allocation_lp(demand, stock, costs)
+
+    cols = ['Store', 'Predicted_Demand', 'Allocated_Qty', 'Shortage_Qty', 'Status']
+    pd.testing.assert_frame_equal(greedy[cols].astype(str).reset_index(drop=True),
+                                  lp[cols].astype(str).reset_index(drop=True))
+    assert greedy['Allocated_Qty'].sum() <= stock
+
+def test_greedy_matches_lp_objective_with_tied_costs():
+    demand = pd.DataFrame({'Store': ['Store_A', 'Store_B', 'Store_C'], 'Predicted_Demand': [100, 50, 80]})
+    costs = {'Store_A': 10, 'Store_B': 10, 'Store_C': 12}
+
+    greedy = solve_allocation_greedy(demand, 120, costs)
+    lp = solve_allocation_lp(demand, 120, costs)
+
+    assert _objective(greedy, costs) == _objective(lp, costs)
+
+# --- Multi-warehouse network ---
+
+def _network_demand():
+    return pd.DataFrame({'Store': ['Store_A', 'Store_B', 'Store_C'], 'Predicted_Demand': [100, 60, 80]})
+
+def test_network_reads_warehouse_by_store_costs():
+    costs = {'WH_1': {'Store_A': 5, 'Store_B': 9, 'Store_C': 7},
+             'WH_2': {'Store_A': 8, 'Store_B': 4, 'Store_C': 6}}
+
+    plan, shipments, _ = optimize_network(_network_demand(), {'WH_1': 150, 'WH_2': 150}, costs)
+
+    assert plan['Status'].eq('Fulfilled').all()
+    lanes = shipments.set_index(['Warehouse', 'Store'])['Shipped_Qty'].to_dict()
+    assert lanes == {('WH_1', 'Store_A'): 100, ('WH_2', 'Store_B'): 60, ('WH_2', 'Store_C'): 80}
+    # The same costs as a warehouses x stores frame give the same plan
+    frame_plan, _, _ = optimize_network(_network_demand(), {'WH_1': 150, 'WH_2': 150}, pd.DataFrame(costs).T)
+    pd.testing.assert_frame_equal(plan, frame_plan)
+
+def test_network_respects_lane_limits_and_capacity():
+    demand = _network_demand()
+    capacity, costs = make_network(demand['Store'], total_stock=200, n_warehouses=2)
+    limits = {'WH_1': {'Store_A': 30}, 'WH_2': {'Store_A': 20, 'Store_C': 10}}
+
+    plan, shipments, _ = optimize_network(demand, capacity, costs, lane_limits=limits)
+
+    shipped = shipments.set_index(['Warehouse', 'Store'])['Shipped_Qty']
+    for warehouse, stores in limits.items():
+        for store, limit in stores.items():
+            assert shipped.get((warehouse, store), 0) <= limit
+    assert (shipments.groupby('Warehouse')['Shipped_Qty'].sum() <= pd.Series(capacity)).all()
+    assert (plan['Allocated_Qty'] + plan['Shortage_Qty'] == plan['Predicted_Demand']).all()
+    # Store_A can receive at most 30 + 20 units; everything else is shipped
+    assert plan.set_index('Store')['Allocated_Qty'].to_dict() == {'Store_A': 50, 'Store_B': 60, 'Store_C': 80}
+
+def test_network_ships_no_more_than_capacity():
+    demand = _network_demand()
+    capacity, costs = make_network(demand['Store'], total_stock=151, n_warehouses=3)
+
+    plan, shipments, _ = optimize_network(demand, capacity, costs)
+
+    assert capacity == {'WH_1': 51, 'WH_2': 50, 'WH_3': 50}
+    assert shipments.groupby('Warehouse')['Shipped_Qty'].sum().to_dict() == capacity
+    assert plan['Allocated_Qty'].sum() == 151
+
+def test_network_with_one_warehouse_matches_single_warehouse_plan():
+    demand = _network_demand()
+    costs = {'Store_A': 15, 'Store_B': 10, 'Store_C': 12}
+
+    plan, _, stats = optimize_network(demand, {'WH_1': 150}, {'WH_1': costs})
+
+    greedy = solve_allocation_greedy(demand, 150, costs)
+    pd.testing.assert_frame_equal(plan, greedy, check_dtype=False)
+    assert stats['objective'] == pytest.approx(_objective(greedy, costs))
+
+def test_network_rejects_unserved_store_or_warehouse():
+    demand = _network_demand()
+    with pytest.raises(ValueError, match='Store_C'):
+        optimize_network(demand, {'WH_1': 100}, {'WH_1': {'Store_A': 5, 'Store_B': 6}})
+    with pytest.raises(ValueError, match='WH_2'):
+        optimize_network(demand, {'WH_1': 100, 'WH_2': 100},
+                         {'WH_1': {'Store_A': 5, 'Store_B': 6, 'Store_C': 7}})
+    # The transposed layout ({store: {warehouse: cost}}) has no lane that matches
+    with pytest.raises(ValueError):
+        optimize_network(demand, {'WH_1': 100}, {'Store_A': {'WH_1': 5}, 'Store_B': {'WH_1': 6},
+                                                 'Store_C': {'WH_1': 7}})
@@ -0,0 +1,25 @@
+import pandas as pd
+
+from optimize import shipping_costs_for
+from scenarios import DEFAULT_STOCK_LEVELS, cost_pct_for, run_scenario_sweep
+
+STORES = ['Store_A', 'Store_B', 'Store_C', 'Store_D', 'Store_E']
+
+def test_cost_key_is_exact():
+    assert cost_pct_for(shipping_costs_for(STORES)) == 100
+
+    base = {'Store_A': 15, 'Store_B': 10}
+    assert cost_pct_for({'Store_A': 18, 'Store_B': 12}, base) == 120
+    assert cost_pct_for({'Store_A': 18, 'Store_B': 13}, base) is None
+    # Not a whole-percent multiple of the base costs
+    assert cost_pct_for({'Store_A': 15.15, 'Store_B': 10.1}, base) is None
+
+def test_sweep_is_keyed_by_cost_pct():
+    forecast = pd.DataFrame({'Date': pd.Timestamp('2025-03-01'), 'Store': STORES,
+                             'Predicted_Demand': [120, 80, 60, 90, 40]})
+
+    table = run_scenario_sweep(forecast, cost_multipliers=[0.8, 1.0, 1.2])
+
+    assert sorted(table['Cost_Pct'].unique()) == [80, 100, 120]
+    assert sorted(table['Stock_Level_Pct'].unique()) == DEFAULT_STOCK_LEVELS
+    assert str(table['Cost_Pct'].dtype) == 'int16'
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import local_store
+import schema
+from data_gen import generate_sales_data
+from fast_forecast import fast_forecast_all_stores
+from forecast import round_forecast
+
+# Bytes per row: datetime64 Date (8) + 1-byte Store code + int32 measures, plus the store
+# names and index amortized over the frame
+HISTORY_BYTES_PER_ROW = 16
+FORECAST_BYTES_PER_ROW = 26
+
+@pytest.fixture(scope='module')
+def history():
+    return generate_sales_data(days=730, n_stores=50, seed=1, end_date='2025-06-30')
+
+def _assert_compact(df, int_columns, budget):
+    assert isinstance(df['Store'].dtype, pd.CategoricalDtype)
+    # Only the stores in the frame, in dictionary order
+    assert set(df['Store'].cat.categories) == set(df['Store'].unique())
+    assert pd.api.types.is_datetime64_ns_dtype(df['Date'])
+    for col in int_columns:
+        assert df[col].dtype == np.int32, col
+    assert schema.bytes_per_row(df) < budget
+
+def test_generated_history_is_compact(history):
+    _assert_compact(history, ['Sales'], HISTORY_BYTES_PER_ROW)
+
+def test_read_dataset_is_compact(history, tmp_path):
+    local_store.write_dataset(history, 'sales_history', data_dir=tmp_path)
+
+    df = local_store.read_dataset('sales_history', data_dir=tmp_path)
+    subset = local_store.read_dataset('sales_history', stores=['Store_02', 'Store_07'], data_dir=tmp_path)
+
+    _assert_compact(df, ['Sales'], HISTORY_BYTES_PER_ROW)
+    assert list(subset['Store'].cat.categories) == ['Store_02', 'Store_07']
+
+def test_rounded_forecast_is_compact(history):
+    forecast = round_forecast(fast_forecast_all_stores(history, days_ahead=30))
+
+    _assert_compact(forecast, ['Predicted_Demand', 'Predicted_Lower', 'Predicted_Upper'], FORECAST_BYTES_PER_ROW)